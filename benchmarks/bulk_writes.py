@@ -0,0 +1,93 @@
+"""
+Compare creating users one POST at a time, with concurrent POSTs whose
+writes are coalesced, and with one atomic operations POST
+
+Runs against the graph configured for the app (see startup.sh), so the
+created users are left in the database:
+
+    python -m benchmarks.bulk_writes [count]
+"""
+from threading import Thread
+import json
+import sys
+import time
+import uuid
+
+from flask_restful_graph import create_app
+from flask_restful_graph.flask_restful_graph import app
+
+
+def make_user(run, index):
+    return {
+        'type': 'user',
+        'attributes': {
+            'email': 'bench-{}-{}@example.com'.format(run, index),
+            'firstName': 'Bench'
+        }
+    }
+
+
+def time_individual_posts(client, run, count):
+    start = time.time()
+
+    for index in range(count):
+        response = client.post(
+            '/users/', data=json.dumps({'data': make_user(run, index)}),
+            content_type='application/json')
+        assert response.status_code == 200, response.data
+
+    return time.time() - start
+
+
+def time_coalesced_posts(client, run, count, threads=16):
+    # each thread posts its share through a client of its own
+    coalescing_app = create_app({'COALESCE_WRITES': True})
+
+    def post_users(indexes):
+        thread_client = coalescing_app.test_client()
+
+        for index in indexes:
+            response = thread_client.post(
+                '/users/', data=json.dumps({'data': make_user(run, index)}),
+                content_type='application/json')
+            assert response.status_code == 200, response.data
+
+    workers = [Thread(target=post_users, args=(range(start, count, threads),))
+               for start in range(threads)]
+
+    start = time.time()
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return time.time() - start
+
+
+def time_atomic_operations(client, run, count):
+    body = {'atomic:operations': [
+        {'op': 'add', 'data': make_user(run, index)}
+        for index in range(count)]}
+
+    start = time.time()
+    response = client.post('/operations', data=json.dumps(body),
+                           content_type='application/json')
+    assert response.status_code == 200, response.data
+
+    return time.time() - start
+
+
+def main(count):
+    client = app.test_client()
+
+    for name, func in (('individual POSTs', time_individual_posts),
+                       ('coalesced POSTs', time_coalesced_posts),
+                       ('atomic operations', time_atomic_operations)):
+        elapsed = func(client, uuid.uuid4().hex, count)
+        print '{:<20} {:>8.3f}s {:>10.1f} nodes/s'.format(
+            name, elapsed, count / elapsed)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,100 @@
+"""
+Compare the JSON encoders and gzip on a large compound document
+
+    python -m benchmarks.encoding [--users N] [--groups N] [--runs N]
+
+The document is the first page of groups with their members included,
+read through the API from a generated in-memory graph. Speedups are
+relative to flask-restful's default representation. Encoders that are not
+installed are skipped.
+"""
+import argparse
+import json
+import time
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import MemoryBackend
+from flask_restful_graph.representations import ENCODERS, GzipCompression
+
+from .graphs import generate_graph
+
+
+def get_document(options):
+    graph = MemoryBackend()
+    generate_graph(graph, options.users, options.groups, options.memberships)
+
+    app = create_app({'COLLECT_METRICS': False, 'MAX_PAGE_SIZE': 1000},
+                     graph=graph)
+    response = app.test_client().get(
+        '/groups/?include=members&page[size]={}'.format(options.groups))
+
+    return app, json.loads(response.get_data())
+
+
+def best_time(func, runs):
+    timings = []
+
+    for _ in range(runs):
+        start = time.time()
+        func()
+        timings.append(time.time() - start)
+
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--groups', type=int, default=200)
+    parser.add_argument('--memberships', type=int, default=5)
+    parser.add_argument('--runs', type=int, default=10)
+    options = parser.parse_args(argv)
+
+    app, document = get_document(options)
+    encoders = [('default', json.dumps)]
+
+    for name in sorted(ENCODERS):
+        try:
+            encoders.append((name, ENCODERS[name]()))
+        except ImportError:
+            encoders.append((name, None))
+
+    print '{:<12} {:>10} {:>10} {:>9}'.format(
+        'encoder', 'ms', 'MB/s', 'speedup')
+
+    baseline = None
+
+    for name, encode in encoders:
+        if encode is None:
+            print '{:<12} {:>10}'.format(name, 'missing')
+            continue
+
+        data = encode(document)
+        elapsed = best_time(lambda: encode(document), options.runs)
+        baseline = baseline or elapsed
+
+        print '{:<12} {:>10.2f} {:>10.1f} {:>8.2f}x'.format(
+            name, elapsed * 1000, len(data) / elapsed / 1e6,
+            baseline / elapsed)
+
+    data = ENCODERS['json']()(document)
+
+    print '\n{:<12} {:>10} {:>10} {:>9}'.format(
+        'gzip level', 'ms', 'KB', 'ratio')
+
+    for level in (1, 6, 9):
+        compression = GzipCompression(min_size=0, level=level)
+
+        with app.test_request_context(
+                headers={'Accept-Encoding': 'gzip'}):
+            compress = lambda: compression.after_request(
+                app.response_class(data))
+            elapsed = best_time(compress, options.runs)
+            size = len(compress().get_data())
+
+        print '{:<12} {:>10.2f} {:>10.1f} {:>8.1f}x'.format(
+            level, elapsed * 1000, size / 1e3, float(len(data)) / size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""
+Benchmark every route of the API against a synthetic User/Group graph
+
+    python -m benchmarks.endpoints [--users N] [--groups N]
+        [--memberships N] [--requests N] [--backend memory|neo4j]
+        [--cache] [--encoder NAME] [--gzip] [--output results.json]
+        [--compare baseline.json]
+
+Reports latency percentiles, throughput, peak memory, backend queries and
+bytes sent per request for each route, and writes them as JSON to compare
+commits or settings, e.g. `--encoder json` against `--encoder ujson`.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import time
+import uuid
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import GraphBackend, GraphTransaction, \
+    MemoryBackend, Neo4jBackend
+from flask_restful_graph.backends.neo4j import EXPORT_PAGE_SIZE
+from flask_restful_graph.models import BaseModel
+
+from .graphs import generate_graph
+
+
+###############################################################################
+#                                                                             #
+#                Counting backend queries                                     #
+#                                                                             #
+###############################################################################
+
+
+class CountingBackend(GraphBackend):
+    """
+    Pass calls through to a backend, counting those that query the graph
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.queries = 0
+
+    def read_documents(self, model_name, parameters, **options):
+        self.queries += 1
+        return self.backend.read_documents(model_name, parameters, **options)
+
+    def count_related(self, model_name, related_name, id):
+        self.queries += 1
+        return self.backend.count_related(model_name, related_name, id)
+
+    def read_neighborhood(self, *args):
+        self.queries += 1
+        return self.backend.read_neighborhood(*args)
+
+    def read_path(self, *args):
+        self.queries += 1
+        return self.backend.read_path(*args)
+
+    def export_nodes(self, model_name):
+        return self.count_pages(self.backend.export_nodes(model_name))
+
+    def export_edges(self, model_name, related_name):
+        return self.count_pages(
+            self.backend.export_edges(model_name, related_name))
+
+    def count_pages(self, records):
+        """
+        Count the queries of an export as the Neo4j backend reads it, one
+        per page of EXPORT_PAGE_SIZE nodes and one for the last, shorter
+        page
+        """
+        self.queries += 1
+
+        for count, record in enumerate(records, 1):
+            if count % EXPORT_PAGE_SIZE == 0:
+                self.queries += 1
+
+            yield record
+
+    def indexed_properties(self):
+        return self.backend.indexed_properties()
+
+    def constraints(self):
+        return self.backend.constraints()
+
+    def create_index(self, label, prop_name, unique=False):
+        return self.backend.create_index(label, prop_name, unique)
+
+    def begin(self):
+        return CountingTransaction(self, self.backend.begin())
+
+
+class CountingTransaction(GraphTransaction):
+
+    def __init__(self, counter, tx):
+        self.counter = counter
+        self.tx = tx
+
+    def read_documents(self, model_name, parameters, **options):
+        self.counter.queries += 1
+        return self.tx.read_documents(model_name, parameters, **options)
+
+    def find_nodes(self, ids):
+        self.counter.queries += 1
+        return self.tx.find_nodes(ids)
+
+    def create_node(self, model_name, properties, linkages):
+        self.counter.queries += 1
+        return self.tx.create_node(model_name, properties, linkages)
+
+    def run_batch(self, model_name, kind, rows, related_name=None):
+        self.counter.queries += 1
+        return self.tx.run_batch(model_name, kind, rows, related_name)
+
+    def commit(self):
+        self.tx.commit()
+
+    def rollback(self):
+        self.tx.rollback()
+
+    def finished(self):
+        return self.tx.finished()
+
+
+###############################################################################
+#                                                                             #
+#                Scenarios                                                    #
+#                                                                             #
+###############################################################################
+
+
+def get_rule_model(rule):
+    """
+    Get the name of the model whose collection path a url rule starts with
+    """
+    for model_name, plan in BaseModel.plans.iteritems():
+        if rule.startswith(plan.self_path.format('')):
+            return model_name
+
+    return None
+
+
+ID_CONVERTER = re.compile(r'<int:\w+>')
+
+
+def fill_rule(rule, ids, rng):
+    """
+    Replace each id converter of a url rule with the id of a random node
+    of the model whose collection path comes before it
+    """
+    def replace(match):
+        prefix = rule[:match.start()]
+        collection = prefix[prefix.rstrip('/').rfind('/'):]
+        return str(rng.choice(ids[get_rule_model(collection)]))
+
+    return ID_CONVERTER.sub(replace, rule)
+
+
+def make_post_body(model_name):
+    if model_name == 'User':
+        attributes = {'email': '{}@example.com'.format(uuid.uuid4().hex)}
+    else:
+        attributes = {'title': uuid.uuid4().hex}
+
+    return {'type': model_name.lower(), 'attributes': attributes}
+
+
+def make_linkage_request(rule, model_name, method, ids, rng):
+    """
+    Return make_request for a relationship update, linking (or unlinking)
+    one random node, or replacing the linkage with three
+    """
+    related_name = rule.rsplit('/', 1)[-1]
+    related_model = \
+        BaseModel.plans[model_name].relationships[related_name].related_model
+
+    def make_request():
+        url = fill_rule(rule, ids, rng)
+        data = [{'type': related_model.lower(),
+                 'id': str(rng.choice(ids[related_model]))}
+                for _ in range(3 if method == 'PATCH' else 1)]
+        return url, {'data': data}
+
+    return make_request
+
+
+def get_scenarios(app, ids, rng):
+    """
+    List a (name, method, make_request) scenario for every route and
+    method, where make_request returns the url and JSON body of a request
+    """
+    scenarios = []
+
+    def get_url(rule):
+        return lambda: (fill_rule(rule, ids, rng), None)
+
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint == 'static':
+            continue
+
+        model_name = get_rule_model(rule.rule)
+
+        for method in sorted(rule.methods - set(['HEAD', 'OPTIONS'])):
+            name = '{} {}'.format(method, rule.rule)
+
+            if method == 'GET':
+                scenarios.append((name, method, get_url(rule.rule)))
+            elif '/relationships/' in rule.rule:
+                scenarios.append((name, method, make_linkage_request(
+                    rule.rule, model_name, method, ids, rng)))
+            elif rule.rule == '/operations':
+                scenarios.append((name, method, lambda: ('/operations', {
+                    'atomic:operations': [
+                        {'op': 'add', 'data': make_post_body('User')}
+                        for _ in range(10)]})))
+            else:
+                scenarios.append((name, method, lambda rule=rule.rule,
+                                  model_name=model_name: (
+                                      rule, {'data': make_post_body(
+                                          model_name)})))
+
+    for model_name in sorted(BaseModel.related_models):
+        path = BaseModel.plans[model_name].self_path
+        include = ','.join(sorted(BaseModel.related_models[model_name]))
+
+        scenarios.append(
+            ('GET {}?include={}'.format(path.format(''), include), 'GET',
+             lambda path=path, include=include: (
+                 path.format('') + '?include=' + include, None)))
+        scenarios.append(
+            ('GET {}?include={}'.format(path.format('<int:id>'), include),
+             'GET', lambda path=path, include=include,
+             model_name=model_name: (
+                 path.format(rng.choice(ids[model_name])) +
+                 '?include=' + include, None)))
+
+    return scenarios
+
+
+###############################################################################
+#                                                                             #
+#                Running                                                      #
+#                                                                             #
+###############################################################################
+
+
+def percentile(latencies, fraction):
+    """
+    Nearest-rank percentile of sorted latencies
+    """
+    index = max(0, int(round(fraction * len(latencies))) - 1)
+    return latencies[index]
+
+
+def run_scenario(client, counter, method, make_request, requests, warmup,
+                 headers=None):
+    latencies = []
+    errors = 0
+    queries = 0
+    response_bytes = 0
+
+    for count in range(warmup + requests):
+        url, body = make_request()
+        queries_before = counter.queries
+
+        start = time.time()
+        if method == 'GET':
+            response = client.get(url, headers=headers)
+        else:
+            response = client.open(url, method=method,
+                                   data=json.dumps(body),
+                                   content_type='application/json',
+                                   headers=headers)
+        data = response.get_data()
+        elapsed = time.time() - start
+
+        if count < warmup:
+            continue
+
+        latencies.append(elapsed)
+        queries += counter.queries - queries_before
+        response_bytes += len(data)
+        if response.status_code >= 400:
+            errors += 1
+
+    latencies.sort()
+    total = sum(latencies)
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        # latencies of error responses say nothing about the route
+        'failed': errors == requests,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p90_ms': percentile(latencies, 0.9) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'throughput_rps': requests / total if total else None,
+        'queries_per_request': float(queries) / requests,
+        'bytes_per_request': float(response_bytes) / requests,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_backend(options):
+    if options.backend == 'neo4j':
+        from py2neo import Graph
+        return Neo4jBackend(Graph(password=os.environ.get(
+            'TEST_GRAPH_PASSWORD')))
+
+    return MemoryBackend(indexes=[('User', 'email')])
+
+
+def compare(results, baseline):
+    """
+    Print the change of each route's median latency and queries
+    """
+    print '\n{:<50} {:>10} {:>10}'.format('vs ' + str(baseline['commit']),
+                                          'p50', 'queries')
+
+    for name, result in sorted(results['results'].iteritems()):
+        if name not in baseline['results'] or result['failed'] or \
+                baseline['results'][name].get('failed'):
+            continue
+
+        before = baseline['results'][name]
+        print '{:<50} {:>+9.1f}% {:>+10.1f}'.format(
+            name, 100 * (result['p50_ms'] / before['p50_ms'] - 1),
+            result['queries_per_request'] - before['queries_per_request'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--memberships', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', choices=['memory', 'neo4j'],
+                        default='memory')
+    parser.add_argument('--cache', action='store_true',
+                        help='serve GETs through the response cache')
+    parser.add_argument('--encoder', default='auto',
+                        choices=['auto', 'json', 'simplejson', 'ujson'])
+    parser.add_argument('--gzip', action='store_true',
+                        help='accept responses of 1KB or more gzipped')
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    options = parser.parse_args(argv)
+
+    counter = CountingBackend(make_backend(options))
+    user_ids, group_ids = generate_graph(
+        counter.backend, options.users, options.groups,
+        options.memberships, options.seed)
+
+    app = create_app({
+        'RESPONSE_CACHE_SIZE': 1024 if options.cache else 0,
+        'COLLECT_METRICS': False,
+        'JSON_ENCODER': options.encoder,
+        'GZIP_MIN_SIZE': 1024 if options.gzip else None
+    }, graph=counter)
+    headers = {'Accept-Encoding': 'gzip'} if options.gzip else None
+
+    rng = random.Random(options.seed)
+    client = app.test_client()
+    results = {
+        'commit': get_commit(),
+        'python': sys.version.split()[0],
+        'options': dict((key, value) for key, value in
+                        vars(options).iteritems()
+                        if key not in ('output', 'compare')),
+        'results': {}
+    }
+
+    print '{:<50} {:>8} {:>8} {:>8} {:>9} {:>7}'.format(
+        'route', 'p50 ms', 'p90 ms', 'p99 ms', 'req/s', 'queries')
+
+    for name, method, make_request in get_scenarios(
+            app, {'User': user_ids, 'Group': group_ids}, rng):
+        result = run_scenario(client, counter, method, make_request,
+                              options.requests, options.warmup, headers)
+        results['results'][name] = result
+
+        if result['failed']:
+            print '{:<50} failed: all {} requests returned errors'.format(
+                name, result['requests'])
+            continue
+
+        print '{:<50} {:>8.2f} {:>8.2f} {:>8.2f} {:>9.1f} {:>7.1f}'.format(
+            name, result['p50_ms'], result['p90_ms'], result['p99_ms'],
+            result['throughput_rps'], result['queries_per_request'])
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if options.compare:
+        with open(options.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Generate synthetic User/Group graphs through a graph backend
+"""
+import random
+
+from flask_restful_graph.operations import run_batch
+
+
+def generate_graph(graph, users=1000, groups=100, memberships=5, seed=0):
+    """
+    Create `groups` groups and `users` users, each a member of up to
+    `memberships` random groups, in one transaction
+
+    Returns the ids of the created users and groups.
+    """
+    rng = random.Random(seed)
+    tx = graph.begin()
+
+    group_ids = create_nodes(tx, 'Group', [
+        {'title': 'Group {}'.format(index)} for index in range(groups)])
+    user_ids = create_nodes(tx, 'User', [
+        {'email': 'user{}@example.com'.format(index),
+         'first_name': rng.choice(['Ann', 'Bob', 'Cid', 'Dee']),
+         'last_name': 'Surname{}'.format(rng.randrange(users))}
+        for index in range(users)])
+
+    run_batch(tx, 'User', 'link', [
+        {'id': user_id, 'related': group_id}
+        for user_id in user_ids
+        for group_id in rng.sample(group_ids, min(memberships, groups))],
+        'groups')
+
+    tx.commit()
+
+    return user_ids, group_ids
+
+
+def create_nodes(tx, model_name, properties):
+    rows = [{'key': key, 'properties': node_properties}
+            for key, node_properties in enumerate(properties)]
+    ids = dict((record['key'], record['id'])
+               for record in tx.run_batch(model_name, 'create', rows))
+
+    return [ids[key] for key in range(len(rows))]
@@ -0,0 +1,45 @@
+"""
+Measure the import time of the package and the boot time of an app
+
+Each measurement runs in a fresh interpreter, as a pre-fork worker would
+start, and neither should connect to the graph:
+
+    python -m benchmarks.startup [runs]
+"""
+import subprocess
+import sys
+
+
+IMPORT = '''
+import time
+start = time.time()
+import flask_restful_graph
+print(time.time() - start)
+'''
+
+BOOT = '''
+import time
+start = time.time()
+from flask_restful_graph import create_app
+app = create_app()
+app.test_request_context('/').push()
+print(time.time() - start)
+'''
+
+
+def measure(code, runs):
+    timings = sorted(
+        float(subprocess.check_output([sys.executable, '-c', code]))
+        for _ in range(runs))
+
+    return timings[len(timings) // 2]
+
+
+def main(runs):
+    for name, code in (('import', IMPORT), ('import + create_app', BOOT)):
+        print '{:<20} {:>8.1f} ms (median of {})'.format(
+            name, measure(code, runs) * 1000, runs)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -1 +1 @@
-from .flask_restful_graph import app
+from .application import create_app
@@ -0,0 +1,102 @@
+from flask import Flask
+from flask_restful import Api
+
+from . import settings
+from .backends import GraphPool
+from .cache import LRUBackend, ResponseCache
+from .coalescing import WriteCoalescer
+from .concurrency import GreenletExecutor, ThreadExecutor
+from .indexes import format_report, sync_indexes
+from .instrumentation import Metrics
+from .representations import GzipCompression, get_encoder, \
+    make_json_representation
+from .resource_factory import ResourceFactory
+from .routes import register_resources
+
+
+###############################################################################
+#                                                                             #
+#                Application factory                                          #
+#                                                                             #
+###############################################################################
+
+
+def get_executor(config):
+    """
+    Make the executor reading the parts of documents, if any
+    """
+    mode = config['CONCURRENT_READS']
+
+    if mode is None:
+        return None
+
+    if mode == 'gevent':
+        return GreenletExecutor(config['GRAPH_POOL_SIZE'])
+
+    if mode == 'threads':
+        return ThreadExecutor(config['GRAPH_POOL_SIZE'],
+                              config['CONCURRENT_READS_PER_REQUEST'])
+
+    raise ValueError('Unknown CONCURRENT_READS mode "{}"'.format(mode))
+
+
+def create_app(config=None, graph=None):
+    """
+    Create an app serving the resources of every model
+
+    Settings are read from `settings`, then from the file named by the
+    RESTFUL_GRAPH_SETTINGS environment variable, then from `config`. The
+    graph is a GraphBackend or py2neo Graph, by default a GraphPool which
+    only connects on the first request of each process.
+    """
+    app = Flask(__name__)
+    app.config.from_object(settings)
+    app.config.from_envvar('RESTFUL_GRAPH_SETTINGS', silent=True)
+
+    if config:
+        app.config.update(config)
+
+    if graph is None:
+        graph = GraphPool(app.config['GRAPH_POOL_SIZE'],
+                          app.config['GRAPH_POOL_TIMEOUT'],
+                          **app.config['GRAPH_SETTINGS'])
+
+    encode = get_encoder(app.config['JSON_ENCODER'])
+    cache = ResponseCache(LRUBackend(app.config['RESPONSE_CACHE_SIZE']),
+                          encode=encode)
+    coalescer = WriteCoalescer(app.config['COALESCE_MAX_BATCH'],
+                               app.config['COALESCE_WINDOW']) \
+        if app.config['COALESCE_WRITES'] else None
+    metrics = Metrics(app, cache=cache, coalescer=coalescer) \
+        if app.config['COLLECT_METRICS'] else None
+
+    # sizes measured by metrics are those sent
+    if app.config['GZIP_MIN_SIZE'] is not None:
+        GzipCompression(app, app.config['GZIP_MIN_SIZE'],
+                        app.config['GZIP_LEVEL'])
+
+    resource_factory = ResourceFactory(graph=graph, cache=cache,
+                                       metrics=metrics,
+                                       executor=get_executor(app.config),
+                                       coalescer=coalescer)
+
+    # creating indexes connects to the graph as the app is created
+    if app.config['SYNC_INDEXES']:
+        report = sync_indexes(resource_factory.graph)
+        for line in format_report(report, created=True):
+            app.logger.warning(line)
+
+    api = Api(app)
+    api.representations['application/json'] = \
+        make_json_representation(encode)
+
+    register_resources(api, resource_factory)
+
+    app.extensions['restful_graph'] = {
+        'graph': graph,
+        'cache': cache,
+        'metrics': metrics,
+        'resource_factory': resource_factory
+    }
+
+    return app
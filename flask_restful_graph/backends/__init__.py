@@ -0,0 +1,3 @@
+from .base import GraphBackend, GraphTransaction
+from .memory import MemoryBackend
+from .neo4j import GraphPool, Neo4jBackend, PoolTimeout
@@ -0,0 +1,129 @@
+###############################################################################
+#                                                                             #
+#                Backend interface                                            #
+#                                                                             #
+###############################################################################
+
+
+class GraphBackend(object):
+    """
+    Interface between the resources and the graph they expose
+
+    Documents are read as rows holding a primary node's `id`, `properties`,
+    `relationships` and `included` maps (and its `cursor` keyset when
+    paginated), as described by `query.compile_document_query`. Writes are
+    made in transactions.
+    """
+
+    def read_documents(self, model_name, parameters, **options):
+        """
+        Read the rows of a document
+
+        `options` are those of `query.compile_document_query`, and
+        `parameters` hold the `id`, `ids`, `filters`, `cursor` and `limit`
+        values they refer to.
+        """
+        raise NotImplementedError
+
+    def count_related(self, model_name, related_name, id):
+        """
+        Count the nodes related to the node `id` of a model, or return None
+        when the node is missing
+        """
+        raise NotImplementedError
+
+    def read_neighborhood(self, model_name, id, depth, limit, labels):
+        """
+        Read the nodes within `depth` hops of a node, as described by
+        `query.compile_neighborhood_query`
+        """
+        raise NotImplementedError
+
+    def read_path(self, model_name, id, target_model, target_id,
+                  max_length):
+        """
+        Read a shortest path between two nodes, as described by
+        `query.compile_path_query`
+        """
+        raise NotImplementedError
+
+    def export_nodes(self, model_name):
+        """
+        Read the `id` and `properties` of every node of a model, holding
+        a bounded number of them at once
+        """
+        raise NotImplementedError
+
+    def export_edges(self, model_name, related_name):
+        """
+        Read the `id` of every node of a model with the ids of the nodes
+        it is `related` to through a relationship, holding a bounded number
+        of nodes at once
+        """
+        raise NotImplementedError
+
+    def indexed_properties(self):
+        """
+        Return the (label, property) pairs with a single-property index
+        """
+        raise NotImplementedError
+
+    def constraints(self):
+        """
+        Return the (label, property) pairs with a uniqueness constraint
+        """
+        raise NotImplementedError
+
+    def create_index(self, label, prop_name, unique=False):
+        """
+        Index a property of the nodes with a label or, if `unique`,
+        constrain its values to be unique, which also indexes it
+        """
+        raise NotImplementedError
+
+    def begin(self):
+        """
+        Begin a GraphTransaction
+        """
+        raise NotImplementedError
+
+
+class GraphTransaction(object):
+    """
+    Writes (and reads) applied together by `commit` or not at all
+    """
+
+    def read_documents(self, model_name, parameters, **options):
+        raise NotImplementedError
+
+    def find_nodes(self, ids):
+        """
+        Return a dictionary of the labels of each node found by id
+        """
+        raise NotImplementedError
+
+    def create_node(self, model_name, properties, linkages):
+        """
+        Create a node linked to the related node ids of each relationship
+        in `linkages`, returning its id
+        """
+        raise NotImplementedError
+
+    def run_batch(self, model_name, kind, rows, related_name=None):
+        """
+        Apply one kind of write to a batch of rows
+
+        Kinds and rows are those of `query.compile_batch_query`. Returns a
+        record, holding the row's `key` (and `id` for 'create'), for each
+        row applied.
+        """
+        raise NotImplementedError
+
+    def commit(self):
+        raise NotImplementedError
+
+    def rollback(self):
+        raise NotImplementedError
+
+    def finished(self):
+        raise NotImplementedError
@@ -0,0 +1,699 @@
+from functools import cmp_to_key
+from numbers import Number
+from threading import RLock
+
+from py2neo import ConstraintError
+
+from ..models import BaseModel
+from ..query import EXPORT_ID, get_related_names, get_traversal_types, \
+    resolve_path
+from .base import GraphBackend, GraphTransaction
+
+
+###############################################################################
+#                                                                             #
+#                Comparing property values                                    #
+#                                                                             #
+###############################################################################
+
+
+def comparable(value, other):
+    """
+    Check whether two property values can be ordered, as in Cypher
+    """
+    if value is None or other is None:
+        return False
+
+    if isinstance(value, Number) and isinstance(other, Number):
+        return True
+
+    if isinstance(value, basestring) and isinstance(other, basestring):
+        return True
+
+    return type(value) is type(other)
+
+
+def matches_filter(value, operator, parameter):
+    if operator == 'prefix':
+        return isinstance(value, basestring) and \
+            isinstance(parameter, basestring) and value.startswith(parameter)
+
+    if not comparable(value, parameter):
+        return False
+
+    if operator == 'eq':
+        return value == parameter
+    if operator == 'lt':
+        return value < parameter
+    if operator == 'lte':
+        return value <= parameter
+    if operator == 'gt':
+        return value > parameter
+
+    return value >= parameter
+
+
+def compare_values(value, other):
+    """
+    Compare sort values in ascending order, where nulls sort last
+    """
+    if value is None or other is None:
+        return (value is None) - (other is None)
+
+    return cmp(value, other)
+
+
+def compare_keysets(sort):
+    """
+    Return a cmp func ordering keysets (sort values followed by the node id)
+    by a `sort` tuple of (property name, descending) pairs
+    """
+    def compare(keyset, other):
+        for index, (_, descending) in enumerate(sort):
+            order = compare_values(keyset[index], other[index])
+            if order:
+                return -order if descending else order
+
+        return cmp(keyset[-1], other[-1])
+
+    return compare
+
+
+###############################################################################
+#                                                                             #
+#                In-memory graph                                              #
+#                                                                             #
+###############################################################################
+
+
+class MemoryBackend(GraphBackend):
+    """
+    Hold a graph in dictionaries, for tests and profiling without Neo4j
+
+    Nodes are indexed by id and by label, relationships by their start and
+    end nodes, and the (label, property) pairs given as `indexes` or
+    `unique` by value, which `eq` filters look up instead of scanning the
+    label. Values of `unique` pairs are kept unique. Transactions hold a
+    lock until they are committed or rolled back, and undo their writes on
+    rollback.
+    """
+
+    def __init__(self, indexes=(), unique=()):
+        self.nodes = {}
+        self.labels = {}
+        self.outgoing = {}
+        self.incoming = {}
+        self.indexes = dict(
+            (index, {}) for index in set(indexes) | set(unique))
+        self.unique = frozenset(unique)
+        self.next_id = 0
+        self.lock = RLock()
+
+    def indexed_properties(self):
+        return frozenset(self.indexes)
+
+    def constraints(self):
+        return self.unique
+
+    def create_index(self, label, prop_name, unique=False):
+        with self.lock:
+            index = self.indexes.get((label, prop_name))
+
+            if index is None:
+                index = {}
+                for node_id in self.labels.get(label, ()):
+                    value = self.nodes[node_id][1].get(prop_name)
+                    if value is not None:
+                        index.setdefault(value, set()).add(node_id)
+
+            if unique and any(len(node_ids) > 1
+                              for node_ids in index.itervalues()):
+                raise ConstraintError(
+                    'Nodes with label {} share values of property "{}"'
+                    .format(label, prop_name))
+
+            self.indexes[label, prop_name] = index
+
+            if unique:
+                self.unique = self.unique | set([(label, prop_name)])
+
+    def begin(self):
+        return MemoryTransaction(self)
+
+    ###########################################################################
+    #                                                                         #
+    #           Reading documents                                             #
+
+    def read_documents(self, model_name, parameters, include=(),
+                       individual=False, related=None, page=None, fields=(),
+                       filters=(), sort=(), null_cursor=(),
+                       related_names=None):
+        fields = dict(fields)
+
+        with self.lock:
+            if related:
+                node_ids = self.match_related(
+                    model_name, related, parameters['id'])
+                if node_ids is None:
+                    return []
+            else:
+                node_ids = self.match_primary(
+                    model_name, individual, parameters, filters)
+
+            if page:
+                node_ids = self.cut_page(
+                    node_ids, page, sort, parameters.get('cursor', []),
+                    parameters['limit'])
+            else:
+                node_ids = sorted(node_ids)
+
+            if related and not node_ids:
+                row = {'id': None, 'properties': None,
+                       'relationships': {}, 'included': {}}
+                if page:
+                    row['cursor'] = [None] * (len(sort) + 1)
+                return [row]
+
+            if related_names is None:
+                related_names = get_related_names(
+                    model_name, include, fields)
+            deep_paths = sorted(path for path in include if len(path) > 1)
+            rows = []
+
+            for node_id in node_ids:
+                row = self.make_row(node_id, model_name, include, fields,
+                                    related_names, deep_paths)
+                if page:
+                    row['cursor'] = self.get_keyset(node_id, sort)
+                rows.append(row)
+
+            return rows
+
+    def count_related(self, model_name, related_name, id):
+        with self.lock:
+            if not self.has_node(id, model_name):
+                return None
+
+            return len(self.traverse(id, model_name, related_name))
+
+    def read_neighborhood(self, model_name, id, depth, limit, labels):
+        with self.lock:
+            if not self.has_node(id, model_name):
+                return []
+
+            distances = self.search(id, depth)
+            found = sorted(
+                (distance, node_id)
+                for node_id, (distance, _) in distances.iteritems()
+                if node_id != id and self.nodes[node_id][0] in labels)
+
+            if not found:
+                return [{'id': None, 'labels': None, 'properties': None,
+                         'distance': None}]
+
+            return [dict(self.project_node(node_id), distance=distance)
+                    for distance, node_id in found[:limit]]
+
+    def read_path(self, model_name, id, target_model, target_id,
+                  max_length):
+        with self.lock:
+            if not (self.has_node(id, model_name) and
+                    self.has_node(target_id, target_model)):
+                return []
+
+            distances = self.search(id, max_length, target_id)
+
+            if target_id not in distances:
+                return [{'nodes': None}]
+
+            path = [target_id]
+            while path[-1] != id:
+                path.append(distances[path[-1]][1])
+
+            return [{'nodes': [self.project_node(node_id)
+                               for node_id in reversed(path)]}]
+
+    def search(self, start_id, depth, target_id=None):
+        """
+        Search breadth first over model relationships in either direction
+
+        Returns the (distance, previous node id) of each node reached
+        within `depth` hops, stopping early once `target_id` is reached.
+        """
+        rel_types = get_traversal_types()
+        reached = {start_id: (0, None)}
+        frontier = [start_id]
+
+        for distance in range(1, depth + 1):
+            if target_id in reached:
+                break
+
+            next_frontier = []
+
+            for node_id in frontier:
+                neighbours = set()
+                for adjacency in (self.outgoing, self.incoming):
+                    for rel_type in rel_types:
+                        neighbours.update(
+                            adjacency.get(node_id, {}).get(rel_type, ()))
+
+                for neighbour in sorted(neighbours):
+                    if neighbour not in reached:
+                        reached[neighbour] = distance, node_id
+                        next_frontier.append(neighbour)
+
+            frontier = next_frontier
+
+        return reached
+
+    def project_node(self, node_id):
+        label, properties = self.nodes[node_id]
+        return {'id': node_id, 'labels': [label],
+                'properties': dict(properties)}
+
+    def export_nodes(self, model_name):
+        with self.lock:
+            node_ids = sorted(self.labels.get(model_name, ()))
+
+        # the lock is not held between nodes, as a database cursor is not
+        for node_id in node_ids:
+            with self.lock:
+                if self.has_node(node_id, model_name):
+                    node = {'id': node_id,
+                            'properties': dict(self.nodes[node_id][1])}
+                else:
+                    node = None
+
+            if node is not None:
+                yield node
+
+    def export_edges(self, model_name, related_name):
+        with self.lock:
+            node_ids = sorted(self.labels.get(model_name, ()))
+
+        for node_id in node_ids:
+            with self.lock:
+                if self.has_node(node_id, model_name):
+                    edge = {'id': node_id, 'related': sorted(self.traverse(
+                        node_id, model_name, related_name))}
+                else:
+                    edge = None
+
+            if edge is not None:
+                yield edge
+
+    def has_node(self, node_id, label):
+        return node_id in self.nodes and self.nodes[node_id][0] == label
+
+    def match_related(self, model_name, related, source_id):
+        """
+        Return the ids of nodes related to a source, or None for a missing
+        source
+        """
+        source_model, related_name = related
+
+        if not self.has_node(source_id, source_model):
+            return None
+
+        return self.traverse(source_id, source_model, related_name)
+
+    def match_primary(self, model_name, individual, parameters, filters):
+        if individual == 'many':
+            node_ids = set(node_id for node_id in parameters['ids']
+                           if self.has_node(node_id, model_name))
+        elif individual:
+            node_ids = set([parameters['id']]) \
+                if self.has_node(parameters['id'], model_name) else set()
+        else:
+            node_ids = self.labels.get(model_name, set())
+
+        values = parameters.get('filters', [])
+
+        for (prop_name, operator), value in zip(filters, values):
+            index = self.indexes.get((model_name, prop_name))
+
+            if operator == 'eq' and index is not None:
+                node_ids = node_ids & index.get(value, set())
+            else:
+                node_ids = set(
+                    node_id for node_id in node_ids
+                    if matches_filter(self.nodes[node_id][1].get(prop_name),
+                                      operator, value))
+
+        return node_ids
+
+    def get_keyset(self, node_id, sort):
+        properties = self.nodes[node_id][1]
+        return [properties.get(prop_name) for prop_name, _ in sort] + \
+            [node_id]
+
+    def cut_page(self, node_ids, page, sort, cursor, limit):
+        """
+        Order nodes by their keyset and cut the page after (or before) the
+        cursor, in page order
+        """
+        compare = compare_keysets(sort)
+        keysets = sorted((self.get_keyset(node_id, sort)
+                          for node_id in node_ids), key=cmp_to_key(compare))
+
+        if page == 'after':
+            keysets = [keyset for keyset in keysets
+                       if compare(keyset, cursor) > 0][:limit]
+        elif page == 'before':
+            keysets = [keyset for keyset in keysets
+                       if compare(keyset, cursor) < 0][-limit:]
+        else:
+            keysets = keysets[:limit]
+
+        return [keyset[-1] for keyset in keysets]
+
+    def project(self, node_id, model_name, fields):
+        properties = self.nodes[node_id][1]
+
+        if model_name not in fields:
+            return dict(properties)
+
+        return dict((prop_name, properties.get(prop_name))
+                    for prop_name in fields[model_name][0])
+
+    def make_row(self, node_id, model_name, include, fields, related_names,
+                 deep_paths):
+        row = {'id': node_id,
+               'properties': self.project(node_id, model_name, fields),
+               'relationships': {},
+               'included': {}}
+
+        for related_name in related_names:
+            related_model = BaseModel.get_relationship_pattern(
+                model_name, related_name)[0]
+            related_ids = sorted(
+                self.traverse(node_id, model_name, related_name))
+
+            if (related_name,) in include:
+                row['relationships'][related_name] = [
+                    {'id': related_id, 'properties': self.project(
+                        related_id, related_model, fields)}
+                    for related_id in related_ids]
+            else:
+                row['relationships'][related_name] = [
+                    {'id': related_id} for related_id in related_ids]
+
+        for path in deep_paths:
+            models = [model_name] + resolve_path(model_name, path)
+            parents = set([node_id])
+
+            # each hop may traverse relationships of the hops before it
+            for depth, related_name in enumerate(path[:-1]):
+                parents = set(
+                    reached for parent in parents
+                    for reached in self.traverse(
+                        parent, models[depth], related_name))
+
+            row['included']['.'.join(path)] = [
+                {'parent': parent, 'id': child,
+                 'properties': self.project(child, models[-1], fields)}
+                for parent in sorted(parents)
+                for child in sorted(
+                    self.traverse(parent, models[-2], path[-1]))]
+
+        return row
+
+    def traverse(self, node_id, model_name, related_name):
+        """
+        Return the ids of the nodes related to a node by a relationship
+        """
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+        related_ids = set()
+
+        if direction >= 0:
+            related_ids.update(
+                self.outgoing.get(node_id, {}).get(rel_type, ()))
+        if direction <= 0:
+            related_ids.update(
+                self.incoming.get(node_id, {}).get(rel_type, ()))
+
+        return set(related_id for related_id in related_ids
+                   if self.nodes[related_id][0] == related_model)
+
+    ###########################################################################
+    #                                                                         #
+    #           Writing, with undo log                                        #
+
+    def add_node(self, label, properties, undo, node_id=None):
+        if node_id is None:
+            node_id = self.next_id
+            self.next_id += 1
+
+        self.nodes[node_id] = label, {}
+        self.labels.setdefault(label, set()).add(node_id)
+        undo.append(lambda: self.remove_node(node_id, []))
+
+        for prop_name, value in properties.iteritems():
+            self.set_property(node_id, prop_name, value, [])
+
+        return node_id
+
+    def remove_node(self, node_id, undo):
+        """
+        Remove a node along with its relationships
+        """
+        label, properties = self.nodes[node_id]
+        properties = dict(properties)
+
+        for rel_type, end_ids in self.outgoing.get(node_id, {}).items():
+            for end_id in list(end_ids):
+                self.remove_edge(node_id, rel_type, end_id, undo)
+        for rel_type, start_ids in self.incoming.get(node_id, {}).items():
+            for start_id in list(start_ids):
+                self.remove_edge(start_id, rel_type, node_id, undo)
+
+        for prop_name in list(properties):
+            self.set_property(node_id, prop_name, None, [])
+
+        del self.nodes[node_id]
+        self.labels[label].discard(node_id)
+        self.outgoing.pop(node_id, None)
+        self.incoming.pop(node_id, None)
+
+        undo.append(lambda: self.add_node(
+            label, properties, [], node_id=node_id))
+
+    def set_property(self, node_id, prop_name, value, undo):
+        """
+        Set a property, removing it when the value is null
+        """
+        label, properties = self.nodes[node_id]
+        old_value = properties.get(prop_name)
+        index = self.indexes.get((label, prop_name))
+
+        if (label, prop_name) in self.unique and value is not None and \
+                index.get(value, set()) - set([node_id]):
+            raise ConstraintError(
+                'Node already exists with label {} and property "{}"={!r}'
+                .format(label, prop_name, value))
+
+        if index is not None and old_value is not None:
+            index[old_value].discard(node_id)
+            if not index[old_value]:
+                del index[old_value]
+
+        if value is None:
+            properties.pop(prop_name, None)
+        else:
+            properties[prop_name] = value
+            if index is not None:
+                index.setdefault(value, set()).add(node_id)
+
+        undo.append(lambda: self.set_property(
+            node_id, prop_name, old_value, []))
+
+    def add_edge(self, start_id, rel_type, end_id, undo):
+        end_ids = self.outgoing.setdefault(start_id, {}).setdefault(
+            rel_type, set())
+
+        if end_id in end_ids:
+            return
+
+        end_ids.add(end_id)
+        self.incoming.setdefault(end_id, {}).setdefault(
+            rel_type, set()).add(start_id)
+        undo.append(lambda: self.remove_edge(start_id, rel_type, end_id, []))
+
+    def remove_edge(self, start_id, rel_type, end_id, undo):
+        end_ids = self.outgoing.get(start_id, {}).get(rel_type, set())
+
+        if end_id not in end_ids:
+            return
+
+        end_ids.discard(end_id)
+        self.incoming[end_id][rel_type].discard(start_id)
+        undo.append(lambda: self.add_edge(start_id, rel_type, end_id, []))
+
+    def get_neighbours(self, node_id):
+        """
+        Return the ids of the nodes related to a node by any relationship
+        """
+        neighbours = set()
+
+        for adjacency in (self.outgoing, self.incoming):
+            for node_ids in adjacency.get(node_id, {}).itervalues():
+                neighbours.update(node_ids)
+
+        neighbours.discard(node_id)
+        return neighbours
+
+    def get_edges(self, node_id, model_name, related_name, related_id=None):
+        """
+        List the (start, type, end) relationships of a node's relationship,
+        optionally only those to one related node
+        """
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+        edges = []
+
+        for related in self.traverse(node_id, model_name, related_name):
+            if related_id is not None and related != related_id:
+                continue
+            if direction >= 0 and related in \
+                    self.outgoing.get(node_id, {}).get(rel_type, ()):
+                edges.append((node_id, rel_type, related))
+            if direction <= 0 and node_id in \
+                    self.outgoing.get(related, {}).get(rel_type, ()):
+                edges.append((related, rel_type, node_id))
+
+        return edges
+
+
+class MemoryTransaction(GraphTransaction):
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.undo = []
+        self.done = False
+        backend.lock.acquire()
+
+    def read_documents(self, model_name, parameters, **options):
+        return self.backend.read_documents(model_name, parameters, **options)
+
+    def find_nodes(self, ids):
+        return dict((node_id, [self.backend.nodes[node_id][0]])
+                    for node_id in ids if node_id in self.backend.nodes)
+
+    def link(self, node_id, model_name, related_name, related_id):
+        """
+        Link a node to a related node, like MERGE does
+        """
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+
+        if direction < 0:
+            self.backend.add_edge(related_id, rel_type, node_id, self.undo)
+        else:
+            self.backend.add_edge(node_id, rel_type, related_id, self.undo)
+
+    def merge_node(self, label, source_id):
+        """
+        Find the node imported with an exported id, like MERGE does
+        """
+        backend = self.backend
+        index = backend.indexes.get((label, EXPORT_ID))
+
+        if index is not None:
+            node_ids = index.get(source_id, ())
+        else:
+            node_ids = [node_id for node_id in backend.labels.get(label, ())
+                        if backend.nodes[node_id][1].get(EXPORT_ID) ==
+                        source_id]
+
+        if node_ids:
+            return min(node_ids)
+
+        return backend.add_node(label, {EXPORT_ID: source_id}, self.undo)
+
+    def create_node(self, model_name, properties, linkages):
+        backend = self.backend
+        node_id = backend.add_node(model_name, properties, self.undo)
+
+        for related_name, related_ids in sorted(linkages.iteritems()):
+            related_model = BaseModel.get_relationship_pattern(
+                model_name, related_name)[0]
+
+            for related_id in related_ids:
+                if backend.has_node(related_id, related_model):
+                    self.link(node_id, model_name, related_name, related_id)
+
+        return node_id
+
+    def run_batch(self, model_name, kind, rows, related_name=None):
+        backend = self.backend
+        records = []
+
+        for row in rows:
+            if kind == 'create':
+                records.append({'key': row['key'], 'id': backend.add_node(
+                    model_name, row['properties'], self.undo)})
+                continue
+
+            if kind == 'import':
+                node_id = self.merge_node(model_name, row['source'])
+                for prop_name, value in row['properties'].iteritems():
+                    backend.set_property(node_id, prop_name, value, self.undo)
+                records.append({'key': row['key'], 'id': node_id})
+                continue
+
+            if kind == 'import_link':
+                related_model = BaseModel.get_relationship_pattern(
+                    model_name, related_name)[0]
+                self.link(self.merge_node(model_name, row['source']),
+                          model_name, related_name,
+                          self.merge_node(related_model, row['related']))
+                records.append({'key': row['key']})
+                continue
+
+            if not backend.has_node(row['id'], model_name):
+                continue
+
+            if kind == 'update':
+                for prop_name, value in row['properties'].iteritems():
+                    backend.set_property(
+                        row['id'], prop_name, value, self.undo)
+            elif kind == 'delete':
+                neighbours = backend.get_neighbours(row['id'])
+                backend.remove_node(row['id'], self.undo)
+                records.append({'key': row['key'], 'neighbours': [
+                    {'id': node_id, 'labels': [backend.nodes[node_id][0]]}
+                    for node_id in sorted(neighbours)]})
+                continue
+            elif kind == 'link':
+                related_model = BaseModel.get_relationship_pattern(
+                    model_name, related_name)[0]
+                if not backend.has_node(row['related'], related_model):
+                    continue
+                self.link(row['id'], model_name, related_name,
+                          row['related'])
+            elif kind in ('unlink', 'clear'):
+                for edge in backend.get_edges(
+                        row['id'], model_name, related_name,
+                        row['related'] if kind == 'unlink' else None):
+                    backend.remove_edge(*edge, undo=self.undo)
+
+            records.append({'key': row['key']})
+
+        return records
+
+    def commit(self):
+        self.finish()
+
+    def rollback(self):
+        while self.undo:
+            self.undo.pop()()
+        self.finish()
+
+    def finish(self):
+        if not self.done:
+            self.done = True
+            self.backend.lock.release()
+
+    def finished(self):
+        return self.done
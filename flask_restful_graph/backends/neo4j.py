@@ -0,0 +1,288 @@
+import os
+import re
+from threading import Condition, Lock
+import time
+
+from py2neo import Graph
+from werkzeug.exceptions import ServiceUnavailable
+
+from ..models import BaseModel
+from ..query import FIND_NODES_QUERY, get_batch_query, get_count_query, \
+    get_create_query, get_document_query, get_export_query, \
+    get_traversal_query, quote
+from .base import GraphBackend, GraphTransaction
+
+
+# records read by each statement of an export
+EXPORT_PAGE_SIZE = 1000
+
+# guards the per-process state of pools, which has no lock of its own yet
+process_lock = Lock()
+
+INDEX_DESCRIPTION = re.compile(r'^INDEX ON :(\w+)\((\w+)\)$')
+CONSTRAINT_DESCRIPTION = re.compile(
+    r'^CONSTRAINT ON \( \w+:(\w+) \) ASSERT \w+\.(\w+) IS UNIQUE$')
+
+
+###############################################################################
+#                                                                             #
+#                Neo4j through py2neo                                         #
+#                                                                             #
+###############################################################################
+
+
+class Neo4jBackend(GraphBackend):
+    """
+    Run compiled Cypher statements against a py2neo Graph
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.indexes = None
+        self.unique = None
+
+    def read_documents(self, model_name, parameters, **options):
+        return self.graph.run(
+            get_document_query(model_name, **options), **parameters)
+
+    def count_related(self, model_name, related_name, id):
+        return self.graph.run(
+            get_count_query(model_name, related_name), id=id).evaluate()
+
+    def read_neighborhood(self, model_name, id, depth, limit, labels):
+        return self.graph.run(
+            get_traversal_query('neighborhood', model_name, depth, labels),
+            id=id, limit=limit)
+
+    def read_path(self, model_name, id, target_model, target_id,
+                  max_length):
+        return self.graph.run(
+            get_traversal_query('path', model_name, target_model,
+                                max_length),
+            id=id, target=target_id)
+
+    def export_nodes(self, model_name):
+        return self.read_pages(get_export_query(model_name))
+
+    def export_edges(self, model_name, related_name):
+        return self.read_pages(get_export_query(model_name, related_name))
+
+    def read_pages(self, statement):
+        """
+        Read every record of an export statement paged by node id in turn
+
+        Each page is read by a statement of its own, so memory holds one
+        page of records and a pooled connection is only held while a page
+        is read.
+        """
+        after = -1
+
+        while True:
+            records = list(self.graph.run(
+                statement, after=after, limit=EXPORT_PAGE_SIZE))
+
+            for record in records:
+                yield record
+
+            if len(records) < EXPORT_PAGE_SIZE:
+                return
+
+            after = records[-1]['id']
+
+    def indexed_properties(self):
+        # read from the database on first use
+        if self.indexes is None:
+            matches = [INDEX_DESCRIPTION.match(record['description'])
+                       for record in self.graph.run('CALL db.indexes()')]
+            self.indexes = frozenset(
+                match.groups() for match in matches if match)
+
+        return self.indexes
+
+    def constraints(self):
+        # read from the database on first use
+        if self.unique is None:
+            matches = [CONSTRAINT_DESCRIPTION.match(record['description'])
+                       for record in self.graph.run('CALL db.constraints()')]
+            self.unique = frozenset(
+                match.groups() for match in matches if match)
+
+        return self.unique
+
+    def create_index(self, label, prop_name, unique=False):
+        pair = label, prop_name
+
+        if not unique:
+            self.graph.run('CREATE INDEX ON :{}({})'.format(
+                quote(label), quote(prop_name)))
+        elif pair not in self.constraints():
+            # a constraint cannot be created over an index of its own
+            if pair in self.indexed_properties():
+                self.graph.run('DROP INDEX ON :{}({})'.format(
+                    quote(label), quote(prop_name)))
+
+            self.graph.run('CREATE CONSTRAINT ON (n:{}) ASSERT n.{} IS UNIQUE'
+                           .format(quote(label), quote(prop_name)))
+
+        # read again on next use
+        self.indexes = None
+        self.unique = None
+
+    def begin(self):
+        return Neo4jTransaction(self.graph.begin())
+
+
+class Neo4jTransaction(GraphTransaction):
+
+    def __init__(self, tx):
+        self.tx = tx
+
+    def read_documents(self, model_name, parameters, **options):
+        return self.tx.run(
+            get_document_query(model_name, **options), **parameters)
+
+    def find_nodes(self, ids):
+        return dict((record['id'], record['labels'])
+                    for record in self.tx.run(FIND_NODES_QUERY, ids=ids))
+
+    def create_node(self, model_name, properties, linkages):
+        # the statement takes related ids for every relationship in order
+        related_names = sorted(BaseModel.related_models.get(model_name, {}))
+
+        return self.tx.run(
+            get_create_query(model_name), properties=properties,
+            related=[linkages.get(related_name, [])
+                     for related_name in related_names]
+        ).evaluate()
+
+    def run_batch(self, model_name, kind, rows, related_name=None):
+        return self.tx.run(
+            get_batch_query(model_name, kind, related_name), rows=rows)
+
+    def commit(self):
+        self.tx.commit()
+
+    def rollback(self):
+        self.tx.rollback()
+
+    def finished(self):
+        return self.tx.finished()
+
+
+###############################################################################
+#                                                                             #
+#                Connection pool                                              #
+#                                                                             #
+###############################################################################
+
+
+class PoolTimeout(ServiceUnavailable):
+    description = 'Timed out waiting for a graph connection'
+
+
+class GraphPool(object):
+    """
+    Stand in for a py2neo Graph that connects on first use in each process
+
+    Creating the pool does not connect, so an app can be created before a
+    pre-fork server forks its workers, which then connect on their first
+    request. At most `size` statements or transactions use the connection
+    at once; others wait up to `timeout` seconds for one of them to finish,
+    then fail with 503. `settings` are passed on to py2neo's Graph.
+    """
+
+    def __init__(self, size=10, timeout=30.0, **settings):
+        self.size = size
+        self.timeout = timeout
+        self.settings = settings
+        self.graph = None
+        self.pid = None
+
+    def get_graph(self):
+        # the state of a connection made before forking is not shared
+        if self.pid != os.getpid():
+            with process_lock:
+                if self.pid != os.getpid():
+                    self.lock = Lock()
+                    self.available = Condition(Lock())
+                    self.in_use = 0
+                    self.graph = None
+                    self.pid = os.getpid()
+
+        if self.graph is None:
+            with self.lock:
+                if self.graph is None:
+                    self.graph = Graph(**self.settings)
+
+        return self.graph
+
+    def acquire(self):
+        graph = self.get_graph()
+        deadline = time.time() + self.timeout
+
+        with self.available:
+            while self.in_use >= self.size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise PoolTimeout()
+                self.available.wait(remaining)
+
+            self.in_use += 1
+
+        return graph
+
+    def release(self):
+        with self.available:
+            self.in_use -= 1
+            self.available.notify()
+
+    def run(self, statement, **parameters):
+        graph = self.acquire()
+
+        try:
+            return graph.run(statement, **parameters)
+        finally:
+            self.release()
+
+    def begin(self):
+        graph = self.acquire()
+
+        try:
+            return PooledTransaction(self, graph.begin())
+        except Exception:
+            self.release()
+            raise
+
+
+class PooledTransaction(object):
+    """
+    A py2neo transaction holding its place in a GraphPool until finished
+    """
+
+    def __init__(self, pool, tx):
+        self.pool = pool
+        self.tx = tx
+        self.released = False
+
+    def run(self, statement, **parameters):
+        return self.tx.run(statement, **parameters)
+
+    def commit(self):
+        try:
+            self.tx.commit()
+        finally:
+            self.release()
+
+    def rollback(self):
+        try:
+            self.tx.rollback()
+        finally:
+            self.release()
+
+    def finished(self):
+        return self.tx.finished()
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.pool.release()
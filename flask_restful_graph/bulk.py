@@ -0,0 +1,272 @@
+from itertools import islice
+import argparse
+import json
+import os
+import sys
+
+from .models import BaseModel
+from .operations import get_model_name, load_attributes
+from .query import EXPORT_ID
+
+
+###############################################################################
+#                                                                             #
+#                Exporting NDJSON                                             #
+#                                                                             #
+###############################################################################
+
+
+def get_exported_relationships(model_name):
+    """
+    List the relationships exported with a model, those pointing away from
+    it or undirected, so that each relationship is exported once
+    """
+    return [related_name for related_name
+            in sorted(BaseModel.related_models.get(model_name, {}))
+            if BaseModel.get_relationship_pattern(
+                model_name, related_name)[2] >= 0]
+
+
+def export_lines(graph, model_names, encode):
+    """
+    Yield an NDJSON line for every node of the models, then for every
+    relationship they export
+
+    Node lines hold the node's `type`, `id` and `attributes`; relationship
+    lines hold the `type` and `id` of the node, the name of the
+    `relationship` and the identifier of the `related` node. Nodes and
+    relationships are written as the backend reads them, so memory holds
+    one line at a time. Attributes are the stored values of the model's
+    properties, under their attribute names, rather than dumped values,
+    which leave out those failing validation: a backup keeps every value,
+    and values that do not validate fail its import.
+    """
+    for model_name in model_names:
+        type = BaseModel.plans[model_name].type
+        field_names = sorted(BaseModel.field_names[model_name].iteritems())
+
+        for node in graph.export_nodes(model_name):
+            properties = node['properties']
+            attributes = dict(
+                (attribute, properties[prop_name])
+                for attribute, prop_name in field_names
+                if properties.get(prop_name) is not None)
+
+            yield encode({'type': type, 'id': str(node['id']),
+                          'attributes': attributes}) + '\n'
+
+    for model_name in model_names:
+        type = BaseModel.plans[model_name].type
+
+        for related_name in get_exported_relationships(model_name):
+            related_type = BaseModel.plans[
+                BaseModel.get_relationship_pattern(
+                    model_name, related_name)[0]].type
+
+            for edges in graph.export_edges(model_name, related_name):
+                for related_id in edges['related']:
+                    yield encode({
+                        'type': type, 'id': str(edges['id']),
+                        'relationship': related_name,
+                        'related': {'type': related_type,
+                                    'id': str(related_id)}
+                    }) + '\n'
+
+
+###############################################################################
+#                                                                             #
+#                Importing NDJSON                                             #
+#                                                                             #
+###############################################################################
+
+
+def parse_line(line):
+    """
+    Parse and validate an exported line into the (model name, batch kind,
+    related name) of its write and the row it writes
+    """
+    try:
+        item = json.loads(line)
+        model_name = get_model_name(item['type'])
+        source_id = item['id']
+
+        if not isinstance(source_id, basestring):
+            raise ValueError('Ids must be strings')
+
+        if 'relationship' not in item:
+            return (model_name, 'import', None), {
+                'source': source_id,
+                'properties': load_attributes(
+                    model_name, item.get('attributes', {}))}
+
+        related_name = item['relationship']
+        related_models = BaseModel.related_models.get(model_name, {})
+
+        if related_name not in related_models:
+            raise ValueError('Unknown relationship "{}"'.format(related_name))
+
+        related_model = BaseModel.get_relationship_pattern(
+            model_name, related_name)[0]
+
+        if get_model_name(item['related']['type']) != related_model:
+            raise ValueError('Relationship "{}" links to type {}'.format(
+                related_name, BaseModel.plans[related_model].type))
+
+        if not isinstance(item['related']['id'], basestring):
+            raise ValueError('Ids must be strings')
+
+        return (model_name, 'import_link', related_name), {
+            'source': source_id, 'related': item['related']['id']}
+
+    except (KeyError, TypeError) as e:
+        raise ValueError('Missing member {}'.format(e))
+
+
+def import_batch(graph, lines, first_number):
+    """
+    Validate a batch of lines, then write it in one transaction with one
+    UNWIND statement for each kind of write
+    """
+    batches = {}
+
+    for number, line in enumerate(lines, first_number):
+        if not line.strip():
+            continue
+
+        try:
+            key, row = parse_line(line)
+        except ValueError as e:
+            raise ValueError('Line {}: {}'.format(number, e.message))
+
+        row['key'] = number
+        batches.setdefault(key, []).append(row)
+
+    tx = graph.begin()
+
+    try:
+        # nodes are written before links, which would otherwise merge
+        # placeholders for them
+        for (model_name, kind, related_name), rows in sorted(
+                batches.iteritems(), key=lambda item: item[0][1]):
+            list(tx.run_batch(model_name, kind, rows, related_name))
+
+        tx.commit()
+    except Exception:
+        if not tx.finished():
+            tx.rollback()
+        raise
+
+
+def read_checkpoint(path):
+    """
+    Return the number of lines a checkpoint records as imported
+    """
+    if path is None or not os.path.exists(path):
+        return 0
+
+    with open(path) as checkpoint:
+        return json.load(checkpoint)['line']
+
+
+def write_checkpoint(path, line):
+    # replaced in one step, so a failure never leaves half a checkpoint
+    with open(path + '.tmp', 'w') as checkpoint:
+        json.dump({'line': line}, checkpoint)
+
+    os.rename(path + '.tmp', path)
+
+
+def import_lines(graph, lines, batch_size=1000, checkpoint=None):
+    """
+    Import exported NDJSON lines in batches of `batch_size`, returning the
+    number of lines imported
+
+    Nodes are merged on the id they were exported with, kept in their
+    EXPORT_ID property, and relationships merged between them, creating
+    nodes not imported yet. Importing a line twice does not change the
+    graph, so lines can come in any order and a failed import can be run
+    again. With a `checkpoint` path, the number of lines imported is
+    recorded after each batch and the lines up to it are skipped when the
+    import is run again. Each batch is validated before it is written.
+    """
+    for model_name in sorted(BaseModel.plans):
+        if (model_name, EXPORT_ID) not in graph.indexed_properties():
+            graph.create_index(model_name, EXPORT_ID)
+
+    line_number = read_checkpoint(checkpoint)
+    lines = islice(lines, line_number, None)
+
+    while True:
+        batch = list(islice(lines, batch_size))
+
+        if not batch:
+            return line_number
+
+        import_batch(graph, batch, line_number + 1)
+        line_number += len(batch)
+
+        if checkpoint is not None:
+            write_checkpoint(checkpoint, line_number)
+
+
+###############################################################################
+#                                                                             #
+#                Command line                                                 #
+#                                                                             #
+###############################################################################
+
+
+def main(args=None):
+    """
+    Export models of the configured graph to standard output, or import an
+    export file into it
+    """
+    from .application import create_app
+
+    parser = argparse.ArgumentParser(
+        prog='python -m flask_restful_graph.bulk',
+        description='Export or import nodes and relationships as NDJSON.')
+    commands = parser.add_subparsers(dest='command')
+
+    export_parser = commands.add_parser(
+        'export', help='write nodes and relationships to standard output')
+    export_parser.add_argument(
+        'types', nargs='*', help='types to export, by default all')
+
+    import_parser = commands.add_parser(
+        'import', help='merge an exported file into the graph')
+    import_parser.add_argument('path', help='NDJSON file to import')
+    import_parser.add_argument(
+        '--batch-size', type=int, default=1000,
+        help='lines written per transaction (default 1000)')
+    import_parser.add_argument(
+        '--checkpoint', help='file recording the lines imported, to '
+                             'resume from after a failure')
+
+    options = parser.parse_args(args)
+
+    app = create_app()
+    graph = app.extensions['restful_graph']['resource_factory'].graph
+
+    if options.command == 'export':
+        model_names = [get_model_name(type) for type in options.types] or \
+            sorted(BaseModel.plans)
+
+        for line in export_lines(graph, model_names,
+                                 app.extensions['restful_graph']['cache']
+                                 .encode):
+            sys.stdout.write(line)
+
+        return 0
+
+    with open(options.path) as lines:
+        count = import_lines(graph, lines, options.batch_size,
+                             options.checkpoint)
+
+    print >> sys.stderr, 'Imported {} lines'.format(count)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
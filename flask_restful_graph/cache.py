@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from functools import wraps
+from hashlib import sha1
+from itertools import chain
+from threading import Lock
+
+from flask import current_app, request
+
+from .representations import make_json_encoder
+
+
+###############################################################################
+#                                                                             #
+#                Cache backends                                               #
+#                                                                             #
+###############################################################################
+
+
+class LRUBackend(object):
+    """
+    In-process store of cached responses, evicting the least recently used
+
+    Each entry is stored with the tags naming what its document depends on,
+    so invalidating a tag drops every entry stored with it. Other backends
+    only need the same `get`, `set`, `invalidate` and `clear` methods.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.tagged = {}
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                entry, tags = self.entries.pop(key)
+            except KeyError:
+                return None
+
+            self.entries[key] = entry, tags
+            return entry
+
+    def set(self, key, entry, tags):
+        with self.lock:
+            self.remove(key)
+
+            if self.max_entries < 1:
+                return
+
+            while len(self.entries) >= self.max_entries:
+                self.remove(next(iter(self.entries)))
+
+            self.entries[key] = entry, tags
+            for tag in tags:
+                self.tagged.setdefault(tag, set()).add(key)
+
+    def invalidate(self, tags):
+        """
+        Drop the entries stored with any of the tags, returning their count
+        """
+        with self.lock:
+            keys = set(chain.from_iterable(
+                self.tagged.get(tag, ()) for tag in tags))
+
+            for key in keys:
+                self.remove(key)
+
+            return len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tagged.clear()
+
+    def remove(self, key):
+        if key not in self.entries:
+            return
+
+        _, tags = self.entries.pop(key)
+
+        for tag in tags:
+            keys = self.tagged[tag]
+            keys.discard(key)
+            if not keys:
+                del self.tagged[tag]
+
+
+###############################################################################
+#                                                                             #
+#                Response cache                                               #
+#                                                                             #
+###############################################################################
+
+
+def node_tag(type, id):
+    return '{}/{}'.format(type.lower(), id)
+
+
+def collection_tag(type):
+    return type.lower()
+
+
+def get_document_tags(document):
+    """
+    Tag a document with every resource it shows, including linkage
+    """
+    data = document.get('data')
+    resources = data if isinstance(data, list) else [data]
+    tags = set()
+
+    for resource in chain(resources, document.get('included', ())):
+        if resource is None:
+            continue
+
+        tags.add(node_tag(resource['type'], resource['id']))
+
+        for relationship in resource.get('relationships', {}).itervalues():
+            linkage = relationship['data']
+            for identifier in linkage if isinstance(linkage, list) \
+                    else [linkage]:
+                if identifier is not None:
+                    tags.add(node_tag(identifier['type'], identifier['id']))
+
+    return tags
+
+
+class ResponseCache(object):
+    """
+    Cache of serialized GET documents, with strong ETags
+
+    A cached document is tagged with the nodes it shows, the node its URL
+    names and, for collections, its type. Writes made through the API
+    invalidate the nodes they touch and the collections of their types;
+    writes made to the graph by other means are not seen. Documents are
+    serialized with `encode`, as the Api's JSON representation does.
+    """
+
+    def __init__(self, backend=None, encode=None):
+        self.backend = backend if backend is not None else LRUBackend()
+        self.encode = encode if encode is not None else make_json_encoder()
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self.generation = 0
+        self.lock = Lock()
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def cached(self, func, model_name, collection=False):
+        """
+        Wrap a GET handler of a model's documents with the cache
+
+        Only documents returned as dictionaries are cached; error and
+        streamed responses pass through.
+        """
+        cache = self
+
+        @wraps(func)
+        def get(self, *args, **kwargs):
+            key = request.url
+            entry = cache.backend.get(key)
+
+            if entry is not None:
+                cache.count('hits')
+                return make_cached_response(*entry)
+
+            cache.count('misses')
+            generation = cache.generation
+            document = func(self, *args, **kwargs)
+
+            if not isinstance(document, dict):
+                return document
+
+            data = cache.encode(document) + '\n'
+            etag = sha1(data).hexdigest()
+
+            tags = get_document_tags(document)
+            if 'id' in kwargs:
+                tags.add(node_tag(model_name, kwargs['id']))
+            if collection:
+                tags.add(collection_tag(model_name))
+
+            # a write invalidating while the document was read may have
+            # made it stale already; one invalidating from now on waits for
+            # the lock, then drops the entry
+            with cache.lock:
+                if generation == cache.generation:
+                    cache.backend.set(key, (etag, data), tags)
+
+            return make_cached_response(etag, data)
+
+        return get
+
+    def invalidate(self, nodes):
+        """
+        Drop cached documents showing any of the (model name, id) nodes, or
+        listing their types
+        """
+        tags = set()
+
+        for model_name, node_id in nodes:
+            tags.add(node_tag(model_name, node_id))
+            tags.add(collection_tag(model_name))
+
+        if not tags:
+            return
+
+        with self.lock:
+            self.generation += 1
+
+        self.count('invalidations', self.backend.invalidate(tags))
+
+
+def make_cached_response(etag, data):
+    """
+    Make a response for a cached document, answering If-None-Match with 304
+    """
+    response = current_app.response_class(data, mimetype='application/json')
+    response.set_etag(etag)
+
+    return response.make_conditional(request)
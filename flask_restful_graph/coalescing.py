@@ -0,0 +1,194 @@
+from threading import Event, Lock
+import sys
+import time
+
+from py2neo import ConstraintError
+
+from .instrumentation import Histogram
+from .operations import NodesNotFound, apply_linkages, get_missing_nodes
+
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5)
+
+
+###############################################################################
+#                                                                             #
+#                Group commit                                                 #
+#                                                                             #
+###############################################################################
+
+
+class PendingCreate(object):
+    """
+    A validated create waiting for the batch it joined to be committed
+    """
+
+    def __init__(self, model_name, properties, linkages):
+        self.model_name = model_name
+        self.properties = properties
+        self.linkages = linkages
+        self.node_id = None
+        self.error = None
+
+
+class Batch(object):
+    """
+    Creates committed together, and the events their requests wait on
+    """
+
+    def __init__(self):
+        self.items = []
+        self.full = Event()
+        self.done = Event()
+
+
+class WriteCoalescer(object):
+    """
+    Commit the creates of concurrent requests together, one transaction per
+    batch
+
+    The first create to find no open batch opens one and leads it: it waits
+    until `max_batch` creates have joined or `window` seconds have passed,
+    closes the batch and writes it, while the others wait for their
+    results. Creates arriving meanwhile open the next batch, so batches are
+    written concurrently when writes outpace commits. A batch is written
+    with one UNWIND statement per model and relationship. If a constraint
+    fails, the batch is rolled back and its creates written one at a time,
+    so that each gets its own id or error. Callers should pass the same
+    graph, as a batch is written through its leader's.
+    """
+
+    def __init__(self, max_batch=100, window=0.005):
+        self.max_batch = max_batch
+        self.window = window
+        self.lock = Lock()
+        self.open_batch = None
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.latencies = Histogram(LATENCY_BUCKETS)
+
+    def create(self, graph, model_name, properties, linkages):
+        """
+        Create a node and its relationships in a batch, returning its id
+
+        Raises NodesNotFound when linked nodes are missing, ConstraintError
+        when the node breaks a constraint, and the error of the batch if it
+        could not be written at all.
+        """
+        start = time.time()
+        item = PendingCreate(model_name, properties, linkages)
+
+        with self.lock:
+            batch = self.open_batch
+            leader = batch is None
+
+            if leader:
+                batch = self.open_batch = Batch()
+
+            batch.items.append(item)
+
+            # the next create opens a batch of its own
+            if len(batch.items) >= self.max_batch:
+                self.open_batch = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+
+            with self.lock:
+                if self.open_batch is batch:
+                    self.open_batch = None
+
+            try:
+                self.batch_sizes.observe(len(batch.items))
+                self.write(graph, batch.items)
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        self.latencies.observe(time.time() - start)
+
+        if item.error is not None:
+            raise item.error[0], item.error[1], item.error[2]
+
+        return item.node_id
+
+    def write(self, graph, items):
+        """
+        Write creates in one transaction, setting the id or error of each
+        """
+        for item in items:
+            item.node_id = item.error = None
+
+        tx = graph.begin()
+
+        try:
+            ids = sorted(set(
+                id for item in items
+                for ids in item.linkages.itervalues() for id in ids))
+            found = tx.find_nodes(ids) if ids else {}
+            valid = []
+
+            # linked nodes are looked up in the transaction creating them
+            for item in items:
+                missing = get_missing_nodes(
+                    item.model_name, item.linkages, found)
+
+                if missing:
+                    item.error = error_info(NodesNotFound(*missing))
+                else:
+                    valid.append(item)
+
+            for model_name in sorted(set(item.model_name for item in valid)):
+                model_items = [item for item in valid
+                               if item.model_name == model_name]
+                create_batch(tx, model_name, model_items)
+
+            tx.commit()
+
+        except ConstraintError:
+            if not tx.finished():
+                tx.rollback()
+
+            if len(items) == 1:
+                items[0].node_id = None
+                items[0].error = sys.exc_info()
+                return
+
+            for item in items:
+                self.write(graph, [item])
+
+        except Exception:
+            error = sys.exc_info()
+
+            if not tx.finished():
+                tx.rollback()
+
+            for item in items:
+                item.error = error
+
+
+def create_batch(tx, model_name, items):
+    """
+    Create the nodes of one model and link them, setting their ids
+    """
+    rows = [{'key': key, 'properties': item.properties}
+            for key, item in enumerate(items)]
+    ids = dict((record['key'], record['id'])
+               for record in tx.run_batch(model_name, 'create', rows))
+
+    for key, item in enumerate(items):
+        item.node_id = ids[key]
+
+    apply_linkages(tx, model_name, [
+        (key, item.node_id, item.linkages)
+        for key, item in enumerate(items)], replace=False)
+
+
+def error_info(error):
+    """
+    Return exc_info style information for an error that was not raised
+    """
+    return type(error), error, None
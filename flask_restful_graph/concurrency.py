@@ -0,0 +1,272 @@
+from Queue import Queue
+from threading import BoundedSemaphore, Condition, Lock, Thread
+import os
+import sys
+
+from .backends import GraphBackend
+from .instrumentation import with_timings
+from .query import get_related_names
+
+
+###############################################################################
+#                                                                             #
+#                Executors                                                    #
+#                                                                             #
+###############################################################################
+
+
+class SerialExecutor(object):
+    """
+    Call functions one after another in the calling thread
+    """
+
+    def map(self, funcs):
+        return [func() for func in funcs]
+
+
+class GreenletExecutor(object):
+    """
+    Call functions concurrently in the greenlets of a bounded gevent pool
+
+    The pool is shared by all requests, so at most `size` calls are in
+    flight at once. Graph queries only yield to each other when the socket
+    module is patched by gevent, as it is by `flask_restful_graph.serving`.
+    """
+
+    def __init__(self, size=10):
+        from gevent.pool import Pool
+
+        self.pool = Pool(size)
+
+    def map(self, funcs):
+        greenlets = [self.pool.spawn(func) for func in funcs]
+
+        for greenlet in greenlets:
+            greenlet.join()
+
+        # the first error in call order is raised once every call is done
+        for greenlet in greenlets:
+            if not greenlet.successful():
+                raise greenlet.exception
+
+        return [greenlet.value for greenlet in greenlets]
+
+
+class ThreadExecutor(object):
+    """
+    Call functions concurrently in a bounded pool of threads
+
+    `size` daemon threads, started on first use in each process, are shared
+    by all requests, and each `map` runs at most `per_call` of its
+    functions at once so that one request cannot take every graph
+    connection. Results are returned in call order. After an error no
+    further functions are started, and the first error in call order is
+    raised once those running are done.
+    """
+
+    def __init__(self, size=10, per_call=None):
+        self.size = size
+        self.per_call = per_call or size
+        self.lock = Lock()
+        self.pid = None
+
+    def start(self):
+        # threads are not carried over into forked workers
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+
+            self.tasks = Queue()
+            for _ in range(self.size):
+                thread = Thread(target=self.work)
+                thread.daemon = True
+                thread.start()
+
+            self.pid = os.getpid()
+
+    def work(self):
+        while True:
+            self.tasks.get()()
+
+    def map(self, funcs):
+        self.start()
+
+        results = [None] * len(funcs)
+        errors = [None] * len(funcs)
+        slots = BoundedSemaphore(self.per_call)
+        finished = Condition(Lock())
+        state = {'running': 0, 'failed': False}
+
+        def make_task(index, func):
+            def task():
+                try:
+                    results[index] = func()
+                except Exception:
+                    errors[index] = sys.exc_info()
+
+                with finished:
+                    state['running'] -= 1
+                    state['failed'] = state['failed'] or \
+                        errors[index] is not None
+                    finished.notify()
+
+                slots.release()
+
+            return task
+
+        for index, func in enumerate(funcs):
+            slots.acquire()
+
+            with finished:
+                if state['failed']:
+                    slots.release()
+                    break
+                state['running'] += 1
+
+            self.tasks.put(make_task(index, func))
+
+        with finished:
+            while state['running']:
+                finished.wait()
+
+        for error in errors:
+            if error is not None:
+                raise error[0], error[1], error[2]
+
+        return results
+
+
+###############################################################################
+#                                                                             #
+#                Reading documents in parts                                   #
+#                                                                             #
+###############################################################################
+
+
+def get_document_parts(model_name, include, fields):
+    """
+    Split the relationships of a document into independently read parts
+
+    Returns (related names, include paths) pairs: one for the linkage of
+    each relationship, with its related nodes when included, and one for
+    each deeper include path.
+    """
+    parts = []
+
+    for related_name in get_related_names(model_name, include, fields):
+        parts.append(((related_name,), tuple(
+            path for path in include if path == (related_name,))))
+
+    for path in sorted(path for path in include if len(path) > 1):
+        parts.append(((), (path,)))
+
+    return parts
+
+
+def merge_part(rows, part_rows, related_names, include):
+    """
+    Copy the relationships and included nodes of a part onto the rows of
+    the primary nodes it was read for
+    """
+    parts_by_id = dict((part['id'], part) for part in part_rows)
+
+    for row in rows:
+        part = parts_by_id.get(row['id'])
+
+        for related_name in related_names:
+            row['relationships'][related_name] = \
+                part['relationships'][related_name] if part else []
+
+        for path in include:
+            if len(path) > 1:
+                key = '.'.join(path)
+                row['included'][key] = part['included'][key] if part else []
+
+
+class ConcurrentBackend(GraphBackend):
+    """
+    Read the parts of a document concurrently through an executor
+
+    A document with several relationships or include paths is read as one
+    query for its primary nodes and one for each part, which run together
+    rather than as successive stages of one statement. The parts of an
+    individual document are read along with its node; those of other
+    documents are read for the ids of the primary nodes once found. Parts
+    are separate statements, so a concurrent write may be seen by some of
+    them only. Transactions are not split. Parts are measured for the
+    request that reads them when the wrapped backend is instrumented.
+    """
+
+    def __init__(self, backend, executor):
+        self.backend = backend
+        self.executor = executor
+
+    def read_documents(self, model_name, parameters, **options):
+        include = options.get('include', ())
+        parts = get_document_parts(
+            model_name, include, dict(options.get('fields', ())))
+
+        if len(parts) < 2 or options.get('related_names') is not None:
+            return self.backend.read_documents(
+                model_name, parameters, **options)
+
+        primary_options = dict(options, include=(), related_names=())
+
+        def read_part(part_parameters, related_names, part_include,
+                      individual):
+            return with_timings(lambda: list(self.backend.read_documents(
+                model_name, part_parameters, include=part_include,
+                individual=individual, fields=options.get('fields', ()),
+                related_names=related_names)))
+
+        if options.get('individual') is True:
+            results = self.executor.map(
+                [with_timings(lambda: list(self.backend.read_documents(
+                    model_name, parameters, **primary_options)))] +
+                [read_part(parameters, related_names, part_include, True)
+                 for related_names, part_include in parts])
+            rows, part_results = results[0], results[1:]
+        else:
+            rows = list(self.backend.read_documents(
+                model_name, parameters, **primary_options))
+            ids = [row['id'] for row in rows if row['id'] is not None]
+
+            if not ids:
+                return rows
+
+            part_results = self.executor.map(
+                [read_part({'ids': ids}, related_names, part_include, 'many')
+                 for related_names, part_include in parts])
+
+        for (related_names, part_include), part_rows in zip(
+                parts, part_results):
+            merge_part(rows, part_rows, related_names, part_include)
+
+        return rows
+
+    def count_related(self, model_name, related_name, id):
+        return self.backend.count_related(model_name, related_name, id)
+
+    def read_neighborhood(self, *args):
+        return self.backend.read_neighborhood(*args)
+
+    def read_path(self, *args):
+        return self.backend.read_path(*args)
+
+    def export_nodes(self, model_name):
+        return self.backend.export_nodes(model_name)
+
+    def export_edges(self, model_name, related_name):
+        return self.backend.export_edges(model_name, related_name)
+
+    def indexed_properties(self):
+        return self.backend.indexed_properties()
+
+    def constraints(self):
+        return self.backend.constraints()
+
+    def create_index(self, label, prop_name, unique=False):
+        return self.backend.create_index(label, prop_name, unique)
+
+    def begin(self):
+        return self.backend.begin()
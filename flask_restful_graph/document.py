@@ -0,0 +1,226 @@
+from collections import OrderedDict
+
+from .instrumentation import timed
+from .models import BaseModel
+from .models.base_model import get_link
+from .query import resolve_path
+
+
+###############################################################################
+#                                                                             #
+#                Link helpers                                                 #
+#                                                                             #
+###############################################################################
+
+
+def get_resource_links(model_name, id):
+    """
+    Get dictionary with the 'self' link of a single resource
+    """
+    return {'self': get_link(BaseModel.plans[model_name].self_path, id)}
+
+
+def get_relationship_links(model_name, related_name, id):
+    """
+    Get dictionary of 'self' and 'related' links of a resource's relationship
+    """
+    plan = BaseModel.plans[model_name].relationships[related_name]
+
+    return {
+        'self': get_link(plan.self_path, id),
+        'related': get_link(plan.related_path, id)
+    }
+
+
+###############################################################################
+#                                                                             #
+#                Building documents from query rows                           #
+#                                                                             #
+###############################################################################
+
+
+def make_resource_identifier(model_name, node):
+    """
+    Make a resource identifier object out of a node map from a query row
+    """
+    return {'type': BaseModel.plans[model_name].type, 'id': str(node['id'])}
+
+
+def make_resource_object(model_name, node):
+    """
+    Make a resource object with attributes out of a node map
+    """
+    resource = make_resource_identifier(model_name, node)
+
+    with timed('dump'):
+        resource['attributes'] = \
+            BaseModel.dumpers[model_name](node['properties'])
+
+    return resource
+
+
+class DocumentBuilder(object):
+    """
+    Assemble the primary data and included members of a JSON:API document
+
+    Every resource object is indexed by its (type, id) pair, so a node
+    reached through many rows or paths is serialized once and a resource
+    never appears both as primary data and as an included member.
+
+    Streamed documents `flush` the builder after each row; flushed resource
+    objects are forgotten and only their keys stay indexed.
+
+    Relationships left out of a model's sparse fieldset are not written,
+    although related nodes reached through them may still be included.
+    """
+
+    def __init__(self, model_name, include=(), fields=()):
+        self.model_name = model_name
+        self.fields = dict(fields)
+        self.include_paths = [
+            (path, resolve_path(model_name, path))
+            for path in include if len(path) > 1]
+        self.data = []
+        self.index = {}
+        self.included_index = OrderedDict()
+        self.primary_keys = set()
+        self.linked = set()
+
+    @property
+    def included(self):
+        return list(self.included_index.values())
+
+    def add_row(self, row):
+        """
+        Serialize one row of a document query and return its resource object
+        """
+        # related-resource queries return one null row for a source node
+        # that has no related nodes
+        if row['id'] is None:
+            return None
+
+        resource = make_resource_object(self.model_name, row)
+        resource['relationships'] = self.get_relationships(row)
+        resource['links'] = get_resource_links(self.model_name, row['id'])
+
+        key = resource['type'], resource['id']
+        self.included_index.pop(key, None)
+        self.index[key] = resource
+        self.primary_keys.add(key)
+        self.data.append(resource)
+
+        for path, models in self.include_paths:
+            edges = row['included']['.'.join(path)]
+            self.add_included_path(path, models, edges)
+
+        return resource
+
+    def has_relationship(self, model_name, related_name):
+        return model_name not in self.fields or \
+            related_name in self.fields[model_name][1]
+
+    def get_relationships(self, row):
+        relationships = {}
+        plans = BaseModel.plans[self.model_name].relationships
+
+        for related_name, nodes in row['relationships'].iteritems():
+            related_model = plans[related_name].related_model
+
+            linkage = []
+            for node in nodes:
+                identifier = make_resource_identifier(related_model, node)
+                linkage.append(identifier)
+
+                # primary linkage is complete, so deeper include paths
+                # reaching this node must not add to it again
+                self.linked.add((self.model_name.lower(), str(row['id']),
+                                 related_name, identifier['id']))
+
+                if 'properties' in node:
+                    self.include(related_model, node)
+
+            if not self.has_relationship(self.model_name, related_name):
+                continue
+
+            # to-one relationships are a single linkage object (or null)
+            if not plans[related_name].plural:
+                linkage = linkage[0] if linkage else None
+
+            relationships[related_name] = {
+                'links': get_relationship_links(
+                    self.model_name, related_name, row['id']),
+                'data': linkage
+            }
+
+        return relationships
+
+    def add_included_path(self, path, models, edges):
+        """
+        Include the last hop of a path and link it from the hop before it
+        """
+        parent_model, model_name = models[-2:]
+        related_name = path[-1]
+        plural = BaseModel.plans[parent_model].relationships[
+            related_name].plural
+        linked = self.has_relationship(parent_model, related_name)
+
+        for edge in edges:
+            self.include(model_name, edge)
+            parent = self.index[parent_model.lower(), str(edge['parent'])]
+
+            linked_key = (parent_model.lower(), str(edge['parent']),
+                          related_name, str(edge['id']))
+            if linked_key in self.linked:
+                continue
+            self.linked.add(linked_key)
+
+            # a flushed parent was complete when it was written out
+            if parent is None or not linked:
+                continue
+
+            relationships = parent.setdefault('relationships', {})
+            if related_name not in relationships:
+                relationships[related_name] = {
+                    'links': get_relationship_links(
+                        parent_model, related_name, edge['parent']),
+                    'data': [] if plural else None
+                }
+
+            identifier = make_resource_identifier(model_name, edge)
+            if plural:
+                relationships[related_name]['data'].append(identifier)
+            else:
+                relationships[related_name]['data'] = identifier
+
+    def include(self, model_name, node):
+        """
+        Return the indexed resource object for a node, including it if new
+
+        Returns None for a node whose resource object was already flushed.
+        """
+        key = model_name.lower(), str(node['id'])
+
+        try:
+            return self.index[key]
+        except KeyError:
+            resource = make_resource_object(model_name, node)
+            resource['links'] = get_resource_links(model_name, node['id'])
+
+            self.index[key] = resource
+            self.included_index[key] = resource
+            return resource
+
+    def flush(self):
+        """
+        Return and forget the primary and included resource objects
+        serialized since the last flush
+        """
+        data, included = self.data, self.included
+
+        for resource in data + included:
+            self.index[resource['type'], resource['id']] = None
+
+        self.data = []
+        self.included_index = OrderedDict()
+
+        return data, included
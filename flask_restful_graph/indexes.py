@@ -0,0 +1,122 @@
+from collections import namedtuple
+import argparse
+import sys
+
+from .models import BaseModel
+from .query import EXPORT_ID
+
+
+IndexReport = namedtuple('IndexReport', [
+    'missing_indexes', 'missing_constraints', 'extra_indexes',
+    'extra_constraints'])
+
+
+###############################################################################
+#                                                                             #
+#                Declared and existing indexes                                #
+#                                                                             #
+###############################################################################
+
+
+def compare_indexes(graph):
+    """
+    Compare the indexes and uniqueness constraints declared with
+    `BaseModel.add_model_prop` to those of a GraphBackend
+
+    A constraint also indexes its property, so a property declared indexed
+    is not missing when it is constrained. Only the labels of models are
+    compared, leaving those of other applications sharing the graph alone,
+    and the indexes imports make on EXPORT_ID are not extra.
+    """
+    labels = set(BaseModel.plans)
+    constraints = set(pair for pair in graph.constraints()
+                      if pair[0] in labels)
+    indexes = set(pair for pair in graph.indexed_properties()
+                  if pair[0] in labels and pair[1] != EXPORT_ID) - constraints
+
+    return IndexReport(
+        sorted(BaseModel.indexes - indexes - constraints),
+        sorted(BaseModel.unique_properties - constraints),
+        sorted(indexes - BaseModel.indexes),
+        sorted(constraints - BaseModel.unique_properties))
+
+
+def sync_indexes(graph):
+    """
+    Create the missing indexes and constraints of a GraphBackend
+
+    Extra indexes and constraints are reported but kept, as dropping them
+    could slow down or loosen what others rely on. Returns the report from
+    before anything was created.
+    """
+    report = compare_indexes(graph)
+
+    for label, prop_name in report.missing_indexes:
+        graph.create_index(label, prop_name)
+
+    for label, prop_name in report.missing_constraints:
+        graph.create_index(label, prop_name, unique=True)
+
+    return report
+
+
+def format_report(report, created=False):
+    """
+    Describe each missing, or `created`, and extra index and constraint on
+    its own line
+    """
+    missing = 'Created' if created else 'Missing'
+    lines = []
+
+    for title, pairs in ((missing + ' index', report.missing_indexes),
+                         (missing + ' constraint', report.missing_constraints),
+                         ('Extra index', report.extra_indexes),
+                         ('Extra constraint', report.extra_constraints)):
+        lines.extend('{} on :{}({})'.format(title, label, prop_name)
+                     for label, prop_name in pairs)
+
+    return lines
+
+
+###############################################################################
+#                                                                             #
+#                Command line                                                 #
+#                                                                             #
+###############################################################################
+
+
+def main(args=None):
+    """
+    Create the missing indexes and constraints of the configured graph, or
+    with --check only report them, exiting with 1 if any are missing
+    """
+    from .application import create_app
+
+    parser = argparse.ArgumentParser(
+        prog='python -m flask_restful_graph.indexes',
+        description='Create the indexes and uniqueness constraints '
+                    'declared on model properties.')
+    parser.add_argument('--check', action='store_true',
+                        help='only report missing and extra ones')
+    options = parser.parse_args(args)
+
+    app = create_app()
+    graph = app.extensions['restful_graph']['resource_factory'].graph
+
+    if options.check:
+        report = compare_indexes(graph)
+    else:
+        report = sync_indexes(graph)
+
+    for line in format_report(report, created=not options.check):
+        print line
+
+    if options.check and (report.missing_indexes or
+                          report.missing_constraints):
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,414 @@
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock, local
+import time
+
+from flask import g
+
+from .backends import GraphBackend, GraphTransaction
+
+
+###############################################################################
+#                                                                             #
+#                Request timings                                              #
+#                                                                             #
+###############################################################################
+
+
+class RequestTimings(object):
+    """
+    Queries and time spent in each phase of serving one request
+    """
+
+    def __init__(self, resource_name, method):
+        self.resource_name = resource_name
+        self.method = method
+        self.start = time.time()
+        self.handled = None
+        self.queries = 0
+        self.db = 0.0
+        self.dump = 0.0
+        self.lock = Lock()
+
+    def add(self, **amounts):
+        # parts of a document read concurrently add to the same timings
+        with self.lock:
+            for name, amount in amounts.iteritems():
+                setattr(self, name, getattr(self, name) + amount)
+
+
+# timings of the request a function is run for in another thread
+bound_timings = local()
+
+
+def get_timings():
+    """
+    Get the timings of the current request, or None if it is not measured
+    """
+    timings = getattr(bound_timings, 'timings', None)
+
+    if timings is not None:
+        return timings
+
+    try:
+        return getattr(g, 'request_timings', None)
+    except RuntimeError:
+        return None
+
+
+def with_timings(func):
+    """
+    Bind a function to the timings of the current request, so that the
+    graph calls it makes are measured when an executor runs it in another
+    thread, where the request's `flask.g` is not visible
+    """
+    timings = get_timings()
+
+    if timings is None:
+        return func
+
+    @wraps(func)
+    def call(*args, **kwargs):
+        previous = getattr(bound_timings, 'timings', None)
+        bound_timings.timings = timings
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            bound_timings.timings = previous
+
+    return call
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in a block to a phase of the request's timings
+    """
+    timings = get_timings()
+
+    if timings is None:
+        yield
+        return
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        timings.add(**{phase: time.time() - start})
+
+
+def timed_rows(rows, timings):
+    """
+    Iterate query rows, adding the time spent fetching them to DB time
+
+    Rows are fetched as they are iterated, so streamed documents are timed
+    too.
+    """
+    rows = iter(rows)
+
+    while True:
+        start = time.time()
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        finally:
+            timings.add(db=time.time() - start)
+
+        yield row
+
+
+###############################################################################
+#                                                                             #
+#                Instrumented backend                                         #
+#                                                                             #
+###############################################################################
+
+
+class InstrumentedBackend(GraphBackend):
+    """
+    Count and time the graph calls of measured requests
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def read_documents(self, model_name, parameters, **options):
+        timings = get_timings()
+
+        if timings is None:
+            return self.backend.read_documents(
+                model_name, parameters, **options)
+
+        timings.add(queries=1)
+        with timed('db'):
+            rows = self.backend.read_documents(
+                model_name, parameters, **options)
+
+        return timed_rows(rows, timings)
+
+    def count_related(self, model_name, related_name, id):
+        timings = get_timings()
+
+        if timings is not None:
+            timings.add(queries=1)
+
+        with timed('db'):
+            return self.backend.count_related(model_name, related_name, id)
+
+    def read_neighborhood(self, *args):
+        timings = get_timings()
+
+        if timings is not None:
+            timings.add(queries=1)
+
+        with timed('db'):
+            return list(self.backend.read_neighborhood(*args))
+
+    def read_path(self, *args):
+        timings = get_timings()
+
+        if timings is not None:
+            timings.add(queries=1)
+
+        with timed('db'):
+            return list(self.backend.read_path(*args))
+
+    def export_nodes(self, model_name):
+        return self.backend.export_nodes(model_name)
+
+    def export_edges(self, model_name, related_name):
+        return self.backend.export_edges(model_name, related_name)
+
+    def indexed_properties(self):
+        return self.backend.indexed_properties()
+
+    def constraints(self):
+        return self.backend.constraints()
+
+    def create_index(self, label, prop_name, unique=False):
+        return self.backend.create_index(label, prop_name, unique)
+
+    def begin(self):
+        with timed('db'):
+            return InstrumentedTransaction(self.backend.begin())
+
+
+class InstrumentedTransaction(GraphTransaction):
+
+    def __init__(self, tx):
+        self.tx = tx
+
+    def call(self, name, *args, **kwargs):
+        timings = get_timings()
+
+        if timings is not None:
+            timings.add(queries=1)
+
+        with timed('db'):
+            result = getattr(self.tx, name)(*args, **kwargs)
+
+            # rows are read before the next statement anyway
+            if name in ('read_documents', 'run_batch'):
+                result = list(result)
+
+            return result
+
+    def read_documents(self, model_name, parameters, **options):
+        return self.call('read_documents', model_name, parameters, **options)
+
+    def find_nodes(self, ids):
+        return self.call('find_nodes', ids)
+
+    def create_node(self, model_name, properties, linkages):
+        return self.call('create_node', model_name, properties, linkages)
+
+    def run_batch(self, model_name, kind, rows, related_name=None):
+        return self.call('run_batch', model_name, kind, rows, related_name)
+
+    def commit(self):
+        with timed('db'):
+            self.tx.commit()
+
+    def rollback(self):
+        with timed('db'):
+            self.tx.rollback()
+
+    def finished(self):
+        return self.tx.finished()
+
+
+###############################################################################
+#                                                                             #
+#                Metrics                                                      #
+#                                                                             #
+###############################################################################
+
+
+class Histogram(object):
+    """
+    Count observed values in cumulative buckets, as Prometheus histograms do
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0
+        self.lock = Lock()
+
+    def observe(self, value):
+        with self.lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def render(self, name, description):
+        """
+        Render the histogram in the Prometheus text exposition format
+        """
+        with self.lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+
+        lines = ['# HELP {} {}'.format(name, description),
+                 '# TYPE {} histogram'.format(name)]
+        lines.extend('{}_bucket{{le="{}"}} {}'.format(name, bound, value)
+                     for bound, value in zip(self.buckets, counts))
+        lines.append('{}_bucket{{le="+Inf"}} {}'.format(name, count))
+        lines.append('{}_sum {}'.format(name, total))
+        lines.append('{}_count {}'.format(name, count))
+
+        return lines
+
+
+METRICS = (
+    ('requests_total', 'counter', 'Requests served'),
+    ('queries_total', 'counter', 'Graph queries made'),
+    ('db_seconds_total', 'counter', 'Time spent in graph queries'),
+    ('dump_seconds_total', 'counter', 'Time spent dumping attributes'),
+    ('request_seconds_total', 'counter', 'Time spent serving requests'),
+    ('response_bytes_total', 'counter', 'Size of unstreamed responses')
+)
+
+
+class Metrics(object):
+    """
+    Measure requests to the resources of a ResourceFactory
+
+    Each measured response gets a `Server-Timing` header, and totals are
+    aggregated per resource class name and method for the `/metrics`
+    endpoint, along with the counters of a response cache and the
+    histograms of a write coalescer. Totals are recorded when the response
+    is closed, so that the reads of a streamed body are counted.
+    """
+
+    def __init__(self, app=None, cache=None, coalescer=None):
+        self.cache = cache
+        self.coalescer = coalescer
+        self.totals = {}
+        self.lock = Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def measured(self, func, resource_name, method):
+        """
+        Wrap a resource method so its requests are measured
+        """
+        @wraps(func)
+        def handler(*args, **kwargs):
+            timings = g.request_timings = \
+                RequestTimings(resource_name, method.upper())
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.handled = time.time()
+
+        return handler
+
+    def after_request(self, response):
+        timings = get_timings()
+
+        if timings is None:
+            return response
+
+        elapsed = time.time() - timings.start
+        handled = (timings.handled or time.time()) - timings.start
+        size = None if response.is_streamed else \
+            response.calculate_content_length()
+
+        # streamed bodies are still to be read, and are not in the header
+        response.headers['Server-Timing'] = ', '.join([
+            'db;dur={:.3f};desc="{} queries"'.format(
+                timings.db * 1000, timings.queries),
+            'dump;dur={:.3f}'.format(timings.dump * 1000),
+            'handler;dur={:.3f}'.format(handled * 1000),
+            'serialize;dur={:.3f}'.format((elapsed - handled) * 1000),
+            'total;dur={:.3f}'.format(elapsed * 1000)
+        ])
+
+        response.call_on_close(lambda: self.record(timings, size))
+
+        return response
+
+    def record(self, timings, size):
+        """
+        Add a request's timings to the totals once its response is closed,
+        after a streamed body has been written
+        """
+        elapsed = time.time() - timings.start
+        key = timings.resource_name, timings.method
+
+        with self.lock:
+            totals = self.totals.setdefault(key, dict.fromkeys(
+                [name for name, _, _ in METRICS], 0))
+            totals['requests_total'] += 1
+            totals['queries_total'] += timings.queries
+            totals['db_seconds_total'] += timings.db
+            totals['dump_seconds_total'] += timings.dump
+            totals['request_seconds_total'] += elapsed
+            totals['response_bytes_total'] += size or 0
+
+    def render(self):
+        """
+        Render the metrics in the Prometheus text exposition format
+        """
+        lines = []
+
+        with self.lock:
+            totals = sorted(
+                (key, dict(values)) for key, values in self.totals.items())
+
+        for name, metric_type, description in METRICS:
+            lines.append('# HELP flask_restful_graph_{} {}'.format(
+                name, description))
+            lines.append('# TYPE flask_restful_graph_{} {}'.format(
+                name, metric_type))
+
+            for (resource_name, method), values in totals:
+                lines.append(
+                    'flask_restful_graph_{}{{resource="{}",method="{}"}} {}'
+                    .format(name, resource_name, method, values[name]))
+
+        if self.cache is not None:
+            for counter, value in sorted(self.cache.counters.items()):
+                name = 'flask_restful_graph_cache_{}_total'.format(counter)
+                lines.append('# TYPE {} counter'.format(name))
+                lines.append('{} {}'.format(name, value))
+
+        if self.coalescer is not None:
+            lines.extend(self.coalescer.batch_sizes.render(
+                'flask_restful_graph_write_batch_size',
+                'Creates committed per coalesced transaction'))
+            lines.extend(self.coalescer.latencies.render(
+                'flask_restful_graph_write_seconds',
+                'Time from submitting a coalesced create to its result'))
+
+        return '\n'.join(lines) + '\n'
@@ -1,12 +1,28 @@
-from flask import url_for
+from collections import namedtuple, OrderedDict
+
+from flask import has_request_context, request
 from marshmallow import Schema
-from py2neo.ogm import GraphObject, Property, RelatedObjects
+from py2neo.ogm import GraphObject, Property
 import stringcase
 
+from .dumpers import compile_dumper
 
 registered_models = {}
 
 
+# preformatted paths take the node id; see BaseModel.build_plans
+ModelPlan = namedtuple('ModelPlan', ['type', 'self_path', 'relationships'])
+RelationshipPlan = namedtuple('RelationshipPlan', [
+    'related_model', 'plural', 'self_path', 'related_path'])
+
+
+def get_link(path, id):
+    """
+    Fill a node id into a preformatted path, relative to the app's root
+    """
+    return request.script_root + path.format(id)
+
+
 class BaseModel(GraphObject):
 
     #####################################################################
@@ -14,11 +30,24 @@ class BaseModel(GraphObject):
     #           Registering marshalled properties and related models    #
 
     schemas = {}
+    dumpers = {}
+    field_names = {}
     related_models = {}
+    relationship_definitions = {}
+    plans = {}
+
+    # (label, property) pairs to index or constrain; see indexes.py
+    indexes = set()
+    unique_properties = set()
 
     @classmethod
-    def add_model_prop(cls, model_name, prop_name,
-                       marshal_property, **kwargs):
+    def add_model_prop(cls, model_name, prop_name, marshal_property,
+                       index=False, unique=False, **kwargs):
+        if unique:
+            cls.unique_properties.add((model_name, prop_name))
+        elif index:
+            cls.indexes.add((model_name, prop_name))
+
         try:
             model = registered_models[model_name]
         except KeyError:
@@ -38,11 +67,44 @@ class BaseModel(GraphObject):
     @classmethod
     def build_schemas(cls):
         for model_name in registered_models:
+            # map each dumped attribute name back to its property name;
+            # done first as declaring the schema pops fields off the dict
+            cls.field_names[model_name] = dict(
+                (field.dump_to or prop_name, prop_name)
+                for prop_name, field
+                in registered_models[model_name].iteritems())
+
             cls.schemas[model_name] = type(
                 model_name + 'Schema',
                 (Schema,),
                 registered_models[model_name])()
 
+            # attributes are dumped without marshmallow; see dumpers.py
+            cls.dumpers[model_name] = compile_dumper(cls.schemas[model_name])
+
+        cls.build_plans()
+
+    @classmethod
+    def build_plans(cls):
+        """
+        Compile each model's serialization plan: its relationships, whether
+        they are to-many, and the paths of its links
+        """
+        for model_name in set(cls.schemas) | set(cls.related_models):
+            collection_path = '/{}s/{{}}'.format(model_name.lower())
+            relationships = OrderedDict()
+
+            for related_name, plural in sorted(
+                    cls.related_models.get(model_name, {}).iteritems()):
+                relationships[related_name] = RelationshipPlan(
+                    cls.get_relationship_pattern(model_name, related_name)[0],
+                    plural,
+                    collection_path + '/relationships/' + related_name,
+                    collection_path + '/' + related_name)
+
+            cls.plans[model_name] = ModelPlan(
+                model_name.lower(), collection_path, relationships)
+
     @classmethod
     def add_relationship(cls, model_name, relationship_definition,
                          related_name, plural):
@@ -50,8 +112,31 @@ class BaseModel(GraphObject):
             cls.related_models[model_name][related_name] = plural
         except KeyError:
             cls.related_models[model_name] = {related_name: plural}
+
+        try:
+            cls.relationship_definitions[model_name][related_name] = \
+                relationship_definition
+        except KeyError:
+            cls.relationship_definitions[model_name] = {
+                related_name: relationship_definition}
+
         return relationship_definition
 
+    @classmethod
+    def get_relationship_pattern(cls, model_name, related_name):
+        """
+        Return (related model name, relationship type, direction) tuple
+        """
+        definition = cls.relationship_definitions[model_name][related_name]
+        related_class = definition.related_class
+
+        if not isinstance(related_class, basestring):
+            related_class = related_class.__name__
+
+        return (related_class.rsplit('.', 1)[-1],
+                definition.relationship_type,
+                definition.direction)
+
     #####################################################################
     #                                                                   #
     #           Serializing                                             #
@@ -73,23 +158,19 @@ class BaseModel(GraphObject):
     #           Helper methods for serializing                          #
 
     def get_attributes(self):
-        return BaseModel.schemas[self.__class__.__name__].dump(self).data
+        return BaseModel.dumpers[self.__class__.__name__](self)
 
     def get_type_and_id(self):
         return self.__primarylabel__.lower(), str(self.__primaryvalue__)
 
     def get_self_links(self, collection=False):
-        links = {}
-
-        try:
-            links['self'] = url_for(
-                self.__class__.__name__.lower() + 'resource',
-                id=self.__primaryvalue__)
-        except RuntimeError as e:
-            print 'Cannot access "links" property outside application context!'
-            print e
+        # links are relative to the app, so they need a request
+        if not has_request_context():
+            return {}
 
-        return links
+        return {'self': get_link(
+            BaseModel.plans[self.__class__.__name__].self_path,
+            self.__primaryvalue__)}
 
     def get_related_links(self):
         pass
@@ -97,47 +178,44 @@ class BaseModel(GraphObject):
     def get_relationships(self):
         relationships = {}
         included = []
-
-        related = [p for p in self.__class__.__dict__
-                   if type(getattr(self, p)) is RelatedObjects]
-
-        for related_set in related:
-
-            try:
-                relationships[related_set] = {
-                    'links': {
-                        'self': url_for(
-                            self.__class__.__name__.lower() + related_set +
-                            'relationshipresource',
-                            id=self.__primaryvalue__),
-                        'related': url_for(
-                            self.__class__.__name__.lower() + related_set +
-                            'resource',
-                            id=self.__primaryvalue__)
-                    },
-                    'data': []
-                }
-            except RuntimeError as e:
-                print 'Cannot access "links" property outside \
-                        application context!'
-                print e
-
-                relationships[related_set] = {
-                    'links': {},
-                    'data': []
+        included_keys = set()
+        plan = BaseModel.plans[self.__class__.__name__]
+        linked = has_request_context()
+
+        for related_set, related_plan in plan.relationships.iteritems():
+            if linked:
+                links = {
+                    'self': get_link(related_plan.self_path,
+                                     self.__primaryvalue__),
+                    'related': get_link(related_plan.related_path,
+                                        self.__primaryvalue__)
                 }
+            else:
+                links = {}
+
+            linkage = []
 
             for node in getattr(self, related_set):
                 serialized_node = {}
                 serialized_node['type'], \
                     serialized_node['id'] = node.get_type_and_id()
 
-                relationships[related_set]['data']\
-                    .append(serialized_node.copy())
+                linkage.append(serialized_node.copy())
+
+                # a node related more than once is included once
+                if node.get_type_and_id() in included_keys:
+                    continue
+                included_keys.add(node.get_type_and_id())
 
                 serialized_node['attributes'] = node.get_attributes()
                 included.append(serialized_node)
 
+            # to-one relationships are a single linkage object (or null)
+            if not related_plan.plural:
+                linkage = linkage[0] if linkage else None
+
+            relationships[related_set] = {'links': links, 'data': linkage}
+
         return included, relationships
 
     def get_meta(self):
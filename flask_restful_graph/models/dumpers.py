@@ -0,0 +1,83 @@
+from marshmallow import fields, missing, ValidationError
+from marshmallow.utils import ensure_text_type
+
+
+###############################################################################
+#                                                                             #
+#                Compiled dumpers                                             #
+#                                                                             #
+###############################################################################
+
+
+def format_string(value, attr, obj):
+    if value is None:
+        return None
+    return ensure_text_type(value)
+
+
+def get_formatter(field):
+    """
+    Return func formatting a value as a field would
+
+    Plain strings are formatted inline; other fields, including validated
+    ones like Email, keep their own `_serialize`.
+    """
+    if type(field) is fields.String:
+        return format_string
+
+    return field._serialize
+
+
+def compile_dumper(schema):
+    """
+    Compile a func dumping a dict or object the way `schema.dump` does
+
+    The fields' dump keys, attribute names, defaults and formatting are
+    looked up once rather than on every dump. As with the schema, missing
+    values and values failing validation are left out. Schemas with dump
+    processors or dotted attributes are dumped by the schema itself.
+    """
+    steps = []
+
+    if schema._has_processors:
+        return lambda obj: schema.dump(obj).data
+
+    for attr_name, field in schema.fields.iteritems():
+        if field.load_only:
+            continue
+
+        attribute = field.attribute or attr_name
+
+        if '.' in attribute or not field._CHECK_ATTRIBUTE:
+            return lambda obj: schema.dump(obj).data
+
+        steps.append((field.dump_to or attr_name, attribute, attr_name,
+                      field.default, get_formatter(field)))
+
+    steps = tuple(steps)
+
+    def dump(obj):
+        data = {}
+
+        for key, attribute, attr_name, default, format in steps:
+            try:
+                value = obj[attribute]
+            except (KeyError, AttributeError, IndexError, TypeError):
+                value = getattr(obj, attribute, missing)
+                if callable(value):
+                    value = value()
+
+            if value is missing:
+                if default is missing:
+                    continue
+                data[key] = default() if callable(default) else default
+                continue
+
+            try:
+                data[key] = format(value, attr_name, obj)
+            except ValidationError:
+                continue
+
+        return data
+
+    return dump
@@ -6,7 +6,8 @@ from .base_model import BaseModel
 
 class User(BaseModel):
 
-    email = BaseModel.add_model_prop('User', 'email', fields.Email)
+    email = BaseModel.add_model_prop('User', 'email', fields.Email,
+                                     unique=True)
     first_name = BaseModel.add_model_prop('User', 'first_name', fields.Str)
     last_name = BaseModel.add_model_prop('User', 'last_name', fields.Str)
 
@@ -0,0 +1,613 @@
+from .document import DocumentBuilder
+from .models import BaseModel
+
+
+###############################################################################
+#                                                                             #
+#                Validating writes                                            #
+#                                                                             #
+###############################################################################
+
+
+class NodesNotFound(LookupError):
+    """
+    Raised with messages describing the nodes writes referred to that do
+    not exist
+    """
+
+    def __init__(self, *messages):
+        super(NodesNotFound, self).__init__(*messages)
+        self.messages = messages
+
+
+class LocalId(object):
+    """
+    Stand-in for the id of a node created by an earlier operation
+    """
+
+    def __init__(self, lid):
+        self.lid = lid
+
+
+def get_model_name(type):
+    """
+    Obtain the model name of a resource type
+    """
+    for model_name in BaseModel.schemas:
+        if model_name.lower() == type:
+            return model_name
+
+    raise ValueError('Unknown type "{}"'.format(type))
+
+
+def load_attributes(model_name, attributes, partial=False):
+    """
+    Deserialize submitted attributes with the model's schema
+    """
+    data, errors = BaseModel.schemas[model_name].load(
+        attributes, partial=partial)
+
+    if errors:
+        raise ValueError('; '.join(
+            '{}: {}'.format(attribute, error)
+            for attribute, error_list in sorted(errors.iteritems())
+            for error in error_list))
+
+    return data
+
+
+def get_linkages(model_name, added_relationships, resolve_lid=None):
+    """
+    Validate submitted relationships and collect their linked node ids
+
+    Returns a dictionary of relationship name to list of node ids, raising
+    ValueError for the first malformed relationship. Linkage by local id
+    (`lid`) is only accepted with a `resolve_lid(lid, type)` func, whose
+    result stands in for the node id.
+    """
+    related_models = BaseModel.related_models.get(model_name, {})
+    linkages = {}
+
+    # 'entities' is either a single resource linkage object (or null)
+    # or a list of resource linkage objects
+    for prop_name, entities in added_relationships.iteritems():
+        if prop_name not in related_models:
+            raise ValueError('{} model does not contain relationship "{}"'
+                             .format(model_name, prop_name))
+
+        try:
+            linkage = entities['data']
+        except (KeyError, TypeError):
+            raise ValueError(
+                'Malformed resource linkage in "relationships" member')
+
+        # this boolean means it's a to-many collection
+        is_plural = related_models[prop_name]
+
+        if isinstance(linkage, list):
+            if not is_plural:
+                raise ValueError('Property "{}" on {} entity is not a '
+                                 'collection but was submitted as one'
+                                 .format(prop_name, model_name))
+        elif is_plural:
+            raise ValueError('Property "{}" on {} entity is a collection '
+                             'but was not submitted as one'
+                             .format(prop_name, model_name))
+        else:
+            linkage = [linkage] if linkage is not None else []
+
+        related_type = BaseModel.get_relationship_pattern(
+            model_name, prop_name)[0].lower()
+        ids = []
+
+        for related in linkage:
+            try:
+                submitted_type = related['type']
+                if resolve_lid and 'lid' in related:
+                    submitted_id = None
+                else:
+                    submitted_id = related['id']
+            except (KeyError, TypeError):
+                raise ValueError(
+                    'Malformed resource linkage in "relationships" member')
+
+            if submitted_type != related_type:
+                raise ValueError(
+                    'Property "{}" on {} entity must link "{}" resources'
+                    .format(prop_name, model_name, related_type))
+
+            if submitted_id is None:
+                ids.append(resolve_lid(related['lid'], submitted_type))
+                continue
+
+            try:
+                ids.append(int(submitted_id))
+            except (TypeError, ValueError):
+                raise ValueError('Couldn\'t parse "id" property to an int')
+
+        linkages[prop_name] = ids
+
+    return linkages
+
+
+def get_missing_nodes(model_name, linkages, found):
+    """
+    Describe the linked nodes not in `found`, the labels of nodes by id
+    """
+    missing = []
+
+    for prop_name in sorted(linkages):
+        label = BaseModel.get_relationship_pattern(model_name, prop_name)[0]
+
+        for node_id in linkages[prop_name]:
+            if label not in found.get(node_id, ()):
+                missing.append('Requested node of type {} with id {} '
+                               'not found'.format(label, node_id))
+
+    return missing
+
+
+###############################################################################
+#                                                                             #
+#                Planning atomic operations                                   #
+#                                                                             #
+###############################################################################
+
+
+RELATIONSHIP_OPERATIONS = {'add': 'link', 'remove': 'unlink',
+                           'update': 'replace'}
+
+
+class Batch(object):
+    """
+    Consecutive operations applying the same kind of write to one model
+    """
+
+    def __init__(self, kind, model_name, related_name=None):
+        self.kind = kind
+        self.model_name = model_name
+        self.related_name = related_name
+        self.items = []
+
+    @property
+    def key(self):
+        return self.kind, self.model_name, self.related_name
+
+
+def get_reference(identity, resolve_lid):
+    """
+    Get the node id, or local id stand-in, a resource identity refers to
+    """
+    if 'lid' in identity:
+        return resolve_lid(identity['lid'], identity['type'])
+
+    try:
+        return int(identity['id'])
+    except (TypeError, ValueError):
+        raise ValueError('Couldn\'t parse "id" property to an int')
+
+
+def plan_operation(operation, local_ids, resolve_lid):
+    """
+    Validate one atomic operation
+
+    Returns the kind of write, the model name, the relationship name (for
+    relationship operations) and the item describing the write.
+    """
+    op = operation['op']
+    ref = operation.get('ref')
+    data = operation.get('data')
+
+    if ref and 'relationship' in ref:
+        if op not in RELATIONSHIP_OPERATIONS:
+            raise ValueError('Unknown operation "{}"'.format(op))
+
+        model_name = get_model_name(ref['type'])
+        related_name = ref['relationship']
+        related = get_linkages(
+            model_name, {related_name: {'data': data}},
+            resolve_lid)[related_name]
+
+        if op != 'update' and \
+                not BaseModel.related_models[model_name][related_name]:
+            raise ValueError('Relationship "{}" of {} is not a collection, '
+                             'so it can only be updated'
+                             .format(related_name, model_name))
+
+        return (RELATIONSHIP_OPERATIONS[op], model_name, related_name, {
+            'id': get_reference(ref, resolve_lid), 'related': related})
+
+    if op == 'remove':
+        model_name = get_model_name(ref['type'])
+        return 'delete', model_name, None, {
+            'id': get_reference(ref, resolve_lid)}
+
+    model_name = get_model_name(data['type'])
+
+    if ref and ref['type'] != data['type']:
+        raise ValueError('"type" of "ref" and "data" members do not match')
+
+    if op == 'add':
+        item = {
+            'properties': load_attributes(
+                model_name, data.get('attributes', {})),
+            'linkages': get_linkages(
+                model_name, data.get('relationships', {}), resolve_lid),
+            'lid': data.get('lid')
+        }
+
+        if item['lid'] is not None:
+            if item['lid'] in local_ids:
+                raise ValueError('Local id "{}" is defined more than once'
+                                 .format(item['lid']))
+            local_ids[item['lid']] = data['type']
+
+        return 'create', model_name, None, item
+
+    if op == 'update':
+        return 'update', model_name, None, {
+            'id': get_reference(data, resolve_lid),
+            'properties': load_attributes(
+                model_name, data.get('attributes', {}), partial=True),
+            'linkages': get_linkages(
+                model_name, data.get('relationships', {}), resolve_lid)
+        }
+
+    raise ValueError('Unknown operation "{}"'.format(op))
+
+
+def plan_operations(operations):
+    """
+    Validate atomic operations and group consecutive ones into batches
+
+    Operations are applied in order, so only consecutive operations doing
+    the same kind of write to the same model share a batch. Local ids must
+    be defined by an earlier `add` operation before they are referred to.
+    Raises ValueError naming the first invalid operation.
+    """
+    local_ids = {}
+    batches = []
+
+    def resolve_lid(lid, type):
+        if local_ids.get(lid) != type:
+            raise ValueError('Local id "{}" of type "{}" is not defined by '
+                             'an earlier operation'.format(lid, type))
+        return LocalId(lid)
+
+    for index, operation in enumerate(operations):
+        try:
+            kind, model_name, related_name, item = \
+                plan_operation(operation, local_ids, resolve_lid)
+        except ValueError as e:
+            raise ValueError('Operation {}: {}'.format(index, e.message))
+        except (AttributeError, KeyError, TypeError):
+            raise ValueError('Operation {}: malformed operation'.format(index))
+
+        item['index'] = index
+
+        if not batches or \
+                batches[-1].key != (kind, model_name, related_name):
+            batches.append(Batch(kind, model_name, related_name))
+        batches[-1].items.append(item)
+
+    return batches
+
+
+###############################################################################
+#                                                                             #
+#                Applying batches                                             #
+#                                                                             #
+###############################################################################
+
+
+def run_batch(tx, model_name, kind, rows, related_name=None):
+    """
+    Run one batch query over rows, returning the rows it did not apply to
+    """
+    if not rows:
+        return []
+
+    for key, row in enumerate(rows):
+        row['key'] = key
+
+    applied = set(record['key'] for record in
+                  tx.run_batch(model_name, kind, rows, related_name))
+
+    return [row for row in rows if row['key'] not in applied]
+
+
+class BatchWriter(object):
+    """
+    Apply planned batches in order within one transaction
+
+    Keeps the ids of nodes created for local ids, and the (model name,
+    node id, local id) of the resource each `add` or `update` operation
+    wrote, keyed by operation index, and the (model name, node id) of
+    every node written or linked to. Raises NodesNotFound when operations
+    refer to missing nodes.
+    """
+
+    def __init__(self, tx):
+        self.tx = tx
+        self.created = {}
+        self.results = {}
+        self.touched = set()
+
+    def apply(self, batches):
+        for batch in batches:
+            getattr(self, 'apply_' + batch.kind)(batch)
+
+        return self.results
+
+    def resolve(self, node_id):
+        if isinstance(node_id, LocalId):
+            return self.created[node_id.lid]
+        return node_id
+
+    def resolve_linkages(self, model_name, linkages):
+        resolved = {}
+
+        for related_name, related_ids in linkages.iteritems():
+            related_model = BaseModel.get_relationship_pattern(
+                model_name, related_name)[0]
+            resolved[related_name] = [self.resolve(related_id)
+                                      for related_id in related_ids]
+            self.touched.update((related_model, related_id)
+                                for related_id in resolved[related_name])
+
+        return resolved
+
+    def match_nodes(self, batch):
+        """
+        Resolve the nodes a batch refers to and check that they exist
+        """
+        rows = [{'index': item['index'], 'id': self.resolve(item['id'])}
+                for item in batch.items]
+        check_missing(batch.model_name,
+                      run_batch(self.tx, batch.model_name, 'match', rows))
+        self.touched.update((batch.model_name, row['id']) for row in rows)
+        return [row['id'] for row in rows]
+
+    def apply_create(self, batch):
+        rows = [{'key': key, 'properties': item['properties']}
+                for key, item in enumerate(batch.items)]
+        ids = dict((record['key'], record['id']) for record in
+                   self.tx.run_batch(batch.model_name, 'create', rows))
+        targets = []
+
+        for key, item in enumerate(batch.items):
+            if item['lid'] is not None:
+                self.created[item['lid']] = ids[key]
+            self.results[item['index']] = \
+                batch.model_name, ids[key], item['lid']
+
+        for key, item in enumerate(batch.items):
+            self.touched.add((batch.model_name, ids[key]))
+            targets.append((item['index'], ids[key], self.resolve_linkages(
+                batch.model_name, item['linkages'])))
+
+        apply_linkages(self.tx, batch.model_name, targets, replace=False)
+
+    def apply_update(self, batch):
+        rows = [{'index': item['index'], 'id': self.resolve(item['id']),
+                 'properties': item['properties']} for item in batch.items]
+        check_missing(batch.model_name,
+                      run_batch(self.tx, batch.model_name, 'update', rows))
+
+        for row in rows:
+            self.results[row['index']] = batch.model_name, row['id'], None
+            self.touched.add((batch.model_name, row['id']))
+
+        apply_linkages(self.tx, batch.model_name, [
+            (item['index'], row['id'],
+             self.resolve_linkages(batch.model_name, item['linkages']))
+            for item, row in zip(batch.items, rows)], replace=True)
+
+    def apply_delete(self, batch):
+        rows = [{'key': key, 'index': item['index'],
+                 'id': self.resolve(item['id'])}
+                for key, item in enumerate(batch.items)]
+        records = list(self.tx.run_batch(batch.model_name, 'delete', rows))
+        deleted = set(record['key'] for record in records)
+
+        check_missing(batch.model_name,
+                      [row for row in rows if row['key'] not in deleted])
+        self.touched.update((batch.model_name, row['id']) for row in rows)
+
+        # the relationships deleted with the nodes change their neighbours'
+        # linkage, related pages and counts
+        for record in records:
+            for node in record['neighbours']:
+                model_name = next((label for label in node['labels']
+                                   if label in BaseModel.plans), None)
+                if model_name is not None:
+                    self.touched.add((model_name, node['id']))
+
+    def apply_link(self, batch, replace=False):
+        node_ids = self.match_nodes(batch)
+        apply_linkages(self.tx, batch.model_name, [
+            (item['index'], node_id, self.resolve_linkages(
+                batch.model_name, {batch.related_name: item['related']}))
+            for item, node_id in zip(batch.items, node_ids)], replace)
+
+    def apply_replace(self, batch):
+        self.apply_link(batch, replace=True)
+
+    def apply_unlink(self, batch):
+        node_ids = self.match_nodes(batch)
+        run_batch(self.tx, batch.model_name, 'unlink', [
+            {'index': item['index'], 'id': node_id, 'related': related_id}
+            for item, node_id in zip(batch.items, node_ids)
+            for related_id in self.resolve_linkages(
+                batch.model_name,
+                {batch.related_name: item['related']})[batch.related_name]
+        ], batch.related_name)
+
+
+def check_missing(model_name, missing):
+    """
+    Raise NodesNotFound for batch rows whose node was not found
+    """
+    if missing:
+        raise NodesNotFound(*[
+            'Operation {}: requested node of type {} with id {} '
+            'not found'.format(row['index'], model_name, row['id'])
+            for row in missing])
+
+
+def apply_linkages(tx, model_name, targets, replace):
+    """
+    Link nodes to related nodes, one batch per relationship
+
+    `targets` are (operation index, node id, linkages) tuples; with
+    `replace`, the listed relationships are cleared before linking.
+    """
+    related_names = sorted(set(
+        related_name for _, _, linkages in targets
+        for related_name in linkages))
+
+    for related_name in related_names:
+        if replace:
+            run_batch(tx, model_name, 'clear', [
+                {'index': index, 'id': node_id}
+                for index, node_id, linkages in targets
+                if related_name in linkages], related_name)
+
+        rows = [{'index': index, 'id': node_id, 'related': related_id}
+                for index, node_id, linkages in targets
+                if related_name in linkages
+                for related_id in linkages[related_name]]
+        missing = run_batch(tx, model_name, 'link', rows, related_name)
+
+        if missing:
+            related_model = BaseModel.get_relationship_pattern(
+                model_name, related_name)[0]
+            raise NodesNotFound(*[
+                'Operation {}: requested node of type {} with id {} '
+                'not found'.format(row['index'], related_model,
+                                   row['related'])
+                for row in missing])
+
+
+def get_operation_results(tx, results, count):
+    """
+    Serialize the resources written by operations into `atomic:results`
+
+    Resources are read back with one document query per model.
+    """
+    resources = {}
+    node_ids = {}
+
+    for model_name, node_id, _ in results.itervalues():
+        node_ids.setdefault(model_name, set()).add(node_id)
+
+    for model_name, ids in node_ids.iteritems():
+        builder = DocumentBuilder(model_name)
+        rows = tx.read_documents(
+            model_name, {'ids': sorted(ids)}, individual='many')
+
+        for row in rows:
+            builder.add_row(row)
+
+        for resource in builder.data:
+            resources[model_name, int(resource['id'])] = resource
+
+    atomic_results = []
+
+    for index in range(count):
+        if index not in results:
+            atomic_results.append({})
+            continue
+
+        model_name, node_id, lid = results[index]
+
+        # written by this operation but removed by a later one
+        if (model_name, node_id) not in resources:
+            atomic_results.append({})
+            continue
+
+        resource = dict(resources[model_name, node_id])
+        if lid is not None:
+            resource['lid'] = lid
+        atomic_results.append({'data': resource})
+
+    return atomic_results
+
+
+###############################################################################
+#                                                                             #
+#                Updating one relationship                                    #
+#                                                                             #
+###############################################################################
+
+
+def get_linked_ids(tx, model_name, related_name, node_id):
+    """
+    Read the ids of the nodes related to a node, without their properties,
+    or None when the node is missing
+    """
+    related_model = BaseModel.get_relationship_pattern(
+        model_name, related_name)[0]
+    rows = list(tx.read_documents(
+        related_model, {'id': node_id}, related=(model_name, related_name),
+        fields=((related_model, ((), ())),)))
+
+    if not rows:
+        return None
+
+    return set(row['id'] for row in rows if row['id'] is not None)
+
+
+def update_relationship(tx, model_name, related_name, node_id, related_ids,
+                        mode):
+    """
+    Add, remove or ('replace') set the nodes related to one node
+
+    Only edges that change are written, with one MERGE batch for those
+    added and one DELETE batch for those removed, so the cost grows with
+    the submitted linkage rather than with the relationship. Returns the
+    (model name, id) of every node whose linkage changed, and raises
+    NodesNotFound when the node or a node to link is missing.
+    """
+    related_model = BaseModel.get_relationship_pattern(
+        model_name, related_name)[0]
+    not_found = 'Requested node of type {} with id {} not found'
+
+    # submitted ids are kept once, in order
+    seen = set()
+    related_ids = [related_id for related_id in related_ids
+                   if not (related_id in seen or seen.add(related_id))]
+
+    if mode == 'replace':
+        linked = get_linked_ids(tx, model_name, related_name, node_id)
+        if linked is None:
+            raise NodesNotFound(not_found.format(model_name, node_id))
+
+        added = [related_id for related_id in related_ids
+                 if related_id not in linked]
+        removed = sorted(linked - seen)
+    else:
+        if run_batch(tx, model_name, 'match', [{'id': node_id}]):
+            raise NodesNotFound(not_found.format(model_name, node_id))
+
+        added = related_ids if mode == 'add' else []
+        removed = related_ids if mode == 'remove' else []
+
+    run_batch(tx, model_name, 'unlink', [
+        {'id': node_id, 'related': related_id} for related_id in removed],
+        related_name)
+
+    missing = run_batch(tx, model_name, 'link', [
+        {'id': node_id, 'related': related_id} for related_id in added],
+        related_name)
+
+    if missing:
+        raise NodesNotFound(*[not_found.format(related_model, row['related'])
+                              for row in missing])
+
+    touched = set((related_model, related_id)
+                  for related_id in added + removed)
+    if touched:
+        touched.add((model_name, node_id))
+
+    return touched
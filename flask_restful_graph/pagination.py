@@ -0,0 +1,86 @@
+from flask import request
+from werkzeug.urls import url_encode
+
+from .parameters import encode_cursor
+
+
+###############################################################################
+#                                                                             #
+#                Keyset pages                                                 #
+#                                                                             #
+###############################################################################
+
+
+class PageRows(object):
+    """
+    Iterate the rows of a page, dropping the extra row fetched past it
+
+    Page queries fetch one row more than the page size to tell whether a
+    further page exists. Each row carries the `cursor` keyset of its node,
+    which bounds the neighbouring pages. Forward pages are passed through
+    lazily; a page read backwards from a `before` cursor has its extra row
+    first, so it is buffered (at most one page) to find out whether to drop
+    it.
+    """
+
+    def __init__(self, page, rows):
+        self.page = page
+        self.rows = rows
+        self.first_cursor = None
+        self.last_cursor = None
+        self.has_more = False
+
+    def __iter__(self):
+        size = self.page['size']
+        rows = self.rows
+
+        if 'before' in self.page:
+            rows = list(rows)
+            if len(rows) > size:
+                self.has_more = True
+                rows = rows[1:]
+
+        for count, row in enumerate(rows):
+            if count == size:
+                self.has_more = True
+                break
+
+            if self.first_cursor is None:
+                self.first_cursor = row['cursor']
+            self.last_cursor = row['cursor']
+
+            yield row
+
+    def get_links(self):
+        """
+        Get 'first', 'prev' and 'next' links once the page has been iterated
+        """
+        links = {'first': get_page_link(), 'prev': None, 'next': None}
+
+        if 'before' in self.page:
+            if self.has_more:
+                links['prev'] = get_page_link('before', self.first_cursor)
+            links['next'] = get_page_link('after', self.last_cursor) \
+                if self.last_cursor is not None else get_page_link()
+        else:
+            if self.has_more:
+                links['next'] = get_page_link('after', self.last_cursor)
+            if 'after' in self.page:
+                links['prev'] = get_page_link('before', self.first_cursor) \
+                    if self.first_cursor is not None else get_page_link()
+
+        return links
+
+
+def get_page_link(cursor_name=None, cursor=None):
+    """
+    Get the request url moved to the page starting after/before a cursor
+    """
+    args = request.args.copy()
+    args.pop('page[after]', None)
+    args.pop('page[before]', None)
+
+    if cursor_name:
+        args['page[{}]'.format(cursor_name)] = encode_cursor(list(cursor))
+
+    return '{}?{}'.format(request.base_url, url_encode(args))
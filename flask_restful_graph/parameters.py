@@ -0,0 +1,263 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import json
+import re
+
+from marshmallow import ValidationError
+
+from .models import BaseModel
+from .query import FILTER_OPERATORS, resolve_path
+
+
+FILTER_PARAMETER = re.compile(r'^filter\[([^\]]+)\](?:\[([^\]]+)\])?$')
+
+
+###############################################################################
+#                                                                             #
+#                Query string parameters                                      #
+#                                                                             #
+###############################################################################
+
+
+def parse_include(model_name, value, max_depth):
+    """
+    Parse an `include` parameter into a sorted tuple of relationship paths
+
+    Each path is a tuple of relationship names. Intermediate paths are added
+    so that `groups.members` also includes `groups`, as full linkage requires.
+    """
+    if not value:
+        return ()
+
+    paths = set()
+
+    for dotted_path in value.split(','):
+        path = tuple(dotted_path.strip().split('.'))
+
+        if not all(path):
+            raise ValueError('Malformed include path "{}"'.format(dotted_path))
+
+        if len(path) > max_depth:
+            raise ValueError(
+                'Include path "{}" is deeper than the maximum of {}'.format(
+                    dotted_path, max_depth))
+
+        resolve_path(model_name, path)
+
+        for depth in range(1, len(path) + 1):
+            paths.add(path[:depth])
+
+    return tuple(sorted(paths))
+
+
+def parse_fields(args):
+    """
+    Parse `fields[type]` parameters into a sorted tuple of sparse fieldsets
+
+    Each fieldset is a (model name, (property names, relationship names))
+    pair. Attributes are requested by their dumped (camelCased) names and
+    are mapped back to the node properties they are loaded from.
+    """
+    model_names = dict((model_name.lower(), model_name)
+                       for model_name in BaseModel.field_names)
+    fieldsets = []
+
+    for parameter, value in args.iteritems():
+        if not (parameter.startswith('fields[') and parameter.endswith(']')):
+            continue
+
+        type = parameter[len('fields['):-1]
+        if type not in model_names:
+            raise ValueError('Unknown type "{}" in "{}" parameter'
+                             .format(type, parameter))
+
+        model_name = model_names[type]
+        field_names = BaseModel.field_names[model_name]
+        related_names = BaseModel.related_models.get(model_name, {})
+        prop_names, relationships = set(), set()
+
+        for field in filter(None, value.split(',')):
+            field = field.strip()
+
+            if field in field_names:
+                prop_names.add(field_names[field])
+            elif field in related_names:
+                relationships.add(field)
+            else:
+                raise ValueError('{} model does not contain field "{}"'
+                                 .format(model_name, field))
+
+        fieldsets.append((model_name, (tuple(sorted(prop_names)),
+                                       tuple(sorted(relationships)))))
+
+    return tuple(sorted(fieldsets))
+
+
+def get_prop_name(model_name, field, parameter):
+    """
+    Map a dumped attribute name back to its property name
+    """
+    try:
+        return BaseModel.field_names[model_name][field]
+    except KeyError:
+        raise ValueError('{} model does not contain attribute "{}" in "{}" '
+                         'parameter'.format(model_name, field, parameter))
+
+
+def parse_filters(model_name, args):
+    """
+    Parse `filter[attribute]` and `filter[attribute][operator]` parameters
+
+    Returns a sorted tuple of (property name, operator) pairs and the list
+    of their values, deserialized by the model's schema fields.
+    """
+    schema_fields = BaseModel.schemas[model_name].fields
+    filters = []
+
+    for parameter, value in args.iteritems():
+        match = FILTER_PARAMETER.match(parameter)
+        if not match:
+            continue
+
+        field, operator = match.group(1), match.group(2) or 'eq'
+        prop_name = get_prop_name(model_name, field, parameter)
+
+        if operator not in FILTER_OPERATORS:
+            raise ValueError('Unknown filter operator "{}" in "{}" parameter'
+                             .format(operator, parameter))
+
+        # prefixes are partial values, so they skip the field's validation
+        if operator == 'prefix':
+            filters.append(((prop_name, operator), value))
+            continue
+
+        try:
+            value = schema_fields[prop_name].deserialize(value)
+        except ValidationError as e:
+            raise ValueError('{}: {}'.format(parameter, ' '.join(e.messages)))
+
+        filters.append(((prop_name, operator), value))
+
+    filters.sort(key=lambda item: item[0])
+
+    return (tuple(condition for condition, _ in filters),
+            [value for _, value in filters])
+
+
+def parse_sort(model_name, value):
+    """
+    Parse a `sort` parameter into a tuple of (property name, descending)
+    """
+    if not value:
+        return ()
+
+    sort = []
+
+    for field in value.split(','):
+        field = field.strip()
+        descending = field.startswith('-')
+        prop_name = get_prop_name(model_name, field.lstrip('-'), 'sort')
+
+        if prop_name in [sorted_name for sorted_name, _ in sort]:
+            raise ValueError('Attribute "{}" is sorted on more than once'
+                             .format(field.lstrip('-')))
+
+        sort.append((prop_name, descending))
+
+    return tuple(sort)
+
+
+def encode_cursor(keyset):
+    """
+    Encode the sort values and id of a node into an opaque page cursor
+    """
+    return urlsafe_b64encode(json.dumps(keyset, separators=(',', ':')))
+
+
+def decode_cursor(value, name):
+    """
+    Decode a page cursor back into the list of values of its keyset
+    """
+    try:
+        keyset = json.loads(urlsafe_b64decode(str(value)))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Malformed cursor in "{}" parameter'.format(name))
+
+    if not isinstance(keyset, list) or not keyset or \
+            not isinstance(keyset[-1], (int, long)):
+        raise ValueError('Malformed cursor in "{}" parameter'.format(name))
+
+    return keyset
+
+
+def parse_int(value, name):
+    """
+    Parse an integer parameter such as a page size
+    """
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('Couldn\'t parse "{}" parameter to an int'
+                         .format(name))
+
+
+def parse_bounded_int(args, name, default, maximum):
+    """
+    Parse an optional integer parameter between 1 and a maximum
+    """
+    if name not in args:
+        return default
+
+    value = parse_int(args[name], name)
+
+    if not 0 < value <= maximum:
+        raise ValueError('"{}" must be between 1 and {}'.format(
+            name, maximum))
+
+    return value
+
+
+def parse_types(value):
+    """
+    Parse a comma-separated `type` parameter into a sorted tuple of model
+    names, by default those of every model
+    """
+    model_names = dict((plan.type, model_name)
+                       for model_name, plan in BaseModel.plans.iteritems())
+
+    if not value:
+        return tuple(sorted(model_names.itervalues()))
+
+    try:
+        return tuple(sorted(set(model_names[type.strip()]
+                                for type in value.split(','))))
+    except KeyError as e:
+        raise ValueError('Unknown type "{}"'.format(e.args[0]))
+
+
+def parse_page(args, default_size, max_size):
+    """
+    Parse `page[size]`, `page[after]` and `page[before]` parameters
+
+    Returns a dictionary with the page `size` and, at most one of, the
+    `after` or `before` cursor, decoded into the keyset of the node bounding
+    the page.
+    """
+    page = {'size': default_size}
+
+    if 'page[size]' in args:
+        page['size'] = parse_int(args['page[size]'], 'page[size]')
+
+        if not 0 < page['size'] <= max_size:
+            raise ValueError('"page[size]" must be between 1 and {}'
+                             .format(max_size))
+
+    if 'page[after]' in args and 'page[before]' in args:
+        raise ValueError(
+            '"page[after]" and "page[before]" cannot be combined')
+
+    for cursor_name in ('after', 'before'):
+        parameter = 'page[{}]'.format(cursor_name)
+        if parameter in args:
+            page[cursor_name] = decode_cursor(args[parameter], parameter)
+
+    return page
@@ -0,0 +1,749 @@
+from .models import BaseModel
+
+
+###############################################################################
+#                                                                             #
+#                Cypher building blocks                                       #
+#                                                                             #
+###############################################################################
+
+
+def quote(name):
+    """
+    Escape a label, relationship type or key for use in a Cypher statement
+    """
+    return '`{}`'.format(name.replace('`', '``'))
+
+
+def relationship_pattern(start, rel_type, direction, end, end_label=None,
+                         variable=''):
+    """
+    Build a single-hop pattern from `start` to an (optionally labelled) `end`
+    """
+    relationship = '[{}:{}]'.format(variable, quote(rel_type))
+
+    if end_label:
+        end_node = '({}:{})'.format(end, quote(end_label))
+    else:
+        end_node = '({})'.format(end)
+
+    if direction > 0:
+        return '({})-{}->{}'.format(start, relationship, end_node)
+    elif direction < 0:
+        return '({})<-{}-{}'.format(start, relationship, end_node)
+
+    return '({})-{}-{}'.format(start, relationship, end_node)
+
+
+def node_properties(variable, model_name, fields):
+    """
+    Project a node's properties, restricted to a sparse fieldset if given
+    """
+    if model_name not in fields:
+        return 'properties({})'.format(variable)
+
+    return '{} {{{}}}'.format(variable, ', '.join(
+        '.' + quote(prop_name) for prop_name in fields[model_name][0]))
+
+
+def node_map(variable, model_name, fields):
+    """
+    Project a node variable to a map of its internal id and properties
+    """
+    return '{{id: id({}), properties: {}}}'.format(
+        variable, node_properties(variable, model_name, fields))
+
+
+###############################################################################
+#                                                                             #
+#                Document queries                                             #
+#                                                                             #
+###############################################################################
+
+
+compiled_statements = {}
+
+
+def resolve_path(model_name, path):
+    """
+    Return the model names reached by following a path of relationships
+    """
+    models = []
+
+    for related_name in path:
+        if related_name not in BaseModel.related_models.get(model_name, {}):
+            raise ValueError('{} model does not contain relationship "{}"'
+                             .format(model_name, related_name))
+
+        model_name = BaseModel.get_relationship_pattern(
+            model_name, related_name)[0]
+        models.append(model_name)
+
+    return models
+
+
+def path_patterns(model_name, path, prefix):
+    """
+    Build one single-hop pattern from `n` for each relationship of a path
+
+    Returns the patterns and the variable names bound to each hop. Hops are
+    matched in separate clauses so that a relationship traversed by one hop
+    may be traversed again by the next, e.g. a user's groups' members
+    include that user.
+    """
+    patterns = []
+    variables = []
+    start = 'n'
+
+    for depth, related_name in enumerate(path):
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+        variable = '{}_{}'.format(prefix, depth)
+
+        patterns.append(relationship_pattern(
+            start, rel_type, direction, variable, related_model))
+
+        variables.append(variable)
+        start = variable
+        model_name = related_model
+
+    return patterns, variables
+
+
+FILTER_OPERATORS = {
+    'eq': '=',
+    'prefix': 'STARTS WITH',
+    'lt': '<',
+    'lte': '<=',
+    'gt': '>',
+    'gte': '>='
+}
+
+
+def property_expression(prop_name):
+    return 'n.' + quote(prop_name)
+
+
+def after_term(expression, descending, parameter, is_null):
+    """
+    Build a predicate for values ordered strictly after a cursor value
+
+    Nulls sort last in ascending and first in descending order, so a null
+    cursor value has nothing after it when ascending. Returns None when no
+    value can follow the cursor value.
+    """
+    if descending:
+        if is_null:
+            return '{} IS NOT NULL'.format(expression)
+        return '{} < {}'.format(expression, parameter)
+
+    if is_null:
+        return None
+    return '({0} > {1} OR {0} IS NULL)'.format(expression, parameter)
+
+
+def keyset_predicate(sort, page, null_cursor):
+    """
+    Build the predicate for nodes after (or before) a `$cursor` keyset
+
+    The keyset is the sort property values followed by the node id, which
+    breaks ties. `null_cursor` flags the sort values of the cursor that are
+    null, as they are compared with IS NULL rather than parameters.
+    """
+    keys = [(property_expression(prop_name), descending)
+            for prop_name, descending in sort]
+    alternatives = []
+    equalities = []
+
+    for index, (expression, descending) in enumerate(keys):
+        parameter = '$cursor[{}]'.format(index)
+        is_null = null_cursor[index]
+
+        term = after_term(expression, descending != (page == 'before'),
+                          parameter, is_null)
+        if term:
+            alternatives.append(' AND '.join(equalities + [term]))
+
+        if is_null:
+            equalities.append('{} IS NULL'.format(expression))
+        else:
+            equalities.append('{} = {}'.format(expression, parameter))
+
+    id_term = 'id(n) {} $cursor[{}]'.format(
+        '<' if page == 'before' else '>', len(keys))
+    alternatives.append(' AND '.join(equalities + [id_term]))
+
+    if len(alternatives) == 1:
+        return alternatives[0]
+
+    return ' OR '.join('({})'.format(term) for term in alternatives)
+
+
+def order_by(expressions, sort, reverse=False):
+    """
+    Build ORDER BY items for sort keys followed by the id breaking ties
+    """
+    items = []
+
+    for expression, (prop_name, descending) in zip(expressions, sort):
+        descending = descending != reverse
+        items.append(expression + (' DESC' if descending else ''))
+
+    items.append(expressions[len(sort)] + (' DESC' if reverse else ''))
+    return ', '.join(items)
+
+
+def cursor_expression(sort):
+    """
+    Build the list of keyset values of `n` returned as each row's cursor
+    """
+    return '[{}]'.format(', '.join(
+        [property_expression(prop_name) for prop_name, _ in sort] +
+        ['id(n)']))
+
+
+def match_primary_nodes(model_name, individual, related, page,
+                        filters=(), sort=(), null_cursor=()):
+    """
+    Build the clauses binding `n` to the primary nodes of a document
+
+    `individual` is True to match the node with id `$id`, or 'many' to match
+    the nodes with ids in `$ids`. `page` is None for unpaginated documents,
+    'first' for the first page of a collection, or 'after'/'before' for a
+    page keyed on a `$cursor` keyset. Pages hold at most `$limit` nodes and
+    are cut before related nodes are matched, so only the nodes of the page
+    are traversed. Pages of the nodes `related` to a source are cut the same
+    way.
+
+    `filters` holds (property name, operator) pairs compared with the
+    `$filters` list parameter, and `sort` holds (property name, descending)
+    pairs.
+    """
+    if related:
+        source_model, related_name = related
+        _, rel_type, direction = \
+            BaseModel.get_relationship_pattern(source_model, related_name)
+
+        # the source is matched on its own so that a missing source yields no
+        # rows while a source without related nodes (on the page) yields one
+        # null row
+        lines = [
+            'MATCH (s:{}) WHERE id(s) = $id'.format(quote(source_model)),
+            'OPTIONAL MATCH ' + relationship_pattern(
+                's', rel_type, direction, 'n', model_name)
+        ]
+
+        if page in ('after', 'before'):
+            lines.append('WHERE ' + keyset_predicate(sort, page, null_cursor))
+
+        if page:
+            expressions = [property_expression(prop_name)
+                           for prop_name, _ in sort] + ['id(n)']
+            lines.append('WITH DISTINCT n ORDER BY {} LIMIT $limit'.format(
+                order_by(expressions, sort, reverse=page == 'before')))
+        else:
+            lines.append('WITH DISTINCT n')
+
+        return lines
+
+    lines = ['MATCH (n:{})'.format(quote(model_name))]
+    predicates = []
+
+    if individual == 'many':
+        predicates.append('id(n) IN $ids')
+    elif individual:
+        predicates.append('id(n) = $id')
+
+    for index, (prop_name, operator) in enumerate(filters):
+        predicates.append('{} {} $filters[{}]'.format(
+            property_expression(prop_name), FILTER_OPERATORS[operator],
+            index))
+
+    if page in ('after', 'before'):
+        predicates.append(keyset_predicate(sort, page, null_cursor))
+
+    if predicates:
+        lines.append('WHERE ' + ' AND '.join(
+            '({})'.format(predicate) if ' OR ' in predicate else predicate
+            for predicate in predicates))
+
+    if page:
+        expressions = [property_expression(prop_name)
+                       for prop_name, _ in sort] + ['id(n)']
+        lines.append('WITH n ORDER BY {} LIMIT $limit'.format(
+            order_by(expressions, sort, reverse=page == 'before')))
+
+    return lines
+
+
+def get_related_names(model_name, include=(), fields=()):
+    """
+    List the relationships of a model whose linkage a document holds
+
+    Relationships left out of the model's sparse fieldset are skipped
+    unless they are included.
+    """
+    fields = dict(fields)
+    related_names = sorted(BaseModel.related_models.get(model_name, {}))
+
+    if model_name not in fields:
+        return related_names
+
+    return [related_name for related_name in related_names
+            if related_name in fields[model_name][1] or
+            (related_name,) in include]
+
+
+def compile_document_query(model_name, include=(), individual=False,
+                           related=None, page=None, fields=(), filters=(),
+                           sort=(), null_cursor=(), related_names=None):
+    """
+    Compile one statement returning primary nodes with their related nodes
+
+    Each row holds the primary node's `id` and `properties`, a
+    `relationships` map of relationship name to related node maps and an
+    `included` map of dotted include path to `{parent, id, properties}` maps
+    for paths deeper than one hop. Related node properties are only projected
+    for relationships named in `include`. Every relationship and include path
+    is collected in its own WITH stage so the fan-out of one does not
+    multiply the rows of the next.
+
+    `fields` holds (model name, (property names, relationship names)) pairs
+    of sparse fieldsets. Nodes of those models only project the listed
+    properties, and unlisted relationships of the primary model are not
+    matched at all unless they are included.
+
+    Paginated rows also hold the `cursor` keyset of their primary node and
+    are ordered by it. `related_names` overrides the relationships whose
+    linkage is matched, so that a document can be read in parts.
+    """
+    fields = dict(fields)
+    lines = match_primary_nodes(model_name, individual, related, page,
+                                filters, sort, null_cursor)
+
+    carried = ['n']
+    projections = []
+    included_projections = []
+    if related_names is None:
+        related_names = get_related_names(model_name, include, fields)
+
+    for index, related_name in enumerate(related_names):
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+        node_variable = 'r{}'.format(index)
+        collected = 'rel_{}'.format(index)
+
+        lines.append('OPTIONAL MATCH ' + relationship_pattern(
+            'n', rel_type, direction, node_variable, related_model))
+        lines.append('WITH {}, collect(DISTINCT {}) AS {}'.format(
+            ', '.join(carried), node_variable, collected))
+
+        if (related_name,) in include:
+            projection = node_map('x', related_model, fields)
+        else:
+            projection = '{id: id(x)}'
+
+        carried.append(collected)
+        projections.append('{}: [x IN {} | {}]'.format(
+            quote(related_name), collected, projection))
+
+    deep_paths = sorted(path for path in include if len(path) > 1)
+
+    for index, path in enumerate(deep_paths):
+        patterns, variables = path_patterns(
+            model_name, path, 'i{}'.format(index))
+        parent, child = variables[-2:]
+        child_model = resolve_path(model_name, path)[-1]
+        collected = 'inc_{}'.format(index)
+
+        for pattern in patterns:
+            lines.append('OPTIONAL MATCH ' + pattern)
+        lines.append(
+            'WITH {0}, collect(DISTINCT CASE WHEN {2} IS NULL THEN NULL '
+            'ELSE {{parent: id({1}), id: id({2}), '
+            'properties: {3}}} END) AS {4}'.format(
+                ', '.join(carried), parent, child,
+                node_properties(child, child_model, fields), collected))
+
+        carried.append(collected)
+        included_projections.append('{}: {}'.format(
+            quote('.'.join(path)), collected))
+
+    returned = 'RETURN id(n) AS id, {} AS properties, ' \
+        '{{{}}} AS relationships, {{{}}} AS included'.format(
+            node_properties('n', model_name, fields),
+            ', '.join(projections), ', '.join(included_projections))
+
+    if page:
+        lines.append('{}, {} AS cursor'.format(
+            returned, cursor_expression(sort)))
+        lines.append('ORDER BY ' + order_by(
+            ['cursor[{}]'.format(index) for index in range(len(sort) + 1)],
+            sort))
+    else:
+        lines.append(returned)
+        lines.append('ORDER BY id')
+
+    return '\n'.join(lines)
+
+
+def get_document_query(model_name, **options):
+    """
+    Return the compiled document query, compiling it on first use
+    """
+    key = model_name, tuple(sorted(options.iteritems()))
+
+    try:
+        return compiled_statements[key]
+    except KeyError:
+        statement = compile_document_query(model_name, **options)
+        compiled_statements[key] = statement
+        return statement
+
+
+def compile_count_query(model_name, related_name):
+    """
+    Compile one statement counting the nodes related to the node `$id`
+
+    It returns no rows when the node is missing.
+    """
+    related_model, rel_type, direction = \
+        BaseModel.get_relationship_pattern(model_name, related_name)
+
+    return '\n'.join([
+        'MATCH (s:{}) WHERE id(s) = $id'.format(quote(model_name)),
+        'OPTIONAL MATCH ' + relationship_pattern(
+            's', rel_type, direction, 'n', related_model),
+        'RETURN count(DISTINCT n) AS count'
+    ])
+
+
+def get_count_query(model_name, related_name):
+    """
+    Return the compiled count query, compiling it on first use
+    """
+    key = 'count', model_name, related_name
+
+    try:
+        return compiled_statements[key]
+    except KeyError:
+        statement = compile_count_query(model_name, related_name)
+        compiled_statements[key] = statement
+        return statement
+
+
+###############################################################################
+#                                                                             #
+#                Traversal queries                                            #
+#                                                                             #
+###############################################################################
+
+
+def get_traversal_types():
+    """
+    List the relationship types of every model relationship
+    """
+    return sorted(set(
+        BaseModel.get_relationship_pattern(model_name, related_name)[1]
+        for model_name, related_models in BaseModel.related_models.iteritems()
+        for related_name in related_models))
+
+
+def traversal_pattern(start, end, lengths=None):
+    """
+    Build an undirected pattern over model relationships, of one hop or of
+    variable length
+    """
+    return '({})-[:{}{}]-({})'.format(
+        start, '|'.join(quote(rel_type) for rel_type in get_traversal_types()),
+        '' if lengths is None else '*' + lengths, end)
+
+
+def compile_neighborhood_query(model_name, depth, labels):
+    """
+    Compile one traversal returning the nodes within `depth` hops of the
+    node `$id`
+
+    Each row holds a node's `id`, `labels`, `properties` and its `distance`
+    in hops, for at most `$limit` nodes with one of `labels`, nearest first.
+    A missing node yields no rows and a node without neighbours one null
+    row. The nodes are expanded one hop at a time from those first reached
+    at the previous hop, as distinct nodes, so that the paths between them
+    are not enumerated; `depth` is the number of hops compiled.
+    """
+    label_predicate = ' OR '.join('n:' + quote(label) for label in labels)
+    lines = [
+        'MATCH (s:{}) WHERE id(s) = $id'.format(quote(model_name)),
+        'WITH [s] AS seen, [s] AS frontier, [] AS found'
+    ]
+
+    for distance in range(1, depth + 1):
+        lines.extend([
+            # a null row keeps the traversal going once nothing is reached
+            'UNWIND CASE frontier WHEN [] THEN [null] ELSE frontier END '
+            'AS f',
+            'OPTIONAL MATCH ' + traversal_pattern('f', 'n'),
+            'WHERE NOT n IN seen',
+            'WITH seen, found, collect(DISTINCT n) AS frontier',
+            'WITH seen + frontier AS seen, frontier, found + '
+            '[n IN frontier WHERE {} | {{node: n, distance: {}}}] AS found'
+            .format(label_predicate, distance)
+        ])
+
+    return '\n'.join(lines + [
+        'UNWIND CASE found WHEN [] THEN [null] ELSE found END AS x',
+        'WITH x.node AS n, x.distance AS distance',
+        'ORDER BY distance, id(n) LIMIT $limit',
+        'RETURN id(n) AS id, labels(n) AS labels, '
+        'properties(n) AS properties, distance'
+    ])
+
+
+def compile_path_query(model_name, target_model, max_length):
+    """
+    Compile one traversal returning a shortest path of at most `max_length`
+    hops from the node `$id` to the node `$target`
+
+    The row holds the path's `nodes`, as maps of their `id`, `labels` and
+    `properties`, which are null when there is no such path. Missing nodes
+    yield no rows. Paths may have no hops, so a node is connected to itself.
+    """
+    return '\n'.join([
+        'MATCH (s:{}) WHERE id(s) = $id'.format(quote(model_name)),
+        'MATCH (t:{}) WHERE id(t) = $target'.format(quote(target_model)),
+        'OPTIONAL MATCH p = shortestPath({})'.format(traversal_pattern(
+            's', 't', '0..{}'.format(max_length))),
+        'RETURN [n IN nodes(p) | {id: id(n), labels: labels(n), '
+        'properties: properties(n)}] AS nodes'
+    ])
+
+
+def get_traversal_query(kind, *args):
+    """
+    Return a compiled 'neighborhood' or 'path' query, compiling it on first
+    use
+    """
+    key = (kind,) + args
+
+    try:
+        return compiled_statements[key]
+    except KeyError:
+        if kind == 'neighborhood':
+            statement = compile_neighborhood_query(*args)
+        else:
+            statement = compile_path_query(*args)
+        compiled_statements[key] = statement
+        return statement
+
+
+###############################################################################
+#                                                                             #
+#                Export queries                                               #
+#                                                                             #
+###############################################################################
+
+
+# imported nodes keep the id they were exported with; see bulk.py
+EXPORT_ID = 'export_id'
+
+
+def compile_export_query(model_name, related_name=None):
+    """
+    Compile a statement reading a page of at most `$limit` nodes of a model
+    after the node id `$after` or, given a relationship, of their
+    relationships
+
+    Node pages hold the `id` and `properties` of nodes in id order.
+    Relationship pages hold the `id` of each node, with the ids of the
+    nodes it is `related` to (in id order, and empty for none), so that a
+    page only expands the relationships of its own nodes.
+    """
+    if related_name is None:
+        return '\n'.join([
+            'MATCH (n:{}) WHERE id(n) > $after'.format(quote(model_name)),
+            'RETURN id(n) AS id, properties(n) AS properties',
+            'ORDER BY id(n) LIMIT $limit'
+        ])
+
+    related_model, rel_type, direction = \
+        BaseModel.get_relationship_pattern(model_name, related_name)
+
+    return '\n'.join([
+        'MATCH (n:{}) WHERE id(n) > $after'.format(quote(model_name)),
+        'WITH n ORDER BY id(n) LIMIT $limit',
+        'OPTIONAL MATCH ' + relationship_pattern(
+            'n', rel_type, direction, 'm', related_model),
+        'WITH n, m ORDER BY id(n), id(m)',
+        'RETURN id(n) AS id, collect(id(m)) AS related',
+        'ORDER BY id'
+    ])
+
+
+def get_export_query(model_name, related_name=None):
+    """
+    Return the compiled export query, compiling it on first use
+    """
+    key = 'export', model_name, related_name
+
+    try:
+        return compiled_statements[key]
+    except KeyError:
+        statement = compile_export_query(model_name, related_name)
+        compiled_statements[key] = statement
+        return statement
+
+
+###############################################################################
+#                                                                             #
+#                Write queries                                                #
+#                                                                             #
+###############################################################################
+
+
+FIND_NODES_QUERY = 'MATCH (m) WHERE id(m) IN $ids ' \
+    'RETURN id(m) AS id, labels(m) AS labels'
+
+
+def compile_create_query(model_name):
+    """
+    Compile one statement creating a node and its relationships
+
+    The statement takes the node's `$properties` and a `$related` list
+    holding, for each relationship of the model in name order, the list of
+    related node ids to link. It returns the `id` of the created node.
+    """
+    lines = ['CREATE (n:{})'.format(quote(model_name)),
+             'SET n = $properties']
+    related_names = sorted(BaseModel.related_models.get(model_name, {}))
+
+    for index, related_name in enumerate(related_names):
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+        node_variable = 'r{}'.format(index)
+
+        lines.append('WITH n')
+        lines.append('OPTIONAL MATCH ({}:{}) WHERE id({}) IN $related[{}]'
+                     .format(node_variable, quote(related_model),
+                             node_variable, index))
+        lines.append('WITH n, collect({0}) AS {0}s'.format(node_variable))
+        lines.append('FOREACH (m IN {}s | CREATE {})'.format(
+            node_variable,
+            relationship_pattern('n', rel_type, direction, 'm')))
+
+    lines.append('RETURN id(n) AS id')
+
+    return '\n'.join(lines)
+
+
+def get_create_query(model_name):
+    """
+    Return the compiled create query, compiling it on first use
+    """
+    key = 'create', model_name
+
+    try:
+        return compiled_statements[key]
+    except KeyError:
+        statement = compile_create_query(model_name)
+        compiled_statements[key] = statement
+        return statement
+
+
+def compile_batch_query(model_name, kind, related_name=None):
+    """
+    Compile a statement applying one kind of write to a batch of `$rows`
+
+    Every row holds a `key` unique within the batch, and the statement
+    returns the key of each row it applied to, so rows whose nodes were not
+    found can be told apart. Kinds are:
+
+    - 'create': CREATE a node with `row.properties`, returning its `id`
+    - 'match': only check that the node with id `row.id` exists
+    - 'update': SET `row.properties` on the node with id `row.id`
+    - 'delete': DETACH DELETE the node with id `row.id`, returning the
+      `id` and `labels` of the nodes it was related to as `neighbours`
+    - 'link': MERGE the relationship from `row.id` to `row.related`
+    - 'unlink': DELETE the relationship from `row.id` to `row.related`
+    - 'clear': DELETE every relationship of `related_name` from `row.id`
+    - 'import': MERGE the node exported as `row.source` and SET
+      `row.properties` on it, returning its `id`
+    - 'import_link': MERGE the relationship from the node exported as
+      `row.source` to the node exported as `row.related`, and the nodes if
+      they have not been imported yet
+    """
+    label = quote(model_name)
+    lines = ['UNWIND $rows AS row']
+
+    if kind == 'create':
+        lines.append('CREATE (n:{})'.format(label))
+        lines.append('SET n = row.properties')
+        lines.append('RETURN row.key AS key, id(n) AS id')
+        return '\n'.join(lines)
+
+    if kind == 'import':
+        lines.append('MERGE (n:{} {{{}: row.source}})'.format(
+            label, quote(EXPORT_ID)))
+        lines.append('SET n += row.properties')
+        lines.append('RETURN row.key AS key, id(n) AS id')
+        return '\n'.join(lines)
+
+    if kind == 'import_link':
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+
+        lines.append('MERGE (n:{} {{{}: row.source}})'.format(
+            label, quote(EXPORT_ID)))
+        lines.append('MERGE (m:{} {{{}: row.related}})'.format(
+            quote(related_model), quote(EXPORT_ID)))
+        lines.append('MERGE ' + relationship_pattern(
+            'n', rel_type, direction, 'm'))
+        lines.append('RETURN row.key AS key')
+        return '\n'.join(lines)
+
+    lines.append('MATCH (n:{}) WHERE id(n) = row.id'.format(label))
+
+    if kind == 'delete':
+        lines.append('OPTIONAL MATCH (n)--(m)')
+        lines.append('WITH row, n, collect(DISTINCT m) AS neighbours')
+        lines.append('DETACH DELETE n')
+        lines.append('RETURN row.key AS key, [m IN neighbours | '
+                     '{id: id(m), labels: labels(m)}] AS neighbours')
+        return '\n'.join(lines)
+
+    if kind == 'update':
+        lines.append('SET n += row.properties')
+    elif kind != 'match':
+        related_model, rel_type, direction = \
+            BaseModel.get_relationship_pattern(model_name, related_name)
+
+        if kind == 'link':
+            lines.append('MATCH (m:{}) WHERE id(m) = row.related'.format(
+                quote(related_model)))
+            lines.append('MERGE ' + relationship_pattern(
+                'n', rel_type, direction, 'm'))
+        elif kind == 'unlink':
+            lines.append('OPTIONAL MATCH {} WHERE id(m) = row.related'.format(
+                relationship_pattern('n', rel_type, direction, 'm',
+                                     related_model, 'r')))
+            lines.append('DELETE r')
+        elif kind == 'clear':
+            lines.append('OPTIONAL MATCH ' + relationship_pattern(
+                'n', rel_type, direction, 'm', related_model, 'r'))
+            lines.append('DELETE r')
+
+    lines.append('RETURN DISTINCT row.key AS key')
+    return '\n'.join(lines)
+
+
+def get_batch_query(model_name, kind, related_name=None):
+    """
+    Return the compiled batch query, compiling it on first use
+    """
+    key = 'batch', model_name, kind, related_name
+
+    try:
+        return compiled_statements[key]
+    except KeyError:
+        statement = compile_batch_query(model_name, kind, related_name)
+        compiled_statements[key] = statement
+        return statement
@@ -0,0 +1,171 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+import gzip
+from io import BytesIO
+import json
+from uuid import UUID
+
+from flask import make_response, request
+
+
+###############################################################################
+#                                                                             #
+#                JSON encoders                                                #
+#                                                                             #
+###############################################################################
+
+
+def encode_default(value):
+    """
+    Encode the values of dumped attributes that are not JSON types
+    """
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+
+    if isinstance(value, Decimal):
+        return float(value)
+
+    if isinstance(value, UUID):
+        return str(value)
+
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def make_json_encoder():
+    """
+    Return the standard library's encoder, which runs in C when compact
+    """
+    def encode(data):
+        return json.dumps(data, separators=(',', ':'), default=encode_default)
+
+    return encode
+
+
+def make_simplejson_encoder():
+    """
+    Return simplejson's C encoder, which keeps decimals exact
+    """
+    import simplejson
+
+    def encode(data):
+        return simplejson.dumps(data, separators=(',', ':'),
+                                default=encode_default, use_decimal=True)
+
+    return encode
+
+
+def make_ujson_encoder():
+    """
+    Return ujson's encoder, the fastest, falling back on the standard
+    library for values it cannot encode
+
+    ujson writes floats with at most 15 significant digits, so it is only
+    chosen when asked for.
+    """
+    import ujson
+
+    fallback = make_json_encoder()
+
+    def encode(data):
+        try:
+            return ujson.dumps(data, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return fallback(data)
+
+    return encode
+
+
+ENCODERS = {
+    'json': make_json_encoder,
+    'simplejson': make_simplejson_encoder,
+    'ujson': make_ujson_encoder
+}
+
+
+def get_encoder(name='auto'):
+    """
+    Return the func encoding documents with a named JSON library
+
+    'auto' picks simplejson when it is installed and the standard library
+    otherwise.
+    """
+    if name == 'auto':
+        try:
+            return make_simplejson_encoder()
+        except ImportError:
+            return make_json_encoder()
+
+    try:
+        return ENCODERS[name]()
+    except KeyError:
+        raise ValueError('Unknown JSON encoder "{}"'.format(name))
+
+
+def make_json_representation(encode):
+    """
+    Return a flask_restful representation writing documents with `encode`
+    """
+    def output_json(data, code, headers=None):
+        response = make_response(encode(data) + '\n', code)
+        response.headers.extend(headers or {})
+        return response
+
+    return output_json
+
+
+###############################################################################
+#                                                                             #
+#                Compression                                                  #
+#                                                                             #
+###############################################################################
+
+
+class GzipCompression(object):
+    """
+    Gzip successful responses of at least `min_size` bytes for clients that
+    accept it
+
+    Streamed responses are left as they are. ETags of compressed responses
+    are made weak, which If-None-Match still matches, as the compressed
+    bytes are not those the strong ETag was computed over.
+    """
+
+    def __init__(self, app=None, min_size=1024, level=6):
+        self.min_size = min_size
+        self.level = level
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if response.status_code != 200 or response.is_streamed or \
+                response.direct_passthrough or \
+                'Content-Encoding' in response.headers:
+            return response
+
+        data = response.get_data()
+
+        if len(data) < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        if not request.accept_encodings['gzip']:
+            return response
+
+        buffer = BytesIO()
+        with gzip.GzipFile(mode='wb', compresslevel=self.level,
+                           fileobj=buffer) as compressed:
+            compressed.write(data)
+
+        response.set_data(buffer.getvalue())
+        response.headers['Content-Encoding'] = 'gzip'
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        return response
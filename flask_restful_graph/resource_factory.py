@@ -1,8 +1,23 @@
-from flask import jsonify, request
+from flask import Response, current_app, request, stream_with_context, \
+    url_for
 from flask_restful import Resource
 from py2neo import ConstraintError
 
+from .backends import GraphBackend, Neo4jBackend
+from .bulk import export_lines
+from .cache import ResponseCache
+from .concurrency import ConcurrentBackend
+from .document import DocumentBuilder, get_resource_links, \
+    make_resource_identifier, make_resource_object
+from .instrumentation import InstrumentedBackend
 from .models import BaseModel
+from .operations import BatchWriter, NodesNotFound, get_linkages, \
+    get_missing_nodes, get_operation_results, plan_operations, \
+    update_relationship
+from .pagination import PageRows
+from .parameters import parse_bounded_int, parse_fields, parse_filters, \
+    parse_include, parse_page, parse_sort, parse_types
+from .streaming import stream_document
 
 
 BaseModel.build_schemas()
@@ -52,40 +67,157 @@ def create_resource_endpoint(name, methods_dict):
     )
 
 
-def get_individual_node(cls, graph):
+def get_individual_document(cls, graph):
     """
-    Return func for getting a node from graph by type and id
+    Return func for loading one node and its related nodes in one query
     """
-    def get_node_by_id(self, id):
-        return cls.select(graph, id).first()
+    def get_document_by_id(self, id, include=(), fields=()):
+        return graph.read_documents(
+            cls.__name__, {'id': id}, include=include, individual=True,
+            fields=fields)
 
-    return get_node_by_id
+    return get_document_by_id
 
 
-def get_node_collection(cls, graph):
+def get_page_cursor(page):
     """
-    Return func for obtaining an iterable of nodes from graph of 1 type
+    Return the mode of a page query and the cursor keyset it starts from
     """
-    def get_nodes_by_type(self):
-        return cls.select(graph)
+    if 'after' in page:
+        return 'after', page['after']
+    elif 'before' in page:
+        return 'before', page['before']
 
-    return get_nodes_by_type
+    return 'first', []
 
 
-def make_resource_linkage(type_and_id):
+def get_collection_document(cls, graph):
     """
-    Unpack type_and_id tuple into serializable dictionary
+    Return func for loading a page of nodes of 1 type and their related nodes
     """
-    return {'type': type_and_id[0], 'id': type_and_id[1]}
+    def get_documents_by_type(self, page, include=(), fields=(),
+                              filters=((), []), sort=()):
+        mode, cursor = get_page_cursor(page)
+        conditions, values = filters
 
+        # one extra node tells whether there is a further page
+        return graph.read_documents(
+            cls.__name__,
+            {'cursor': cursor, 'filters': values, 'limit': page['size'] + 1},
+            include=include, page=mode, fields=fields, filters=conditions,
+            sort=sort,
+            null_cursor=tuple(value is None for value in cursor[:-1]))
 
-def contains_type_and_id(collection, type_and_id):
+    return get_documents_by_type
+
+
+def get_related_document(cls, relation, graph):
+    """
+    Return func for loading the nodes related to one node in one query
+    """
+    related_model = BaseModel.get_relationship_pattern(
+        cls.__name__, relation)[0]
+
+    def get_related_by_id(self, id, include=(), fields=(), page=None,
+                          sort=()):
+        if page is None:
+            return graph.read_documents(
+                related_model, {'id': id}, include=include,
+                related=(cls.__name__, relation), fields=fields)
+
+        mode, cursor = get_page_cursor(page)
+
+        # one extra node tells whether there is a further page
+        return graph.read_documents(
+            related_model,
+            {'id': id, 'cursor': cursor, 'limit': page['size'] + 1},
+            include=include, related=(cls.__name__, relation), page=mode,
+            fields=fields, sort=sort,
+            null_cursor=tuple(value is None for value in cursor[:-1]))
+
+    return get_related_by_id
+
+
+def get_related_count(cls, relation, graph):
+    """
+    Return func for counting the nodes related to one node in the database
+    """
+    def count_related_by_id(self, id):
+        return graph.count_related(cls.__name__, relation, id)
+
+    return count_related_by_id
+
+
+def get_selection(model_name, page, indexed_properties):
+    """
+    Parse the request's `filter` and `sort` parameters for a collection
+
+    Filters on properties without an index would scan the whole label, so
+    they are rejected unless ALLOW_UNINDEXED_FILTERS is set.
+    """
+    filters = parse_filters(model_name, request.args)
+    sort = parse_sort(model_name, request.args.get('sort'))
+
+    if not current_app.config.get('ALLOW_UNINDEXED_FILTERS', False):
+        unindexed = [prop_name for prop_name, _ in filters[0]
+                     if (model_name, prop_name) not in indexed_properties()]
+        if unindexed:
+            raise ValueError('Cannot filter on unindexed properties of {}: {}'
+                             .format(model_name, ', '.join(unindexed)))
+
+    check_cursors(page, sort)
+
+    return filters, sort
+
+
+def get_related_sort(model_name, page):
+    """
+    Parse the request's `sort` parameter for a page of related nodes
+    """
+    sort = parse_sort(model_name, request.args.get('sort'))
+    check_cursors(page, sort)
+
+    return sort
+
+
+def check_cursors(page, sort):
+    for cursor_name in ('after', 'before'):
+        if cursor_name in page and len(page[cursor_name]) != len(sort) + 1:
+            raise ValueError('"page[{}]" cursor does not match "sort"'
+                             .format(cursor_name))
+
+
+def is_streaming():
+    """
+    Check whether collection documents are streamed as they are read
+    """
+    return current_app.config.get('STREAM_RESPONSES', False)
+
+
+def get_page(streaming=False):
     """
-    Search collection for combo of type and id identifying a resource
+    Parse the request's `page` parameters, enforcing the maximum page size
     """
-    for item in collection:
-        if (item['type'], item['id']) == type_and_id:
-            return True
+    config = current_app.config
+
+    if streaming:
+        max_size = config.get('MAX_STREAMED_PAGE_SIZE', 10000)
+    else:
+        max_size = config.get('MAX_PAGE_SIZE', 100)
+
+    return parse_page(request.args,
+                      config.get('DEFAULT_PAGE_SIZE', 20),
+                      max_size)
+
+
+def get_include(model_name):
+    """
+    Parse the request's `include` parameter for documents of a model
+    """
+    return parse_include(
+        model_name,
+        request.args.get('include'),
+        current_app.config.get('MAX_INCLUDE_DEPTH', 3))
 
 
 ###############################################################################
@@ -99,23 +231,16 @@ def bad_request(*error_messages):
     """
     Return 400 status code with list of error messages
     """
-    error_object = {'errors': []}
-
-    for message in error_messages:
-        error_object['errors'].append({'detail': message})
+    return {'errors': [{'detail': message}
+                       for message in error_messages]}, 400
 
-    response = jsonify(error_object)
-    response.status_code = 400
-    return response
 
-
-def not_found(error_message):
+def not_found(*error_messages):
     """
-    Return 404 status code with info about attempted lookup
+    Return 404 status code with info about attempted lookups
     """
-    response = jsonify({'errors': [{'detail': error_message}]})
-    response.status_code = 404
-    return response
+    return {'errors': [{'detail': message}
+                       for message in error_messages]}, 404
 
 
 ###############################################################################
@@ -125,79 +250,324 @@ def not_found(error_message):
 ###############################################################################
 
 
-def get_resource(func):
+def get_resource(cls, func):
     """
     Return func for representing a single resource response
     """
     def make_response(self, id):
-        response = {}
-        response['links'] = get_top_level_links()
-        response['data'], response['included'] = func(self, id).serialize()
-        return response
+        try:
+            include = get_include(cls.__name__)
+            fields = parse_fields(request.args)
+        except ValueError as e:
+            return bad_request(e.message)
+
+        builder = DocumentBuilder(cls.__name__, include, fields)
+
+        for row in func(self, id, include, fields):
+            builder.add_row(row)
+
+        if not builder.data:
+            return not_found('Requested node of type {} with id {} not found'
+                             .format(cls.__name__, id))
+
+        return {
+            'links': get_top_level_links(),
+            'data': builder.data[0],
+            'included': builder.included
+        }
 
     return make_response
 
 
-def get_resources(func):
+def get_resources(cls, func, indexed_properties, encode):
     """
-    Return func for representing a collection of resource objects
+    Return func for representing a collection of resource objects, streamed
+    with `encode` when responses are streamed
     """
     def make_response(self):
-        response = {
-            'links': get_top_level_links(),
-            'data': [],
-            'included': []
-        }
+        streaming = is_streaming()
+
+        try:
+            include = get_include(cls.__name__)
+            fields = parse_fields(request.args)
+            page = get_page(streaming)
+            filters, sort = get_selection(
+                cls.__name__, page, indexed_properties)
+        except ValueError as e:
+            return bad_request(e.message)
+
+        builder = DocumentBuilder(cls.__name__, include, fields)
+        rows = PageRows(
+            page, func(self, page, include, fields, filters, sort))
 
-        for node in func(self):
-            data, included = node.serialize()
-            response['data'].append(data)
-            for included_item in included:
-                type_and_id = included_item['type'], included_item['id']
-                if not response['included'] or\
-                   not contains_type_and_id(response['included'], type_and_id):
-                    response['included'].append(included_item)
+        def get_links():
+            links = get_top_level_links()
+            links.update(rows.get_links())
+            return links
 
-        return response
+        if streaming:
+            return stream_document(builder, rows, get_links, encode)
+
+        for row in rows:
+            builder.add_row(row)
+
+        return {
+            'links': get_links(),
+            'data': builder.data,
+            'included': builder.included
+        }
 
     return make_response
 
 
 # was having closure issues with `relationship` name in the loop, so
 # captured it in a closure
-def get_relationships(relationship, func):
+def get_relationships(cls, relationship, func, get_related, count):
+    """
+    Return func for representing the linkage of a relationship
+
+    Plural linkage is paginated and counted, and only the ids of related
+    nodes are read.
+    """
+    related_model = BaseModel.get_relationship_pattern(
+        cls.__name__, relationship)[0]
+    is_plural = BaseModel.related_models[cls.__name__][relationship]
+
+    # only the linkage of the one relationship is read
+    fields = ((cls.__name__, ((), (relationship,))),)
+    linkage_fields = ((related_model, ((), ())),)
+
     def get(self, id):
-        relationships = getattr(func(self, id), relationship)
+        if is_plural:
+            return get_related_page(
+                self, id, cls.__name__, related_model, get_related, count,
+                (), linkage_fields, linkage_only=True)
+
+        row = next(iter(func(self, id, (), fields)), None)
+
+        if row is None:
+            return not_found('Requested node of type {} with id {} not found'
+                             .format(cls.__name__, id))
+
+        data = [make_resource_identifier(related_model, node)
+                for node in row['relationships'][relationship]]
+
+        return {
+            'links': get_top_level_links(),
+            'data': data[0] if data else None
+        }
+
+    return get
+
+
+def get_related_page(self, id, model_name, related_model, func, count,
+                     include, fields, encode=None, linkage_only=False):
+    """
+    Represent a page of the nodes related to a node, with their count
+
+    The count is read first, so that a missing node is not found without
+    reading a page. Linkage is never streamed, so needs no `encode`.
+    """
+    streaming = is_streaming() and not linkage_only
+
+    try:
+        page = get_page(streaming)
+        sort = get_related_sort(related_model, page)
+    except ValueError as e:
+        return bad_request(e.message)
 
-        data = [make_resource_linkage(x.get_type_and_id())
-                for x in relationships]
+    total = count(self, id)
 
+    if total is None:
+        return not_found('Requested node of type {} with id {} not found'
+                         .format(model_name, id))
+
+    builder = DocumentBuilder(related_model, include, fields)
+
+    # a node without related nodes on the page has one null row
+    rows = PageRows(page, (
+        row for row in func(self, id, include, fields, page, sort)
+        if row['id'] is not None))
+    meta = {'count': total}
+
+    def get_links():
         links = get_top_level_links()
+        links.update(rows.get_links())
+        return links
+
+    if linkage_only:
+        data = [make_resource_identifier(related_model, row) for row in rows]
+        return {'links': get_links(), 'meta': meta, 'data': data}
+
+    if streaming:
+        return stream_document(builder, rows, get_links, encode, meta)
+
+    for row in rows:
+        builder.add_row(row)
+
+    return {
+        'links': get_links(),
+        'meta': meta,
+        'data': builder.data,
+        'included': builder.included
+    }
+
+
+def get_related_resources(cls, relationship, func, count, encode):
+    related_model = BaseModel.get_relationship_pattern(
+        cls.__name__, relationship)[0]
+    is_plural = BaseModel.related_models[cls.__name__][relationship]
+
+    def get(self, id):
+        try:
+            include = get_include(related_model)
+            fields = parse_fields(request.args)
+        except ValueError as e:
+            return bad_request(e.message)
+
+        if is_plural:
+            return get_related_page(
+                self, id, cls.__name__, related_model, func, count, include,
+                fields, encode)
+
+        builder = DocumentBuilder(related_model, include, fields)
+        rows = list(func(self, id, include, fields))
+
+        if not rows:
+            return not_found('Requested node of type {} with id {} not found'
+                             .format(cls.__name__, id))
+
+        for row in rows:
+            builder.add_row(row)
 
         return {
-            'links': links,
-            'data': data
+            'links': get_top_level_links(),
+            'data': builder.data[0] if builder.data else None,
+            'included': builder.included
         }
 
     return get
 
 
-def get_related_resources(relationship, func):
+###############################################################################
+#                                                                             #
+#                 Traversal helpers                                           #
+#                                                                             #
+###############################################################################
+
+
+def make_traversed_resource(node):
+    """
+    Make a resource object with links out of a node map of any model
+    """
+    model_name = next(label for label in node['labels']
+                      if label in BaseModel.plans)
+    resource = make_resource_object(model_name, node)
+    resource['links'] = get_resource_links(model_name, node['id'])
+
+    return resource
+
+
+def get_neighborhood(cls, graph):
+    """
+    Return func for representing the nodes within a few hops of a node
+
+    Nodes are found in one traversal over every model relationship, in
+    either direction, and each is listed once with its distance in hops.
+    """
     def get(self, id):
-        related_nodes = getattr(func(self, id), relationship)
+        config = current_app.config
+
+        try:
+            depth = parse_bounded_int(
+                request.args, 'depth', 1,
+                config.get('MAX_NEIGHBORHOOD_DEPTH', 3))
+            limit = parse_bounded_int(
+                request.args, 'limit', config.get('DEFAULT_PAGE_SIZE', 20),
+                config.get('MAX_PAGE_SIZE', 100))
+            labels = parse_types(request.args.get('type'))
+        except ValueError as e:
+            return bad_request(e.message)
 
-        data = [node.serialize()[0] for node in related_nodes]
+        rows = list(graph.read_neighborhood(
+            cls.__name__, id, depth, limit, labels))
 
-        links = get_top_level_links()
+        if not rows:
+            return not_found('Requested node of type {} with id {} not found'
+                             .format(cls.__name__, id))
+
+        data = []
+
+        # a node without neighbours has one null row
+        for row in rows:
+            if row['id'] is not None:
+                resource = make_traversed_resource(row)
+                resource['meta'] = {'distance': row['distance']}
+                data.append(resource)
 
         return {
-            'links': links,
+            'links': get_top_level_links(),
+            'meta': {'count': len(data), 'depth': depth},
             'data': data
         }
 
     return get
 
 
+def get_path(cls, target_model, graph):
+    """
+    Return func for representing a shortest path from a node to another
+
+    The path is found in one traversal of at most MAX_PATH_LENGTH hops, and
+    its nodes are listed in order from the first to the second.
+    """
+    def get(self, id, target_id):
+        max_length = current_app.config.get('MAX_PATH_LENGTH', 6)
+
+        rows = list(graph.read_path(
+            cls.__name__, id, target_model, target_id, max_length))
+
+        if not rows:
+            return not_found(
+                'Requested nodes of type {} with id {} and of type {} with '
+                'id {} not found'.format(
+                    cls.__name__, id, target_model, target_id))
+
+        nodes = rows[0]['nodes']
+
+        if nodes is None:
+            return not_found('No path of at most {} relationships found'
+                             .format(max_length))
+
+        return {
+            'links': get_top_level_links(),
+            'meta': {'length': len(nodes) - 1},
+            'data': [make_traversed_resource(node) for node in nodes]
+        }
+
+    return get
+
+
+###############################################################################
+#                                                                             #
+#                 Export helpers                                              #
+#                                                                             #
+###############################################################################
+
+
+def get_export(cls, graph, encode):
+    """
+    Return func streaming every node of a model, and the relationships it
+    exports, as NDJSON
+    """
+    def get(self):
+        return Response(
+            stream_with_context(export_lines(graph, [cls.__name__], encode)),
+            mimetype='application/x-ndjson')
+
+    return get
+
+
 ###############################################################################
 #                                                                             #
 #                 POST helpers                                                #
@@ -205,14 +575,60 @@ def get_related_resources(relationship, func):
 ###############################################################################
 
 
-def post_to_resource(cls, graph):
+def find_missing_nodes(tx, model_name, linkages):
+    """
+    Look up every linked node id at once and describe those not found
+    """
+    ids = sorted(set(id for ids in linkages.itervalues() for id in ids))
+
+    if not ids:
+        return []
+
+    return get_missing_nodes(model_name, linkages, tx.find_nodes(ids))
+
+
+def create_node(graph, model_name, properties, linkages):
+    """
+    Create a node and its relationships in a transaction of their own
+
+    Raises NodesNotFound when linked nodes are missing.
+    """
+    # linked nodes are looked up in the transaction creating the node, so
+    # they cannot disappear in between
+    tx = graph.begin()
+
+    try:
+        missing = find_missing_nodes(tx, model_name, linkages)
+
+        if missing:
+            raise NodesNotFound(*missing)
+
+        node_id = tx.create_node(model_name, properties, linkages)
+        tx.commit()
+
+    # any failure gives back the transaction's connection
+    except Exception:
+        if not tx.finished():
+            tx.rollback()
+        raise
+
+    return node_id
+
+
+def post_to_resource(cls, graph, cache, coalescer=None):
+    """
+    Return func creating a node, through the coalescer if there is one
+    """
+    model_name = cls.__name__
+    get_created_resource = get_resource(
+        cls, get_individual_document(cls, graph))
 
     def post(self):
         body = request.get_json()
-        schema = BaseModel.schemas[cls.__name__]
+        schema = BaseModel.schemas[model_name]
 
         try:
-            if body['data']['type'] != cls.__name__.lower():
+            if body['data']['type'] != model_name.lower():
                 return bad_request('"type" member does not match resource')
 
             data, errors = schema.load(body['data']['attributes'])
@@ -220,121 +636,43 @@ def post_to_resource(cls, graph):
             if not data:
                 return bad_request('No matching attributes submitted')
 
-            elif not errors:
-
-                # get any included relationships in the request and
-                # check if they exist (else 404)
-                if 'relationships' in body['data']:
-                    added_relationships = body['data']['relationships']
-                    relationships = []
-
-                    # 'entities' is either a single resource linkage object
-                    # or a list of resource linkage objects
-                    # so we need to check types :(
-                    for prop_name, entities in added_relationships.iteritems():
-                        related_models = BaseModel.related_models[cls.__name__]
-
-                        if prop_name not in related_models:
-                            return bad_request('{} model does not contain \
-                                    relationship "{}"'.format(
-                                        cls.__name__, prop_name
-                                    ))
-
-                        try:
-                            if isinstance(entities['data'], dict):
-                                # this boolean means it's a to-many collection
-                                if related_models[prop_name]:
-                                    return bad_request(
-                                        'Property "{}" on {} entity is not \
-                                         a collection but was submitted as \
-                                         one'.format(prop_name, cls.__name__))
-
-                                related_cls = \
-                                    get_class_from_model_name(
-                                        str(entities['data']['type'].title())
-                                    )
-                                get_node_by_id = \
-                                    get_individual_node(related_cls, graph)
-
-                                node_id = int(entities['data']['id'])
-                                node = get_node_by_id(None, node_id)
-
-                                if not node:
-                                    return not_found('Requested node of\
-                                                    type {} with id {}\
-                                                    not found'.format(
-                                                        cls.__name__, node_id
-                                                    ))
-                                else:
-                                    relationships.append((prop_name, node))
-
-                            # it is a list of resource linkage objects
-                            else:
-                                # this boolean means it's a to-many collection
-                                if not related_models[prop_name]:
-                                    return bad_request(
-                                        'Property "{}" on {} entity is a \
-                                         collection but was not submitted \
-                                         as one'.format(
-                                             prop_name, cls.__name__)
-                                        )
-
-                                model_name = str(entities['data'][0]['type'])
-                                related_cls = \
-                                    get_class_from_model_name(
-                                        model_name.title()
-                                    )
-                                get_node_by_id = \
-                                    get_individual_node(related_cls, graph)
-
-                                for related in entities['data']:
-                                    node_id = int(related['id'])
-                                    node = get_node_by_id(None, node_id)
-
-                                    if not node:
-                                        return not_found(
-                                            'Requested node of type {} \
-                                             with id {} not found'.format(
-                                                cls.__name__, node_id
-                                            ))
-                                    else:
-                                        relationships.append((prop_name, node))
-
-                        except ValueError as e:
-                            return bad_request('Couldn\'t parse "id"\
-                                                property to an int')
-                        except KeyError:
-                            return bad_request(
-                                    'Malformed resource linkage in\
-                                     "relationships" member')
-
-                        print prop_name, entities
-
-                new_node = cls()
-
-                for attribute, value in data.iteritems():
-                    setattr(new_node, attribute, value)
-
-                try:
-                    for prop_name, node in relationships:
-                        getattr(new_node, prop_name).add(node)
-                    graph.push(new_node)
-
-                except ConstraintError as e:
-                    return bad_request(e.message)
-
-                response = {}
-                response['links'] = 'fix meeeee'
-                response['data'], response['included'] = new_node.serialize()
-
-                return response
-
-            else:
+            elif errors:
                 return bad_request(
                     *['{}: {}'.format(attribute, error)
                       for attribute, error_list in errors.iteritems()
                       for error in error_list])
 
+            linkages = get_linkages(
+                model_name, body['data'].get('relationships', {}))
+
+            try:
+                if coalescer is not None:
+                    node_id = coalescer.create(
+                        graph, model_name, data, linkages)
+                else:
+                    node_id = create_node(graph, model_name, data, linkages)
+
+            except NodesNotFound as e:
+                return not_found(*e.messages)
+
+            except ConstraintError as e:
+                return bad_request(e.message)
+
+            cache.invalidate(
+                [(model_name, node_id)] +
+                [(BaseModel.get_relationship_pattern(
+                    model_name, related_name)[0], related_id)
+                 for related_name, related_ids in linkages.iteritems()
+                 for related_id in related_ids])
+
+            # top-level links are absolute, as those of other documents
+            response = get_created_resource(self, node_id)
+            response['links'] = {'self': url_for(
+                model_name.lower() + 'resource', id=node_id,
+                _external=True)}
+
+            return response
+
         except ValueError as e:
             return bad_request(e.message)
 
@@ -344,6 +682,121 @@ def post_to_resource(cls, graph):
     return post
 
 
+###############################################################################
+#                                                                             #
+#                 Relationship update helpers                                 #
+#                                                                             #
+###############################################################################
+
+
+def update_linkage(cls, relationship, graph, cache, mode, get_linkage):
+    """
+    Return func adding, removing or replacing the linkage of a relationship,
+    responding with the linkage as updated
+    """
+    model_name = cls.__name__
+
+    def update(self, id):
+        try:
+            related_ids = get_linkages(
+                model_name, {relationship: request.get_json()})[relationship]
+        except ValueError as e:
+            return bad_request(e.message)
+
+        tx = graph.begin()
+
+        try:
+            touched = update_relationship(
+                tx, model_name, relationship, id, related_ids, mode)
+            tx.commit()
+
+        except NodesNotFound as e:
+            tx.rollback()
+            return not_found(*e.messages)
+
+        except ConstraintError as e:
+            if not tx.finished():
+                tx.rollback()
+            return bad_request(e.message)
+
+        except Exception:
+            if not tx.finished():
+                tx.rollback()
+            raise
+
+        cache.invalidate(touched)
+
+        return get_linkage(self, id)
+
+    return update
+
+
+###############################################################################
+#                                                                             #
+#                 Atomic operations helpers                                   #
+#                                                                             #
+###############################################################################
+
+
+def post_operations(graph, cache):
+    """
+    Return func applying a list of atomic operations in one transaction
+    """
+    def post(self):
+        body = request.get_json()
+
+        try:
+            operations = body['atomic:operations']
+
+            if not isinstance(operations, list) or not operations:
+                return bad_request(
+                    '"atomic:operations" member must be a non-empty list')
+
+            max_operations = current_app.config.get(
+                'MAX_ATOMIC_OPERATIONS', 1000)
+            if len(operations) > max_operations:
+                return bad_request('At most {} operations can be submitted'
+                                   .format(max_operations))
+
+            batches = plan_operations(operations)
+
+        except ValueError as e:
+            return bad_request(e.message)
+
+        except (KeyError, TypeError):
+            return bad_request('Missing "atomic:operations" member')
+
+        tx = graph.begin()
+
+        writer = BatchWriter(tx)
+
+        try:
+            results = writer.apply(batches)
+            atomic_results = get_operation_results(
+                tx, results, len(operations))
+            tx.commit()
+
+        except NodesNotFound as e:
+            tx.rollback()
+            return not_found(*e.messages)
+
+        except ConstraintError as e:
+            if not tx.finished():
+                tx.rollback()
+            return bad_request(e.message)
+
+        except Exception:
+            if not tx.finished():
+                tx.rollback()
+            raise
+
+        cache.invalidate(writer.touched)
+
+        return {'atomic:results': atomic_results}
+
+    return post
+
+
 ###############################################################################
 #                                                                             #
 #                                                                             #
@@ -353,15 +806,46 @@ def post_to_resource(cls, graph):
 
 class ResourceFactory(object):
 
-    def __init__(self, graph):
+    def __init__(self, graph, cache=None, metrics=None, executor=None,
+                 coalescer=None):
+        # a py2neo Graph is run through the Neo4j backend
+        if not isinstance(graph, GraphBackend):
+            graph = Neo4jBackend(graph)
+
+        # each concurrent part is measured as a query of its own
+        if metrics is not None:
+            graph = InstrumentedBackend(graph)
+
+        # documents are read in concurrent parts through an executor
+        if executor is not None:
+            graph = ConcurrentBackend(graph, executor)
+
         self.graph = graph
+        self.indexed_properties = graph.indexed_properties
+        self.cache = cache if cache is not None else ResponseCache()
+        self.metrics = metrics
+        self.executor = executor
+        self.coalescer = coalescer
+
+    def create_resource_endpoint(self, name, methods_dict):
+        """
+        Make a Resource, with its methods measured if there are metrics
+        """
+        if self.metrics is not None:
+            methods_dict = dict(
+                (method, self.metrics.measured(
+                    func, name + 'Resource', method))
+                for method, func in methods_dict.iteritems())
+
+        return create_resource_endpoint(name, methods_dict)
 
     def make_individual_resource(self, cls):
-        get = get_individual_node(cls, self.graph)
+        get = get_individual_document(cls, self.graph)
 
-        return create_resource_endpoint(
+        return self.create_resource_endpoint(
             cls.__name__, {
-                'get': get_resource(get)
+                'get': self.cache.cached(
+                    get_resource(cls, get), cls.__name__)
             }
         )
 
@@ -369,12 +853,40 @@ class ResourceFactory(object):
         collection_name = cls.__pluralname__ if hasattr(cls, '__pluralname__')\
             else cls.__name__ + 's'
 
-        get_all = get_node_collection(cls, self.graph)
+        get_all = get_collection_document(cls, self.graph)
 
-        return create_resource_endpoint(
+        return self.create_resource_endpoint(
             collection_name, {
-                'get': get_resources(get_all),
-                'post': post_to_resource(cls, self.graph)
+                'get': self.cache.cached(
+                    get_resources(cls, get_all, self.indexed_properties,
+                                  self.cache.encode),
+                    cls.__name__, collection=True),
+                'post': post_to_resource(
+                    cls, self.graph, self.cache, self.coalescer)
+            }
+        )
+
+    def make_export_resource(self, cls):
+        return self.create_resource_endpoint(
+            cls.__name__ + 'Export', {
+                'get': get_export(cls, self.graph, self.cache.encode)
+            }
+        )
+
+    def make_operations_resource(self):
+        return self.create_resource_endpoint(
+            'Operations', {
+                'post': post_operations(self.graph, self.cache)
+            }
+        )
+
+    def make_metrics_resource(self):
+        metrics = self.metrics
+
+        return create_resource_endpoint(
+            'Metrics', {
+                'get': lambda self: Response(
+                    metrics.render(), mimetype='text/plain; version=0.0.4')
             }
         )
 
@@ -387,50 +899,81 @@ class ResourceFactory(object):
 
         for model_name in related_models:
             cls = get_class_from_model_name(model_name)
-            get_node = get_individual_node(cls, self.graph)
-
-            for relation, is_plural in related_models[model_name].iteritems():
-
-                # build urls for resource's relationships and entities
-                relationship_url = '/{}/<int:id>/relationships/{}'.format(
-                                    model_name.lower() + 's',
-                                    relation)
-
-                related_property_url = '/{}/<int:id>/{}'.format(
-                                    model_name.lower() + 's', relation)
+            get_document = get_individual_document(cls, self.graph)
+
+            plans = BaseModel.plans[model_name].relationships
+
+            for relation in related_models[model_name]:
+
+                # urls are the link paths of the model's serialization plan
+                relationship_url = plans[relation].self_path.format(
+                    '<int:id>')
+                related_property_url = plans[relation].related_path.format(
+                    '<int:id>')
+
+                get_related = get_related_document(
+                    cls, relation, self.graph)
+                count = get_related_count(cls, relation, self.graph)
+
+                get_linkage = get_relationships(
+                    cls, relation, get_document, get_related, count)
+                methods = {
+                    'get': self.cache.cached(get_linkage, model_name),
+                    'patch': update_linkage(
+                        cls, relation, self.graph, self.cache, 'replace',
+                        get_linkage)
+                }
+
+                # members are only added and removed on to-many relationships
+                if related_models[model_name][relation]:
+                    for method, mode in (('post', 'add'),
+                                         ('delete', 'remove')):
+                        methods[method] = update_linkage(
+                            cls, relation, self.graph, self.cache, mode,
+                            get_linkage)
 
                 # extend Resource for each url
-                if is_plural:
-                    relationship_resource = create_resource_endpoint(
-                        model_name + relation + 'Relationship', {
-                            'get': get_relationships(relation, get_node)
-                        }
-                    )
-
-                    related_resource = create_resource_endpoint(
-                        model_name + relation, {
-                            'get': get_related_resources(
-                                    relation, get_node)
-                        }
-                    )
-                else:
-                    relationship_resource = create_resource_endpoint(
-                        model_name + relation + 'Relationship', {
-                            'get': lambda self, id:
-                                getattr(get_node(self, id), relation)
-                                .serialize()
-                        }
-                    )
-
-                    related_resource = create_resource_endpoint(
-                        model_name + relation, {
-                            'get': lambda self, id:
-                                getattr(get_node(self, id), relation)
-                                .serialize()
-                        }
-                    )
+                relationship_resource = self.create_resource_endpoint(
+                    model_name + relation + 'Relationship', methods)
+
+                related_resource = self.create_resource_endpoint(
+                    model_name + relation, {
+                        'get': self.cache.cached(
+                            get_related_resources(
+                                cls, relation, get_related, count,
+                                self.cache.encode),
+                            model_name)
+                    }
+                )
 
                 resources.append((relationship_resource, relationship_url))
                 resources.append((related_resource, related_property_url))
 
         return resources
+
+    def make_traversal_resources(self, model_names):
+        """
+        Make the neighborhood resource of each model and the path resources
+        from each model to every model, with their urls
+        """
+        resources = []
+
+        for model_name in model_names:
+            cls = get_class_from_model_name(model_name)
+            path = BaseModel.plans[model_name].self_path.format('<int:id>')
+
+            resources.append((self.create_resource_endpoint(
+                model_name + 'Neighborhood', {
+                    'get': get_neighborhood(cls, self.graph)
+                }), path + '/neighborhood'))
+
+            for target_model in model_names:
+                target_path = BaseModel.plans[target_model].self_path.format(
+                    '<int:target_id>')
+
+                resources.append((self.create_resource_endpoint(
+                    model_name + target_model + 'Path', {
+                        'get': get_path(cls, target_model, self.graph)
+                    }), path + '/path' + target_path))
+
+        return resources
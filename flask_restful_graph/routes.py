@@ -0,0 +1,41 @@
+from .models import BaseModel
+from .resource_factory import get_class_from_model_name
+
+
+###############################################################################
+#                                                                             #
+#                Registering resources                                        #
+#                                                                             #
+###############################################################################
+
+
+def register_resources(api, resource_factory):
+    """
+    Add the resources of every model, their exports, relationships and
+    traversals, the atomic operations endpoint and, with metrics, the
+    metrics endpoint to a flask_restful Api
+    """
+    for model_name in sorted(BaseModel.plans):
+        cls = get_class_from_model_name(model_name)
+        resource, collection = \
+            resource_factory.make_individual_and_collection_resources(cls)
+        path = BaseModel.plans[cls.__name__].self_path.format('')
+
+        api.add_resource(collection, path)
+        api.add_resource(resource, path + '<int:id>')
+        api.add_resource(resource_factory.make_export_resource(cls),
+                         path + 'export')
+
+    api.add_resource(resource_factory.make_operations_resource(),
+                     '/operations')
+
+    if resource_factory.metrics is not None:
+        api.add_resource(resource_factory.make_metrics_resource(), '/metrics')
+
+    for resource, url in resource_factory.make_relationship_resources(
+            BaseModel.related_models):
+        api.add_resource(resource, url)
+
+    for resource, url in resource_factory.make_traversal_resources(
+            sorted(BaseModel.plans)):
+        api.add_resource(resource, url)
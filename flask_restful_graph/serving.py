@@ -0,0 +1,13 @@
+"""
+App serving requests in greenlets, with the parts of documents read
+concurrently
+
+    gunicorn --worker-class gevent flask_restful_graph.serving:app
+
+gevent's worker patches the socket module before the app is loaded, so
+the graph queries of every request in a worker share its event loop.
+"""
+from .application import create_app
+
+
+app = create_app({'CONCURRENT_READS': 'gevent'})
@@ -0,0 +1,41 @@
+import os
+
+
+# default settings of create_app, overridable from RESTFUL_GRAPH_SETTINGS
+MAX_INCLUDE_DEPTH = 3
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+STREAM_RESPONSES = False
+MAX_STREAMED_PAGE_SIZE = 10000
+ALLOW_UNINDEXED_FILTERS = False
+MAX_ATOMIC_OPERATIONS = 1000
+MAX_NEIGHBORHOOD_DEPTH = 3
+MAX_PATH_LENGTH = 6
+RESPONSE_CACHE_SIZE = 1024
+
+# 'auto', 'json', 'simplejson' or 'ujson'; responses of at least
+# GZIP_MIN_SIZE bytes are gzipped for clients accepting it, if it is set
+JSON_ENCODER = 'auto'
+GZIP_MIN_SIZE = None
+GZIP_LEVEL = 6
+COLLECT_METRICS = True
+
+# 'gevent' or 'threads' reads the parts of documents concurrently, with
+# at most CONCURRENT_READS_PER_REQUEST parts of a request read at once
+CONCURRENT_READS = None
+CONCURRENT_READS_PER_REQUEST = 4
+
+# commit the creates of concurrent POSTs together, in batches of at most
+# COALESCE_MAX_BATCH gathered for at most COALESCE_WINDOW seconds
+COALESCE_WRITES = False
+COALESCE_MAX_BATCH = 100
+COALESCE_WINDOW = 0.005
+
+# create the indexes and constraints declared on model properties when the
+# app is created, as `python -m flask_restful_graph.indexes` does
+SYNC_INDEXES = False
+
+# passed on to py2neo's Graph when a process first queries the graph
+GRAPH_SETTINGS = {'password': os.environ.get('TEST_GRAPH_PASSWORD')}
+GRAPH_POOL_SIZE = 10
+GRAPH_POOL_TIMEOUT = 30.0
@@ -0,0 +1,70 @@
+from tempfile import TemporaryFile
+
+from flask import Response, stream_with_context
+
+
+###############################################################################
+#                                                                             #
+#                Streamed documents                                           #
+#                                                                             #
+###############################################################################
+
+
+def stream_document(builder, rows, get_links, encode, meta=None):
+    """
+    Return a response writing a collection document while rows are read
+
+    Primary resource objects are written as soon as their row is serialized.
+    Included resource objects are spooled to a temporary file and written
+    after `data`, so memory holds one row's resource objects and the keys of
+    those already written, however many nodes match. `links` are written
+    last, because pagination links are only known once the rows run out.
+    `meta` is written before them if given. Objects are written with
+    `encode`, the app's document encoder, which writes them on one line.
+    """
+    def generate():
+        spool = TemporaryFile()
+
+        try:
+            yield '{"data": ['
+
+            separator = ''
+            for row in rows:
+                builder.add_row(row)
+                data, included = builder.flush()
+
+                for resource in data:
+                    yield separator + encode(resource)
+                    separator = ','
+
+                for resource in included:
+                    spool.write('{}\t{}\t{}\n'.format(
+                        resource['type'], resource['id'],
+                        encode(resource)))
+
+            yield '], "included": ['
+
+            spool.seek(0)
+            separator = ''
+            for line in spool:
+                type, id, resource = line.split('\t', 2)
+
+                # included before it turned up as primary data
+                if (type, id) in builder.primary_keys:
+                    continue
+
+                yield separator + resource.rstrip('\n')
+                separator = ','
+
+            yield ']'
+
+            if meta is not None:
+                yield ', "meta": ' + encode(meta)
+
+            yield ', "links": {}}}'.format(encode(get_links()))
+
+        finally:
+            spool.close()
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/json')
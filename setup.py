@@ -2,11 +2,17 @@ from setuptools import setup
 
 setup(
     name='flask_restful_graph',
-    packages=['flask_restful_graph'],
+    packages=['flask_restful_graph', 'flask_restful_graph.backends',
+              'flask_restful_graph.models'],
     include_package_data=True,
     install_requires=[
         'flask-marshmallow',
         'flask-restful',
         'py2neo'
-    ]
+    ],
+    extras_require={
+        'gevent': ['gevent'],
+        'simplejson': ['simplejson'],
+        'ujson': ['ujson']
+    }
 )
@@ -1,4 +1,4 @@
-export FLASK_APP=flask_restful_graph
+export FLASK_APP=flask_restful_graph.flask_restful_graph
 export FLASK_DEBUG=true
 export TEST_GRAPH_USER=neo4j
 export TEST_GRAPH_PASSWORD=testing
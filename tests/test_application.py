@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import GraphPool, MemoryBackend
+
+
+class TestCreatingApps(TestCase):
+
+    def test_default_graph_connects_on_first_use(self):
+        app = create_app({'GRAPH_POOL_SIZE': 2})
+        graph = app.extensions['restful_graph']['graph']
+
+        self.assertIsInstance(graph, GraphPool)
+        self.assertEqual(graph.size, 2)
+        self.assertIsNone(graph.graph)
+
+    def test_resources_are_registered_for_every_model(self):
+        app = create_app({'COLLECT_METRICS': False}, graph=MemoryBackend())
+        rules = set(rule.rule for rule in app.url_map.iter_rules())
+
+        self.assertTrue(set([
+            '/groups/', '/groups/<int:id>', '/users/', '/users/<int:id>',
+            '/users/<int:id>/groups', '/users/<int:id>/relationships/groups',
+            '/operations']) <= rules)
+        self.assertNotIn('/metrics', rules)
+        self.assertEqual(app.test_client().get('/users/').status_code, 200)
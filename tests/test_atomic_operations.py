@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from flask_restful_graph.operations import LocalId, plan_operations
+
+
+class TestPlanningOperations(TestCase):
+
+    def test_consecutive_operations_share_a_batch(self):
+        batches = plan_operations([
+            {'op': 'add', 'data': {'type': 'user', 'lid': 'a',
+                                   'attributes': {'email': 'a@place.com'}}},
+            {'op': 'add', 'data': {'type': 'user',
+                                   'attributes': {'email': 'b@place.com'}}},
+            {'op': 'add', 'data': {'type': 'group',
+                                   'attributes': {'title': 'A group'}}}
+        ])
+
+        self.assertEqual([batch.key for batch in batches],
+                         [('create', 'User', None),
+                          ('create', 'Group', None)])
+        self.assertEqual([item['index'] for item in batches[0].items],
+                         [0, 1])
+        self.assertEqual(batches[0].items[0]['properties'],
+                         {'email': 'a@place.com'})
+
+    def test_local_ids_refer_to_earlier_operations(self):
+        batches = plan_operations([
+            {'op': 'add', 'data': {'type': 'group', 'lid': 'g',
+                                   'attributes': {'title': 'A group'}}},
+            {'op': 'add',
+             'ref': {'type': 'user', 'id': '8', 'relationship': 'groups'},
+             'data': [{'type': 'group', 'lid': 'g'}]}
+        ])
+
+        item = batches[1].items[0]
+        self.assertEqual(batches[1].key, ('link', 'User', 'groups'))
+        self.assertEqual(item['id'], 8)
+        self.assertIsInstance(item['related'][0], LocalId)
+
+    def test_undefined_local_ids_are_rejected(self):
+        self.assertRaises(ValueError, plan_operations, [
+            {'op': 'remove', 'ref': {'type': 'user', 'lid': 'missing'}}])
+
+    def test_attributes_are_validated_by_schema(self):
+        self.assertRaises(ValueError, plan_operations, [
+            {'op': 'add', 'data': {'type': 'user',
+                                   'attributes': {'email': 'nope'}}}])
@@ -0,0 +1,171 @@
+from unittest import TestCase
+import json
+import os
+import shutil
+import tempfile
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import MemoryBackend, Neo4jBackend
+from flask_restful_graph.backends import neo4j
+from flask_restful_graph.backends.memory import MemoryTransaction
+from flask_restful_graph.bulk import export_lines, import_lines
+from flask_restful_graph.query import compile_batch_query, \
+    compile_export_query
+from flask_restful_graph.representations import make_json_encoder
+
+
+class TestBulkExportAndImport(TestCase):
+
+    def setUp(self):
+        self.graph = MemoryBackend()
+
+        tx = self.graph.begin()
+        self.group_ids = [tx.create_node('Group', {'title': title}, {})
+                          for title in ('first', 'second')]
+        self.user_ids = [
+            tx.create_node('User', {'email': email},
+                           {'groups': self.group_ids[:count]})
+            for email, count in (('guy@place.com', 2),
+                                 ('gal@place.com', 1))]
+        tx.commit()
+
+        self.lines = list(export_lines(
+            self.graph, ['Group', 'User'], make_json_encoder()))
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_users(self, graph):
+        client = create_app(graph=graph).test_client()
+        document = json.loads(client.get('/users/?include=groups').data)
+
+        return sorted(
+            (resource['attributes']['email'], sorted(
+                group['attributes']['title']
+                for group in document['included']
+                if {'type': 'group', 'id': group['id']} in
+                resource['relationships']['groups']['data']))
+            for resource in document['data'])
+
+    def test_nodes_are_exported_before_relationships(self):
+        items = [json.loads(line) for line in self.lines]
+
+        self.assertEqual(
+            [item['type'] for item in items if 'relationship' not in item],
+            ['group', 'group', 'user', 'user'])
+        self.assertEqual(items[2]['attributes'], {'email': 'guy@place.com'})
+        self.assertEqual(
+            [(item['id'], item['related']['id'])
+             for item in items if 'relationship' in item],
+            [(str(self.user_ids[0]), str(self.group_ids[0])),
+             (str(self.user_ids[0]), str(self.group_ids[1])),
+             (str(self.user_ids[1]), str(self.group_ids[0]))])
+
+    def test_exports_are_streamed_per_model(self):
+        response = create_app(graph=self.graph).test_client().get(
+            '/users/export')
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(response.data.splitlines()), 5)
+
+    def test_imports_recreate_the_graph(self):
+        graph = MemoryBackend()
+
+        self.assertEqual(import_lines(graph, iter(self.lines), 2), 7)
+        self.assertEqual(self.get_users(graph), self.get_users(self.graph))
+
+    def test_importing_again_changes_nothing(self):
+        graph = MemoryBackend()
+        import_lines(graph, iter(self.lines))
+        import_lines(graph, iter(self.lines[::-1]))
+
+        self.assertEqual(len(graph.nodes), 4)
+        self.assertEqual(self.get_users(graph), self.get_users(self.graph))
+
+    def test_failed_imports_resume_from_their_checkpoint(self):
+        graph = MemoryBackend()
+        checkpoint = os.path.join(self.directory, 'checkpoint')
+        lines = self.lines[:]
+        lines[4] = '{"type": "user", "id": "9", "attributes": ' \
+            '{"email": "nobody"}}\n'
+
+        with self.assertRaises(ValueError) as context:
+            import_lines(graph, iter(lines), 2, checkpoint)
+
+        self.assertTrue(context.exception.message.startswith('Line 5:'))
+        self.assertEqual(len(graph.nodes), 4)
+        self.assertEqual(graph.outgoing, {})
+
+        # the import resumes from the batch holding the bad line
+        written = []
+        run_batch = MemoryTransaction.run_batch
+
+        def counting_batch(tx, model_name, kind, rows, related_name=None):
+            written.extend(row['key'] for row in rows)
+            return run_batch(tx, model_name, kind, rows, related_name)
+
+        MemoryTransaction.run_batch = counting_batch
+        try:
+            self.assertEqual(
+                import_lines(graph, iter(self.lines), 2, checkpoint), 7)
+        finally:
+            MemoryTransaction.run_batch = run_batch
+
+        self.assertEqual(sorted(written), [5, 6, 7])
+        self.assertEqual(self.get_users(graph), self.get_users(self.graph))
+
+    def test_imports_merge_on_exported_ids(self):
+        statement = compile_batch_query('User', 'import_link', 'groups')
+
+        self.assertIn('MERGE (n:`User` {`export_id`: row.source})\n'
+                      'MERGE (m:`Group` {`export_id`: row.related})\n'
+                      'MERGE (n)-[:`MEMBER_OF`]->(m)', statement)
+
+    def test_neo4j_exports_are_read_in_keyset_pages(self):
+        class PagedGraph(object):
+            calls = []
+
+            def run(self, statement, after, limit):
+                self.calls.append(after)
+                return [{'id': id, 'properties': {}}
+                        for id in range(after + 1, min(after + 1 + limit, 5))]
+
+        page_size = neo4j.EXPORT_PAGE_SIZE
+        neo4j.EXPORT_PAGE_SIZE = 2
+        try:
+            graph = PagedGraph()
+            nodes = list(Neo4jBackend(graph).export_nodes('User'))
+            edges = list(Neo4jBackend(graph).export_edges('User', 'groups'))
+        finally:
+            neo4j.EXPORT_PAGE_SIZE = page_size
+
+        self.assertEqual([node['id'] for node in nodes], range(5))
+        self.assertEqual([edge['id'] for edge in edges], range(5))
+        self.assertEqual(graph.calls, [-1, 1, 3] * 2)
+
+    def test_relationship_pages_only_expand_their_nodes(self):
+        statement = compile_export_query('User', 'groups')
+
+        self.assertTrue(statement.startswith(
+            'MATCH (n:`User`) WHERE id(n) > $after\n'
+            'WITH n ORDER BY id(n) LIMIT $limit\n'
+            'OPTIONAL MATCH (n)-[:`MEMBER_OF`]->(m:`Group`)\n'))
+        self.assertNotIn('id(r)', statement)
+
+    def test_values_failing_validation_are_exported(self):
+        tx = self.graph.begin()
+        node_id = tx.create_node('User', {'email': 'not an email',
+                                          'first_name': 'Guy'}, {})
+        tx.commit()
+
+        items = [json.loads(line) for line in export_lines(
+            self.graph, ['User'], make_json_encoder())]
+        item = next(item for item in items if item['id'] == str(node_id))
+
+        self.assertEqual(item['attributes'],
+                         {'email': 'not an email', 'firstName': 'Guy'})
+
+        # and fail the import instead of being dropped
+        with self.assertRaises(ValueError):
+            import_lines(MemoryBackend(), iter([json.dumps(item)]))
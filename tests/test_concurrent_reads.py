@@ -0,0 +1,135 @@
+from threading import Lock
+from unittest import TestCase
+import json
+import time
+
+from flask import Flask
+from flask_restful import Api
+
+from flask_restful_graph.backends import MemoryBackend
+from flask_restful_graph.concurrency import ConcurrentBackend, \
+    SerialExecutor, ThreadExecutor
+from flask_restful_graph.resource_factory import ResourceFactory
+from flask_restful_graph.routes import register_resources
+
+
+class TestConcurrentReads(TestCase):
+
+    def setUp(self):
+        self.graph = MemoryBackend()
+
+        tx = self.graph.begin()
+        self.group_ids = [tx.create_node('Group', {'title': title}, {})
+                          for title in ('first', 'second')]
+        self.user_ids = [
+            tx.create_node('User', {'email': email},
+                           {'groups': self.group_ids[:count]})
+            for email, count in (('guy@place.com', 2),
+                                 ('gal@place.com', 1),
+                                 ('nobody@place.com', 0))]
+        tx.commit()
+
+        self.backend = ConcurrentBackend(self.graph, SerialExecutor())
+
+    def assertSameRows(self, model_name, parameters, **options):
+        self.assertEqual(
+            self.backend.read_documents(model_name, parameters, **options),
+            self.graph.read_documents(model_name, parameters, **options))
+
+    def test_individual_documents_match_one_query(self):
+        for user_id in self.user_ids:
+            self.assertSameRows(
+                'User', {'id': user_id}, individual=True,
+                include=(('groups',), ('groups', 'members')))
+
+    def test_pages_match_one_query(self):
+        self.assertSameRows(
+            'User', {'cursor': [], 'filters': [], 'limit': 2},
+            page='first', include=(('groups',), ('groups', 'members')))
+
+    def test_related_documents_match_one_query(self):
+        for user_id in self.user_ids:
+            self.assertSameRows(
+                'Group', {'id': user_id}, related=('User', 'groups'),
+                include=(('members',), ('members', 'groups')))
+
+    def test_documents_with_one_part_are_read_in_one_query(self):
+        calls = []
+        read_documents = self.graph.read_documents
+
+        def counting_read(*args, **kwargs):
+            calls.append(args)
+            return read_documents(*args, **kwargs)
+
+        self.graph.read_documents = counting_read
+
+        self.backend.read_documents(
+            'User', {'id': self.user_ids[0]}, individual=True,
+            include=(('groups',),))
+        self.assertEqual(len(calls), 1)
+
+        self.backend.read_documents(
+            'User', {'id': self.user_ids[0]}, individual=True,
+            include=(('groups',), ('groups', 'members')))
+        self.assertEqual(len(calls), 4)
+
+    def test_documents_are_the_same_when_read_in_parts(self):
+        def get_document(executor):
+            app = Flask(__name__)
+            register_resources(Api(app), ResourceFactory(
+                graph=self.graph, executor=executor))
+            response = app.test_client().get(
+                '/users/?include=groups.members')
+            return response.status_code, json.loads(response.data)
+
+        self.assertEqual(get_document(SerialExecutor()), get_document(None))
+        self.assertEqual(get_document(ThreadExecutor(4, 2)),
+                         get_document(None))
+
+
+class TestThreadExecutor(TestCase):
+
+    def test_results_are_in_call_order(self):
+        def make_call(index):
+            def call():
+                time.sleep(0.001 * (5 - index))
+                return index
+            return call
+
+        self.assertEqual(ThreadExecutor(5).map(
+            [make_call(index) for index in range(5)]), range(5))
+
+    def test_calls_in_flight_are_capped(self):
+        lock = Lock()
+        state = {'running': 0, 'most': 0}
+
+        def call():
+            with lock:
+                state['running'] += 1
+                state['most'] = max(state['most'], state['running'])
+            time.sleep(0.002)
+            with lock:
+                state['running'] -= 1
+
+        ThreadExecutor(8, per_call=2).map([call] * 8)
+        self.assertEqual(state['most'], 2)
+
+    def test_first_error_is_raised_and_later_calls_skipped(self):
+        calls = []
+
+        def fail(message):
+            def call():
+                calls.append(message)
+                raise ValueError(message)
+            return call
+
+        executor = ThreadExecutor(4, per_call=1)
+
+        with self.assertRaises(ValueError) as context:
+            executor.map([lambda: 1, fail('first'), fail('second')])
+
+        self.assertEqual(context.exception.message, 'first')
+        self.assertEqual(calls, ['first'])
+
+        # the pool still serves later calls
+        self.assertEqual(executor.map([lambda: 1, lambda: 2]), [1, 2])
@@ -0,0 +1,244 @@
+from unittest import TestCase
+
+from flask import Flask
+
+from flask_restful_graph.document import get_relationship_links
+from flask_restful_graph.models import BaseModel
+from flask_restful_graph.parameters import encode_cursor, parse_fields, \
+    parse_filters, parse_include, parse_page, parse_sort
+from flask_restful_graph.query import compile_count_query, \
+    compile_document_query, compile_neighborhood_query, compile_path_query
+
+
+class TestCompilingDocumentQueries(TestCase):
+
+    def test_collection_query_collects_each_relationship(self):
+        statement = compile_document_query('User')
+
+        self.assertTrue(statement.startswith('MATCH (n:`User`)'))
+        self.assertIn(
+            'OPTIONAL MATCH (n)-[:`MEMBER_OF`]->(r0:`Group`)', statement)
+        self.assertIn('collect(DISTINCT r0) AS rel_0', statement)
+        self.assertIn('`groups`: [x IN rel_0 | {id: id(x)}]', statement)
+        self.assertNotIn('$id', statement)
+
+    def test_individual_query_is_parameterized(self):
+        statement = compile_document_query('Group', individual=True)
+
+        self.assertIn('WHERE id(n) = $id', statement)
+        self.assertIn(
+            'OPTIONAL MATCH (n)<-[:`MEMBER_OF`]-(r0:`User`)', statement)
+
+    def test_included_paths_project_properties(self):
+        statement = compile_document_query(
+            'User', include=(('groups',), ('groups', 'members')))
+
+        self.assertIn('`groups`: [x IN rel_0 | {id: id(x), '
+                      'properties: properties(x)}]', statement)
+        self.assertIn('OPTIONAL MATCH (n)-[:`MEMBER_OF`]->(i0_0:`Group`)\n'
+                      'OPTIONAL MATCH (i0_0)<-[:`MEMBER_OF`]-(i0_1:`User`)',
+                      statement)
+        self.assertIn('`groups.members`: inc_0', statement)
+
+    def test_related_query_matches_source(self):
+        statement = compile_document_query(
+            'Group', individual=False, related=('User', 'groups'))
+
+        self.assertTrue(statement.startswith(
+            'MATCH (s:`User`) WHERE id(s) = $id\n'
+            'OPTIONAL MATCH (s)-[:`MEMBER_OF`]->(n:`Group`)'))
+
+    def test_related_pages_are_cut_after_the_source(self):
+        statement = compile_document_query(
+            'User', related=('Group', 'members'), page='after')
+
+        self.assertTrue(statement.startswith(
+            'MATCH (s:`Group`) WHERE id(s) = $id\n'
+            'OPTIONAL MATCH (s)<-[:`MEMBER_OF`]-(n:`User`)\n'
+            'WHERE id(n) > $cursor[0]\n'
+            'WITH DISTINCT n ORDER BY id(n) LIMIT $limit\n'))
+
+    def test_related_nodes_are_counted_in_the_database(self):
+        self.assertEqual(
+            compile_count_query('Group', 'members'),
+            'MATCH (s:`Group`) WHERE id(s) = $id\n'
+            'OPTIONAL MATCH (s)<-[:`MEMBER_OF`]-(n:`User`)\n'
+            'RETURN count(DISTINCT n) AS count')
+
+    def test_neighborhoods_are_expanded_one_hop_at_a_time(self):
+        statement = compile_neighborhood_query('User', 2, ('Group', 'User'))
+        hop = ('UNWIND CASE frontier WHEN [] THEN [null] ELSE frontier END '
+               'AS f\n'
+               'OPTIONAL MATCH (f)-[:`MEMBER_OF`]-(n)\n'
+               'WHERE NOT n IN seen\n'
+               'WITH seen, found, collect(DISTINCT n) AS frontier\n')
+
+        self.assertTrue(statement.startswith(
+            'MATCH (s:`User`) WHERE id(s) = $id\n'
+            'WITH [s] AS seen, [s] AS frontier, [] AS found\n' + hop))
+        self.assertEqual(statement.count(hop), 2)
+        self.assertIn('[n IN frontier WHERE n:`Group` OR n:`User` | '
+                      '{node: n, distance: 2}] AS found\n', statement)
+        self.assertNotIn('*', statement)
+        self.assertTrue(statement.endswith(
+            'ORDER BY distance, id(n) LIMIT $limit\n'
+            'RETURN id(n) AS id, labels(n) AS labels, '
+            'properties(n) AS properties, distance'))
+
+    def test_paths_are_bounded_shortest_paths(self):
+        statement = compile_path_query('User', 'Group', 6)
+
+        self.assertIn('MATCH (t:`Group`) WHERE id(t) = $target\n'
+                      'OPTIONAL MATCH p = shortestPath('
+                      '(s)-[:`MEMBER_OF`*0..6]-(t))\n', statement)
+
+    def test_pages_are_cut_before_related_nodes_are_matched(self):
+        statement = compile_document_query('User', page='after')
+
+        self.assertIn('MATCH (n:`User`)\n'
+                      'WHERE id(n) > $cursor[0]\n'
+                      'WITH n ORDER BY id(n) LIMIT $limit\n'
+                      'OPTIONAL MATCH', statement)
+
+    def test_pages_before_cursor_are_read_backwards(self):
+        statement = compile_document_query('User', page='before')
+
+        self.assertIn('WITH n ORDER BY id(n) DESC LIMIT $limit', statement)
+        self.assertTrue(statement.endswith('ORDER BY cursor[0]'))
+
+    def test_filters_and_sort_are_compiled(self):
+        statement = compile_document_query(
+            'User', page='after',
+            filters=(('email', 'eq'), ('last_name', 'prefix')),
+            sort=(('last_name', True),), null_cursor=(False,))
+
+        self.assertIn(
+            'WHERE n.`email` = $filters[0] AND '
+            'n.`last_name` STARTS WITH $filters[1] AND '
+            '((n.`last_name` < $cursor[0]) OR '
+            '(n.`last_name` = $cursor[0] AND id(n) > $cursor[1]))\n'
+            'WITH n ORDER BY n.`last_name` DESC, id(n) LIMIT $limit',
+            statement)
+        self.assertIn('[n.`last_name`, id(n)] AS cursor\n'
+                      'ORDER BY cursor[0] DESC, cursor[1]', statement)
+
+    def test_null_cursor_values_are_compared_with_is_null(self):
+        statement = compile_document_query(
+            'User', page='after', sort=(('last_name', False),),
+            null_cursor=(True,))
+
+        self.assertIn('WHERE n.`last_name` IS NULL AND id(n) > $cursor[1]\n',
+                      statement)
+
+    def test_sparse_fieldsets_are_projected(self):
+        statement = compile_document_query(
+            'User', include=(('groups',),),
+            fields=(('Group', ((), ())), ('User', (('email',), ()))))
+
+        self.assertIn('RETURN id(n) AS id, n {.`email`} AS properties',
+                      statement)
+        self.assertIn('{id: id(x), properties: x {}}', statement)
+
+    def test_unlisted_relationships_are_not_matched(self):
+        statement = compile_document_query(
+            'User', fields=(('User', (('email',), ())),))
+
+        self.assertNotIn('OPTIONAL MATCH', statement)
+
+
+class TestParsingIncludePaths(TestCase):
+
+    def test_intermediate_paths_are_included(self):
+        self.assertEqual(parse_include('User', 'groups.members', 3),
+                         (('groups',), ('groups', 'members')))
+
+    def test_missing_include_is_empty(self):
+        self.assertEqual(parse_include('User', None, 3), ())
+
+    def test_unknown_relationship_is_rejected(self):
+        self.assertRaises(ValueError, parse_include, 'User', 'friends', 3)
+
+    def test_depth_is_limited(self):
+        self.assertRaises(ValueError, parse_include,
+                          'User', 'groups.members.groups', 2)
+
+
+class TestParsingPages(TestCase):
+
+    def test_default_page_size(self):
+        self.assertEqual(parse_page({}, 20, 100), {'size': 20})
+
+    def test_cursor_is_parsed(self):
+        self.assertEqual(
+            parse_page({'page[size]': '5',
+                        'page[after]': encode_cursor(['Smith', 11])},
+                       20, 100),
+            {'size': 5, 'after': ['Smith', 11]})
+
+    def test_malformed_cursor_is_rejected(self):
+        self.assertRaises(ValueError, parse_page,
+                          {'page[after]': '11'}, 20, 100)
+
+    def test_maximum_page_size_is_enforced(self):
+        self.assertRaises(ValueError, parse_page,
+                          {'page[size]': '101'}, 20, 100)
+
+    def test_cursors_cannot_be_combined(self):
+        self.assertRaises(ValueError, parse_page,
+                          {'page[after]': encode_cursor([1]),
+                           'page[before]': encode_cursor([9])}, 20, 100)
+
+
+class TestParsingFields(TestCase):
+
+    def test_attributes_map_to_property_names(self):
+        self.assertEqual(
+            parse_fields({'fields[user]': 'email,firstName,groups'}),
+            (('User', (('email', 'first_name'), ('groups',))),))
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertRaises(ValueError, parse_fields,
+                          {'fields[user]': 'first_name'})
+        self.assertRaises(ValueError, parse_fields, {'fields[team]': 'name'})
+
+
+class TestParsingFiltersAndSort(TestCase):
+
+    def test_filters_are_deserialized_by_schema(self):
+        self.assertEqual(
+            parse_filters('User', {'filter[email]': 'guy@place.com',
+                                   'filter[lastName][prefix]': 'Sm'}),
+            ((('email', 'eq'), ('last_name', 'prefix')),
+             ['guy@place.com', 'Sm']))
+
+    def test_invalid_filter_values_are_rejected(self):
+        self.assertRaises(ValueError, parse_filters,
+                          'User', {'filter[email]': 'not an email'})
+        self.assertRaises(ValueError, parse_filters,
+                          'User', {'filter[email][near]': 'guy@place.com'})
+
+    def test_sort_maps_to_properties(self):
+        self.assertEqual(parse_sort('User', '-lastName,firstName'),
+                         (('last_name', True), ('first_name', False)))
+        self.assertRaises(ValueError, parse_sort, 'User', 'last_name')
+
+
+class TestSerializationPlans(TestCase):
+
+    def test_relationships_are_planned_once(self):
+        plan = BaseModel.plans['User']
+
+        self.assertEqual(plan.type, 'user')
+        self.assertEqual(plan.self_path, '/users/{}')
+        self.assertEqual(plan.relationships.keys(), ['groups'])
+        self.assertEqual(plan.relationships['groups'].related_model, 'Group')
+        self.assertTrue(plan.relationships['groups'].plural)
+
+    def test_links_are_filled_in_under_the_script_root(self):
+        app = Flask(__name__)
+
+        with app.test_request_context('/groups/11', base_url='http://a/api'):
+            self.assertEqual(get_relationship_links('Group', 'members', 11), {
+                'self': '/api/groups/11/relationships/members',
+                'related': '/api/groups/11/members'
+            })
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from unittest import TestCase
+
+from marshmallow import Schema, fields
+
+from flask_restful_graph.models import BaseModel
+from flask_restful_graph.models.dumpers import compile_dumper
+
+
+PROPERTIES = [
+    {},
+    {'email': 'guy@place.com', 'first_name': 'Guy', 'last_name': 'Smith'},
+    {'email': 'not an email', 'first_name': None, 'title': 42},
+    {'email': None, 'last_name': u'Brontë', 'first_name': 'Bront\xc3\xab'},
+    {'title': 'A group', 'unregistered': 'ignored'}
+]
+
+
+class Node(object):
+
+    def __init__(self, properties):
+        self.__dict__.update(properties)
+
+
+class CustomSchema(Schema):
+    count = fields.Integer(dump_to='total')
+    ratio = fields.Float()
+    active = fields.Boolean(default=False)
+    created = fields.DateTime()
+    name = fields.Str(attribute='title')
+    secret = fields.Str(load_only=True)
+    tags = fields.List(fields.Str())
+
+
+class TestCompiledDumpers(TestCase):
+
+    def assertSameDump(self, schema, obj):
+        self.assertEqual(compile_dumper(schema)(obj), schema.dump(obj).data)
+
+    def test_model_dumpers_agree_with_their_schemas(self):
+        for model_name, schema in BaseModel.schemas.iteritems():
+            for properties in PROPERTIES:
+                self.assertEqual(BaseModel.dumpers[model_name](properties),
+                                 schema.dump(properties).data)
+                self.assertSameDump(schema, Node(properties))
+
+    def test_field_formatting_agrees_with_the_schema(self):
+        schema = CustomSchema()
+
+        for obj in ({}, {'count': '3', 'ratio': 1, 'active': 'yes',
+                         'created': datetime(2017, 6, 1, 12, 30),
+                         'title': 'Name', 'secret': 'hidden',
+                         'tags': ['a', 1]},
+                    {'count': None, 'ratio': None, 'created': None}):
+            self.assertSameDump(schema, obj)
+            self.assertSameDump(schema, Node(obj))
@@ -1,13 +1,14 @@
 from unittest import TestCase
 import json
 
-from flask_restful_graph.flask_restful_graph import app, graph_connection
+from flask_restful_graph.flask_restful_graph import app
 from flask_restful_graph.models import Group, User
 
 
 HOST = 'http://localhost'
 
 def get_by_id(cls, id):
+    graph_connection = app.extensions['restful_graph']['graph'].get_graph()
     return cls.select(graph_connection, id).first()
 
 
@@ -19,7 +20,8 @@ class TestSerializingNodes(TestCase):
         rv = self.app.get('/users/8/relationships/groups')
         data = json.loads(rv.data)
 
-        self.assertEqual(len(data), 2)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data['meta']['count'], 1)
         self.assertEqual(data['data'][0]['type'], 'group')
         self.assertEqual(data['data'][0]['id'], '11')
         self.assertEqual(
@@ -0,0 +1,60 @@
+from unittest import TestCase
+import json
+
+from py2neo import ConstraintError
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import MemoryBackend
+from flask_restful_graph.indexes import compare_indexes, format_report, \
+    sync_indexes
+from flask_restful_graph.models import BaseModel
+
+
+class TestSyncingIndexes(TestCase):
+
+    def setUp(self):
+        self.graph = MemoryBackend(indexes=[('Group', 'title'),
+                                            ('Place', 'name')])
+
+    def test_model_properties_declare_constraints(self):
+        self.assertIn(('User', 'email'), BaseModel.unique_properties)
+
+    def test_missing_and_extra_indexes_are_reported(self):
+        report = compare_indexes(self.graph)
+
+        self.assertEqual(report.missing_constraints, [('User', 'email')])
+        self.assertEqual(report.extra_indexes, [('Group', 'title')])
+        self.assertEqual(
+            format_report(report),
+            ['Missing constraint on :User(email)',
+             'Extra index on :Group(title)'])
+
+    def test_missing_constraints_are_created(self):
+        sync_indexes(self.graph)
+        report = compare_indexes(self.graph)
+
+        self.assertEqual(report.missing_indexes, [])
+        self.assertEqual(report.missing_constraints, [])
+        self.assertIn(('User', 'email'), self.graph.indexed_properties())
+
+    def test_constraints_are_not_created_over_duplicates(self):
+        tx = self.graph.begin()
+        for _ in range(2):
+            tx.create_node('User', {'email': 'guy@place.com'}, {})
+        tx.commit()
+
+        self.assertRaises(ConstraintError, sync_indexes, self.graph)
+
+    def test_duplicate_unique_values_are_rejected(self):
+        app = create_app({'SYNC_INDEXES': True}, graph=self.graph)
+        client = app.test_client()
+
+        def post_user():
+            return client.post('/users/', content_type='application/json',
+                               data=json.dumps({'data': {
+                                   'type': 'user',
+                                   'attributes': {'email': 'guy@place.com'}
+                               }})).status_code
+
+        self.assertEqual(post_user(), 200)
+        self.assertEqual(post_user(), 400)
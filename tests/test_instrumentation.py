@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from flask import Flask
+from flask_restful import Api
+
+from flask_restful_graph.backends import MemoryBackend
+from flask_restful_graph.cache import ResponseCache
+from flask_restful_graph.concurrency import ThreadExecutor
+from flask_restful_graph.instrumentation import Metrics
+from flask_restful_graph.resource_factory import ResourceFactory
+from flask_restful_graph.routes import register_resources
+
+
+class TestInstrumentation(TestCase):
+
+    def setUp(self):
+        graph = MemoryBackend()
+        tx = graph.begin()
+        self.group_id = tx.create_node('Group', {'title': 'A group'}, {})
+        tx.commit()
+
+        app = Flask(__name__)
+        cache = ResponseCache()
+        self.metrics = Metrics(app, cache=cache)
+        register_resources(Api(app), ResourceFactory(graph, cache,
+                                                     self.metrics))
+        self.app = app.test_client()
+
+    def test_responses_have_server_timing(self):
+        response = self.app.get('/groups/{}'.format(self.group_id))
+
+        self.assertIn('db;dur=', response.headers['Server-Timing'])
+        self.assertIn('desc="1 queries"', response.headers['Server-Timing'])
+
+    def test_metrics_are_labeled_by_resource_and_method(self):
+        self.app.get('/groups/', buffered=True)
+        self.app.get('/groups/', buffered=True)
+        metrics = self.app.get('/metrics').data
+
+        self.assertIn('flask_restful_graph_requests_total'
+                      '{resource="GroupsResource",method="GET"} 2', metrics)
+        self.assertIn('flask_restful_graph_queries_total'
+                      '{resource="GroupsResource",method="GET"} 1', metrics)
+        self.assertIn('flask_restful_graph_cache_hits_total 1', metrics)
+
+    def test_concurrent_parts_are_counted_as_queries(self):
+        graph = MemoryBackend()
+        tx = graph.begin()
+        group_id = tx.create_node('Group', {'title': 'A group'}, {})
+        user_id = tx.create_node('User', {'email': 'guy@place.com'},
+                                 {'groups': [group_id]})
+        tx.commit()
+
+        app = Flask(__name__)
+        metrics = Metrics(app)
+        register_resources(Api(app), ResourceFactory(
+            graph, metrics=metrics, executor=ThreadExecutor(2)))
+
+        # the user's node, its groups and the groups' members
+        response = app.test_client().get(
+            '/users/{}?include=groups,groups.members'.format(user_id))
+
+        self.assertIn('desc="3 queries"', response.headers['Server-Timing'])
+
+    def test_streamed_queries_are_in_the_metrics(self):
+        graph = MemoryBackend()
+        tx = graph.begin()
+        tx.create_node('Group', {'title': 'A group'}, {})
+        tx.commit()
+
+        app = Flask(__name__)
+        app.config['STREAM_RESPONSES'] = True
+        register_resources(Api(app), ResourceFactory(
+            graph, metrics=Metrics(app)))
+        client = app.test_client()
+
+        # rows are read and dumped while the body is written
+        response = client.get('/groups/', buffered=True)
+        self.assertIn('A group', response.data)
+
+        metrics = dict(
+            line.rsplit(' ', 1) for line in client.get('/metrics').data
+            .splitlines() if not line.startswith('#'))
+        labels = '{resource="GroupsResource",method="GET"}'
+
+        self.assertEqual(
+            metrics['flask_restful_graph_queries_total' + labels], '1')
+        self.assertGreater(float(
+            metrics['flask_restful_graph_dump_seconds_total' + labels]), 0)
@@ -0,0 +1,254 @@
+from threading import Thread
+from unittest import TestCase
+import json
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import MemoryBackend
+from flask_restful_graph.backends.memory import MemoryTransaction
+
+
+class TestMemoryBackend(TestCase):
+
+    def setUp(self):
+        self.graph = MemoryBackend(indexes=[('User', 'email')])
+
+        tx = self.graph.begin()
+        self.group_id = tx.create_node(
+            'Group', {'title': 'This is a group'}, {})
+        self.user_ids = [
+            tx.create_node('User', {'email': email, 'last_name': name},
+                           {'groups': [self.group_id]})
+            for email, name in (('guy@place.com', 'Smith'),
+                                ('gal@place.com', 'Jones'))]
+        tx.commit()
+
+        self.app = create_app(graph=self.graph).test_client()
+
+    def get(self, url):
+        response = self.app.get(url)
+        return response.status_code, json.loads(response.data)
+
+    def post(self, url, body):
+        response = self.app.post(url, data=json.dumps(body),
+                                 content_type='application/json')
+        return response.status_code, json.loads(response.data)
+
+    def test_getting_a_resource_with_included_members(self):
+        status, document = self.get(
+            '/groups/{}?include=members'.format(self.group_id))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['data']['attributes'],
+                         {'title': 'This is a group'})
+        self.assertEqual(
+            [resource['attributes']['email']
+             for resource in document['included']],
+            ['guy@place.com', 'gal@place.com'])
+
+    def test_getting_relationship_linkage(self):
+        status, document = self.get(
+            '/users/{}/relationships/groups'.format(self.user_ids[0]))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['data'],
+                         [{'type': 'group', 'id': str(self.group_id)}])
+
+    def test_related_resources_are_paginated_and_counted(self):
+        url = '/groups/{}/members?page[size]=1'.format(self.group_id)
+        status, document = self.get(url)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['meta'], {'count': 2})
+        self.assertEqual([resource['id'] for resource in document['data']],
+                         [str(self.user_ids[0])])
+
+        next_page = document['links']['next'].replace('http://localhost', '')
+        status, document = self.get(next_page)
+
+        self.assertEqual([resource['id'] for resource in document['data']],
+                         [str(self.user_ids[1])])
+        self.assertIsNone(document['links']['next'])
+
+    def test_relationship_linkage_is_paginated_and_counted(self):
+        status, document = self.get(
+            '/groups/{}/relationships/members?page[size]=1&sort=-email'
+            .format(self.group_id))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['meta'], {'count': 2})
+        self.assertEqual(document['data'],
+                         [{'type': 'user', 'id': str(self.user_ids[0])}])
+        self.assertIsNotNone(document['links']['next'])
+
+    def test_nodes_without_related_nodes_have_empty_pages(self):
+        tx = self.graph.begin()
+        group_id = tx.create_node('Group', {'title': 'Empty'}, {})
+        tx.commit()
+
+        status, document = self.get('/groups/{}/members'.format(group_id))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['data'], [])
+        self.assertEqual(document['meta'], {'count': 0})
+
+    def test_missing_nodes_are_not_found(self):
+        self.assertEqual(self.get('/users/99')[0], 404)
+        self.assertEqual(self.get('/users/99/groups')[0], 404)
+        self.assertEqual(self.get('/users/99/relationships/groups')[0], 404)
+
+    def test_sorted_pages_are_linked(self):
+        status, document = self.get('/users/?sort=lastName&page[size]=1')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['data'][0]['attributes']['lastName'],
+                         'Jones')
+
+        next_page = document['links']['next'].replace('http://localhost', '')
+        status, document = self.get(next_page)
+
+        self.assertEqual(document['data'][0]['attributes']['lastName'],
+                         'Smith')
+        self.assertIsNone(document['links']['next'])
+
+    def test_neighborhoods_list_nodes_by_distance(self):
+        status, document = self.get(
+            '/users/{}/neighborhood?depth=2'.format(self.user_ids[0]))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['meta'], {'count': 2, 'depth': 2})
+        self.assertEqual(
+            [(resource['type'], resource['id'], resource['meta'])
+             for resource in document['data']],
+            [('group', str(self.group_id), {'distance': 1}),
+             ('user', str(self.user_ids[1]), {'distance': 2})])
+
+        status, document = self.get(
+            '/users/{}/neighborhood?depth=2&type=user&limit=5'
+            .format(self.user_ids[0]))
+
+        self.assertEqual([resource['id'] for resource in document['data']],
+                         [str(self.user_ids[1])])
+
+    def test_neighborhoods_list_nodes_on_cycles_once(self):
+        # both users are in both groups, so every node is on a cycle
+        tx = self.graph.begin()
+        group_id = tx.create_node('Group', {'title': 'Another group'},
+                                  {'members': self.user_ids})
+        tx.commit()
+
+        status, document = self.get(
+            '/users/{}/neighborhood?depth=3'.format(self.user_ids[0]))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['meta'], {'count': 3, 'depth': 3})
+        self.assertEqual(
+            [(resource['id'], resource['meta']['distance'])
+             for resource in document['data']],
+            [(str(self.group_id), 1), (str(group_id), 1),
+             (str(self.user_ids[1]), 2)])
+
+    def test_neighborhood_parameters_are_bounded(self):
+        for query in ('depth=4', 'depth=0', 'limit=101', 'type=place'):
+            status, _ = self.get('/users/{}/neighborhood?{}'.format(
+                self.user_ids[0], query))
+            self.assertEqual(status, 400)
+
+    def test_shortest_paths_list_nodes_in_order(self):
+        status, document = self.get('/users/{}/path/users/{}'.format(
+            self.user_ids[0], self.user_ids[1]))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['meta'], {'length': 2})
+        self.assertEqual(
+            [resource['id'] for resource in document['data']],
+            [str(self.user_ids[0]), str(self.group_id),
+             str(self.user_ids[1])])
+        self.assertEqual(document['data'][1]['attributes'],
+                         {'title': 'This is a group'})
+
+    def test_unconnected_and_missing_nodes_have_no_path(self):
+        tx = self.graph.begin()
+        loner_id = tx.create_node('User', {'email': 'me@place.com'}, {})
+        tx.commit()
+
+        status, _ = self.get('/users/{}/path/users/{}'.format(
+            self.user_ids[0], loner_id))
+        self.assertEqual(status, 404)
+
+        status, _ = self.get('/users/{}/path/groups/{}'.format(
+            self.user_ids[0], self.user_ids[1]))
+        self.assertEqual(status, 404)
+
+    def test_indexed_filters(self):
+        status, document = self.get('/users/?filter[email]=gal@place.com')
+
+        self.assertEqual(status, 200)
+        self.assertEqual([resource['id'] for resource in document['data']],
+                         [str(self.user_ids[1])])
+        self.assertEqual(self.get('/users/?filter[lastName]=Jones')[0], 400)
+
+    def test_posted_resource_is_linked(self):
+        status, document = self.post('/users/', {'data': {
+            'type': 'user',
+            'attributes': {'email': 'new@place.com'},
+            'relationships': {'groups': {'data': [
+                {'type': 'group', 'id': str(self.group_id)}]}}
+        }})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(document['links']['self'],
+                         'http://localhost/users/' + document['data']['id'])
+        status, document = self.get(
+            '/groups/{}/members'.format(self.group_id))
+        self.assertEqual(len(document['data']), 3)
+
+    def test_failed_operations_are_rolled_back(self):
+        status, _ = self.post('/operations', {'atomic:operations': [
+            {'op': 'remove', 'ref': {'type': 'group',
+                                     'id': str(self.group_id)}},
+            {'op': 'remove', 'ref': {'type': 'user', 'id': '99'}}
+        ]})
+
+        self.assertEqual(status, 404)
+        status, document = self.get(
+            '/groups/{}/members'.format(self.group_id))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(document['data']), 2)
+
+    def test_unexpected_write_errors_roll_back(self):
+        create_node = MemoryTransaction.create_node
+
+        def failing_create(*args):
+            raise RuntimeError('connection lost')
+
+        MemoryTransaction.create_node = failing_create
+        try:
+            response = self.app.post(
+                '/users/', content_type='application/json',
+                data=json.dumps({'data': {
+                    'type': 'user', 'attributes': {'email': 'a@place.com'}}}))
+        finally:
+            MemoryTransaction.create_node = create_node
+
+        self.assertEqual(response.status_code, 500)
+
+        # the transaction's lock was released for other threads
+        results = []
+        thread = Thread(target=lambda: results.append(
+            self.graph.lock.acquire(False)))
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [True])
+
+    def test_deleting_a_node_invalidates_its_neighbours(self):
+        url = '/groups/{}/relationships/members?page[size]=1'.format(
+            self.group_id)
+        self.assertEqual(self.get(url)[1]['meta'], {'count': 2})
+
+        # the deleted member is not on the cached page
+        status, _ = self.post('/operations', {'atomic:operations': [
+            {'op': 'remove', 'ref': {'type': 'user',
+                                     'id': str(self.user_ids[1])}}]})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.get(url)[1]['meta'], {'count': 1})
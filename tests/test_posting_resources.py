@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from flask_restful_graph.query import compile_create_query
+from flask_restful_graph.operations import get_linkages
+
+
+class TestValidatingLinkages(TestCase):
+
+    def test_linkage_ids_are_collected_per_relationship(self):
+        linkages = get_linkages('User', {'groups': {'data': [
+            {'type': 'group', 'id': '11'},
+            {'type': 'group', 'id': '12'}
+        ]}})
+
+        self.assertEqual(linkages, {'groups': [11, 12]})
+
+    def test_to_many_relationship_requires_a_list(self):
+        self.assertRaises(ValueError, get_linkages, 'User', {
+            'groups': {'data': {'type': 'group', 'id': '11'}}})
+
+    def test_linked_type_must_match_relationship(self):
+        self.assertRaises(ValueError, get_linkages, 'User', {
+            'groups': {'data': [{'type': 'user', 'id': '8'}]}})
+
+    def test_unparseable_ids_are_rejected(self):
+        self.assertRaises(ValueError, get_linkages, 'User', {
+            'groups': {'data': [{'type': 'group', 'id': 'eleven'}]}})
+
+
+class TestCompilingCreateQueries(TestCase):
+
+    def test_relationships_are_created_in_the_same_statement(self):
+        statement = compile_create_query('Group')
+
+        self.assertIn('OPTIONAL MATCH (r0:`User`) WHERE id(r0) IN $related[0]',
+                      statement)
+        self.assertIn('FOREACH (m IN r0s | CREATE (n)<-[:`MEMBER_OF`]-(m))',
+                      statement)
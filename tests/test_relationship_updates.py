@@ -0,0 +1,99 @@
+from unittest import TestCase
+import json
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import MemoryBackend
+
+
+class TestUpdatingRelationships(TestCase):
+
+    def setUp(self):
+        self.graph = MemoryBackend()
+
+        tx = self.graph.begin()
+        self.group_ids = [tx.create_node('Group', {'title': title}, {})
+                          for title in ('first', 'second', 'third')]
+        self.user_id = tx.create_node(
+            'User', {'email': 'guy@place.com'},
+            {'groups': self.group_ids[:2]})
+        tx.commit()
+
+        self.app = create_app({'COLLECT_METRICS': False},
+                              graph=self.graph).test_client()
+        self.url = '/users/{}/relationships/groups'.format(self.user_id)
+
+    def send(self, method, url, group_ids, type='group'):
+        response = self.app.open(
+            url, method=method, content_type='application/json',
+            data=json.dumps({'data': [{'type': type, 'id': str(group_id)}
+                                      for group_id in group_ids]}))
+        return response.status_code, json.loads(response.data)
+
+    def get_group_ids(self):
+        return sorted(self.graph.traverse(self.user_id, 'User', 'groups'))
+
+    def test_members_are_added(self):
+        status, document = self.send('POST', self.url, self.group_ids[1:])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.get_group_ids(), self.group_ids)
+        self.assertEqual(document['meta'], {'count': 3})
+        self.assertEqual([identifier['id'] for identifier in document['data']],
+                         [str(group_id) for group_id in self.group_ids])
+
+    def test_members_are_removed(self):
+        status, document = self.send('DELETE', self.url, self.group_ids[:1])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.get_group_ids(), self.group_ids[1:2])
+
+    def test_replacing_writes_only_changed_edges(self):
+        batches = []
+        begin = self.graph.begin
+
+        def begin_counting():
+            tx = begin()
+            run_batch = tx.run_batch
+
+            def counting_batch(model_name, kind, rows, related_name=None):
+                batches.append((kind, sorted(row['related'] for row in rows)))
+                return run_batch(model_name, kind, rows, related_name)
+
+            tx.run_batch = counting_batch
+            return tx
+
+        self.graph.begin = begin_counting
+
+        status, document = self.send('PATCH', self.url, self.group_ids[1:])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.get_group_ids(), self.group_ids[1:])
+        self.assertEqual(batches, [('unlink', self.group_ids[:1]),
+                                   ('link', self.group_ids[2:])])
+
+    def test_cached_documents_are_invalidated(self):
+        related_url = '/groups/{}/members'.format(self.group_ids[2])
+        self.assertEqual(
+            json.loads(self.app.get(related_url).data)['meta']['count'], 0)
+
+        self.send('POST', self.url, self.group_ids[2:])
+
+        self.assertEqual(
+            json.loads(self.app.get(related_url).data)['meta']['count'], 1)
+
+    def test_missing_nodes_are_not_found_and_nothing_is_written(self):
+        status, _ = self.send('PATCH', self.url, [self.group_ids[2], 99])
+
+        self.assertEqual(status, 404)
+        self.assertEqual(self.get_group_ids(), self.group_ids[:2])
+        self.assertEqual(self.send(
+            'POST', '/users/99/relationships/groups', [])[0], 404)
+
+    def test_invalid_linkage_is_rejected(self):
+        self.assertEqual(
+            self.send('POST', self.url, [self.user_id], type='user')[0], 400)
+
+        response = self.app.post(
+            self.url, content_type='application/json',
+            data=json.dumps({'data': {'type': 'group', 'id': '1'}}))
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,92 @@
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+from unittest import TestCase
+import gzip
+import json
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import MemoryBackend
+from flask_restful_graph.representations import get_encoder
+
+
+class TestEncoders(TestCase):
+
+    def test_dumped_values_are_encoded(self):
+        encode = get_encoder('json')
+
+        self.assertEqual(
+            json.loads(encode({'at': datetime(2017, 6, 1, 12, 30),
+                               'ratio': Decimal('0.5'),
+                               'name': u'Bront\xeb'})),
+            {'at': '2017-06-01T12:30:00', 'ratio': 0.5,
+             'name': u'Bront\xeb'})
+
+    def test_unknown_encoders_are_rejected(self):
+        self.assertRaises(ValueError, get_encoder, 'yaml')
+
+
+class TestResponses(TestCase):
+
+    def setUp(self):
+        graph = MemoryBackend()
+
+        tx = graph.begin()
+        for index in range(20):
+            tx.create_node('Group', {'title': 'Group {}'.format(index)}, {})
+        tx.commit()
+
+        self.app = create_app({'GZIP_MIN_SIZE': 1024},
+                              graph=graph).test_client()
+
+    def test_error_documents_use_the_representation(self):
+        response = self.app.get('/groups/99')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(
+            json.loads(response.data)['errors'][0]['detail'],
+            'Requested node of type Group with id 99 not found')
+
+    def test_large_responses_are_gzipped_when_accepted(self):
+        plain = self.app.get('/groups/')
+        response = self.app.get('/groups/',
+                                headers={'Accept-Encoding': 'gzip'})
+
+        self.assertIsNone(plain.headers.get('Content-Encoding'))
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(
+            gzip.GzipFile(fileobj=BytesIO(response.data)).read(),
+            plain.data)
+
+    def test_gzipped_responses_are_revalidated(self):
+        response = self.app.get('/groups/',
+                                headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(self.app.get('/groups/', headers={
+            'Accept-Encoding': 'gzip',
+            'If-None-Match': etag}).status_code, 304)
+
+    def test_small_responses_are_not_gzipped(self):
+        response = self.app.get('/groups/99',
+                                headers={'Accept-Encoding': 'gzip'})
+
+        self.assertIsNone(response.headers.get('Content-Encoding'))
+
+    def test_streamed_documents_use_the_encoder(self):
+        graph = MemoryBackend()
+
+        tx = graph.begin()
+        tx.create_node('Group', {'title': 'A group'}, {})
+        tx.commit()
+
+        app = create_app({'STREAM_RESPONSES': True}, graph=graph)
+        data = app.test_client().get('/groups/').data
+
+        # compact, as the configured encoder writes documents
+        self.assertIn('"attributes":{"title":"A group"}', data)
+        self.assertEqual(json.loads(data)['data'][0]['attributes'],
+                         {'title': 'A group'})
@@ -0,0 +1,76 @@
+from threading import Thread
+from unittest import TestCase
+
+from flask import Flask
+
+from flask_restful_graph.cache import LRUBackend, ResponseCache, \
+    get_document_tags
+
+
+class TestLRUBackend(TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        backend = LRUBackend(max_entries=2)
+        backend.set('/users/8', 'a', {'user/8'})
+        backend.set('/users/9', 'b', {'user/9'})
+        backend.get('/users/8')
+        backend.set('/groups/11', 'c', {'group/11'})
+
+        self.assertEqual(backend.get('/users/8'), 'a')
+        self.assertIsNone(backend.get('/users/9'))
+        self.assertNotIn('user/9', backend.tagged)
+
+    def test_invalidating_a_tag_drops_its_entries(self):
+        backend = LRUBackend()
+        backend.set('/groups/11', 'a', {'group/11', 'user/8'})
+        backend.set('/users/8', 'b', {'user/8'})
+        backend.set('/users/9', 'c', {'user/9'})
+
+        self.assertEqual(backend.invalidate(['user/8']), 2)
+        self.assertIsNone(backend.get('/groups/11'))
+        self.assertEqual(backend.get('/users/9'), 'c')
+        self.assertNotIn('group/11', backend.tagged)
+
+
+class TestResponseCache(TestCase):
+
+    def test_invalidating_while_caching_drops_the_entry(self):
+        cache = ResponseCache()
+        set_entry = cache.backend.set
+        writes = []
+
+        def set_during_write(key, entry, tags):
+            # a write invalidates the group between the check and the set
+            writes.append(Thread(target=cache.invalidate,
+                                 args=([('Group', 11)],)))
+            writes[0].start()
+            writes[0].join(0.05)
+            set_entry(key, entry, tags)
+
+        cache.backend.set = set_during_write
+        get = cache.cached(lambda self, id: {'data': None}, 'Group')
+
+        with Flask(__name__).test_request_context('/groups/11'):
+            get(None, id=11)
+
+        writes[0].join()
+        self.assertIsNone(cache.backend.get('http://localhost/groups/11'))
+
+
+class TestTaggingDocuments(TestCase):
+
+    def test_resources_and_linkage_are_tagged(self):
+        document = {
+            'data': [{
+                'type': 'user', 'id': '8',
+                'relationships': {'groups': {'data': [
+                    {'type': 'group', 'id': '11'}]}}
+            }],
+            'included': [{'type': 'group', 'id': '12'}]
+        }
+
+        self.assertEqual(get_document_tags(document),
+                         {'user/8', 'group/11', 'group/12'})
+
+    def test_null_data_has_no_tags(self):
+        self.assertEqual(get_document_tags({'data': None}), set())
@@ -0,0 +1,118 @@
+from threading import Thread
+from unittest import TestCase
+import json
+
+from py2neo import ConstraintError
+
+from flask_restful_graph import create_app
+from flask_restful_graph.backends import MemoryBackend
+from flask_restful_graph.coalescing import WriteCoalescer
+from flask_restful_graph.instrumentation import Histogram
+from flask_restful_graph.operations import NodesNotFound
+
+
+class TestWriteCoalescing(TestCase):
+
+    def setUp(self):
+        self.graph = MemoryBackend(unique=[('User', 'email')])
+
+        tx = self.graph.begin()
+        self.group_id = tx.create_node('Group', {'title': 'group'}, {})
+        tx.commit()
+
+        self.transactions = 0
+        begin = self.graph.begin
+
+        def counting_begin():
+            self.transactions += 1
+            return begin()
+
+        self.graph.begin = counting_begin
+
+    def create_concurrently(self, coalescer, creates):
+        results = [None] * len(creates)
+
+        def make_call(index, properties, linkages):
+            def call():
+                try:
+                    results[index] = coalescer.create(
+                        self.graph, 'User', properties, linkages)
+                except (ConstraintError, NodesNotFound) as e:
+                    results[index] = e
+            return call
+
+        threads = [Thread(target=make_call(index, *create))
+                   for index, create in enumerate(creates)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_concurrent_creates_share_a_transaction(self):
+        coalescer = WriteCoalescer(max_batch=8, window=5)
+        results = self.create_concurrently(coalescer, [
+            ({'email': '{}@place.com'.format(index)},
+             {'groups': [self.group_id]})
+            for index in range(8)])
+
+        self.assertEqual(self.transactions, 1)
+        self.assertEqual(len(set(results)), 8)
+        self.assertEqual(
+            sorted(self.graph.nodes[node_id][1]['email']
+                   for node_id in results),
+            sorted('{}@place.com'.format(index) for index in range(8)))
+        self.assertEqual(
+            self.graph.incoming[self.group_id]['MEMBER_OF'], set(results))
+        self.assertEqual(coalescer.batch_sizes.count, 1)
+        self.assertEqual(coalescer.latencies.count, 8)
+
+    def test_each_create_gets_its_own_error(self):
+        coalescer = WriteCoalescer(max_batch=4, window=5)
+        results = self.create_concurrently(coalescer, [
+            ({'email': 'same@place.com'}, {}),
+            ({'email': 'same@place.com'}, {}),
+            ({'email': 'other@place.com'}, {'groups': [12345]}),
+            ({'email': 'new@place.com'}, {'groups': [self.group_id]})])
+
+        errors = [result for result in results
+                  if isinstance(result, Exception)]
+        created = [result for result in results
+                   if not isinstance(result, Exception)]
+
+        self.assertEqual(sorted(type(error).__name__ for error in errors),
+                         ['ConstraintError', 'NodesNotFound'])
+        self.assertEqual(
+            sorted(self.graph.nodes[node_id][1]['email']
+                   for node_id in created),
+            ['new@place.com', 'same@place.com'])
+
+    def test_posts_are_coalesced_and_measured(self):
+        app = create_app({'COALESCE_WRITES': True, 'COALESCE_WINDOW': 0},
+                         graph=self.graph).test_client()
+
+        response = app.post('/users/', content_type='application/json',
+                            data=json.dumps({'data': {
+                                'type': 'user',
+                                'attributes': {'email': 'guy@place.com'}
+                            }}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('flask_restful_graph_write_batch_size_count 1',
+                      app.get('/metrics').data)
+
+
+class TestHistogram(TestCase):
+
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram([1, 5])
+        for value in (1, 3, 9):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.render('size', 'Sizes')[2:], [
+            'size_bucket{le="1"} 1',
+            'size_bucket{le="5"} 2',
+            'size_bucket{le="+Inf"} 3',
+            'size_sum 13',
+            'size_count 3'])